@@ -44,6 +44,7 @@ setup(name='spimagine',
       },
 
       package_data={"spimagine": ['volumerender/kernels/*',
+                                  'utils/kernels/*',
                                   'gui/shaders/*',
                                   'gui/images/*',
                                   'colormaps/*',
@@ -51,7 +52,8 @@ setup(name='spimagine',
                                   'lib/*']},
       entry_points={
           'console_scripts': [
-              'spimagine_render = spimagine.bin.spim_render:main'
+              'spimagine_render = spimagine.bin.spim_render:main',
+              'spimagine_convert = spimagine.bin.spim_convert:main'
           ],
           'gui_scripts': [
               'spimagine = spimagine.bin.spimagine_gui:main'
@@ -15,20 +15,30 @@ logger.setLevel(logging.INFO)
 #logger.setLevel(logging.DEBUG)
 
 
+# the subsystems (gui, OpenCL rendering, file formats...) are only imported when first used,
+# so that e.g. "from spimagine import read3dTiff" doesnt initialise OpenCL or Qt
 from spimagine.config import config
 
-from spimagine.models.data_model import DataModel,DemoData, SpimData, TiffData, CZIData, TiffFolderData, NumpyData, RawData, RawMultipleFiles, XwingData
-
-from spimagine.models.transform_model import TransformModel, TransformData
-
-from spimagine.utils.imgutils import read3dTiff, write3dTiff
-
-from spimagine.gui.volshow import volshow, volfig, qt_exec
-
-from spimagine.gui.mainwidget import MainWidget
-
-from spimagine.gui.mesh import Mesh, SphericalMesh, EllipsoidMesh
-
-from spimagine.utils import *
-
-from spimagine.models import *
\ No newline at end of file
+from spimagine.utils.lazy_import import lazy_exports
+
+_exports = {}
+for _module, _names in [
+    ("spimagine.models.data_model", ["DataModel", "DemoData", "SpimData", "TiffData", "CZIData", "TiffFolderData",
+                                     "NumpyData", "RawData", "RawMultipleFiles", "XwingData"]),
+    ("spimagine.models.shared_memory_data", ["SharedMemoryData", "SharedMemoryWriter"]),
+    ("spimagine.models.chunked_data", ["ChunkedData", "write_chunked"]),
+    ("spimagine.models.lazy_data", ["LazyArrayData"]),
+    ("spimagine.models.transform_model", ["TransformModel", "TransformData"]),
+    ("spimagine.utils.imgutils", ["read3dTiff", "write3dTiff"]),
+    ("spimagine.config.config", ["register_colormap"]),
+    ("spimagine.gui.volshow", ["volshow", "volfig", "qt_exec"]),
+    ("spimagine.gui.mainwidget", ["MainWidget"]),
+    ("spimagine.gui.mesh", ["Mesh", "SphericalMesh", "EllipsoidMesh", "MeshBatch", "IsoSurfaceMesh"]),
+    ("spimagine.utils", ["Quaternion", "mat4_scale", "mat4_perspective", "mat4_frustrum", "mat4_identity",
+                         "mat4_ortho", "mat4_translate", "alpha_shape"]),
+]:
+    _exports.update((name, "%s:%s" % (_module, name)) for name in _names)
+
+__all__ = ["config"] + sorted(_exports)
+
+lazy_exports(__name__, _exports)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+"""
+command line converter from any supported data container
+(SpimData folder, tif, raw, czi, tif folder, xwing...) to the chunked container
+
+for all the options run
+python spim_convert.py -h
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import sys
+import argparse
+from time import time
+
+import numpy as np
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter,
+                                     description="""converts 3d/4d data into the chunked and compressed spimagine container
+
+    example usage:
+
+    Bscope data: \tspimagine_convert -i mydataFolder -o mydata.spimc
+    raw data:    \tspimagine_convert -i mydata.raw -o mydata.spimc --shape 10 100 512 512 --dtype uint16
+    """)
+
+    parser.add_argument("-i", "--input", dest="input", metavar="infile", nargs="+",
+                        help="the input file/folder (or several raw/tif files forming the timepoints)",
+                        type=str, required=True)
+
+    parser.add_argument("-o", "--output", dest="output", metavar="outfolder",
+                        help="name of the output folder",
+                        type=str, required=True)
+
+    parser.add_argument("-c", "--chunks", dest="chunks", metavar=("z", "y", "x"),
+                        type=int, nargs=3, default=[64, 64, 64])
+
+    parser.add_argument("--codec", dest="codec",
+                        help="zlib, raw or any numcodecs codec (lz4, zstd, blosc...), defaults to lz4 if available",
+                        type=str, default=None)
+
+    parser.add_argument("--no-pyramid", help="dont store the 2x downsampled level",
+                        dest="no_pyramid", action="store_true")
+
+    parser.add_argument("-n", "--workers", dest="workers",
+                        help="number of timepoints converted in parallel",
+                        type=int, default=4)
+
+    parser.add_argument("--shape", dest="shape", metavar="shape",
+                        help="the shape (t,z,y,x) for raw input",
+                        type=int, nargs="+", default=None)
+
+    parser.add_argument("--dtype", dest="dtype",
+                        help="the dtype for raw input",
+                        type=str, default="uint16")
+
+    parser.add_argument("-u", "--units", dest="units", metavar=("dx", "dy", "dz"),
+                        help="overwrite the voxel size",
+                        type=float, nargs=3, default=None)
+
+    if len(sys.argv) == 1:
+        parser.print_help()
+        return
+
+    args = parser.parse_args()
+
+    from spimagine.models.data_model import containerFromPath, RawData, RawMultipleFiles
+    from spimagine.models.chunked_data import write_chunked
+
+    fName = args.input[0] if len(args.input) == 1 else args.input
+
+    if args.shape is not None:
+        if isinstance(fName, list):
+            data = RawMultipleFiles(fName, shape=tuple(args.shape), dtype=np.dtype(args.dtype))
+        else:
+            data = RawData(fName, shape=tuple(args.shape), dtype=np.dtype(args.dtype))
+    else:
+        data = containerFromPath(fName)
+
+    print("converting %s of size %s" % (data.name, str(data.size())))
+    t = time()
+
+    write_chunked(args.output, data,
+                  chunks=args.chunks,
+                  codec=args.codec,
+                  pyramid=not args.no_pyramid,
+                  stackUnits=args.units,
+                  n_workers=args.workers)
+
+    print("done in %.1f s" % (time() - t))
+
+
+if __name__ == "__main__":
+    main()
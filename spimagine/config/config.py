@@ -7,9 +7,7 @@ logger = logging.getLogger(__name__)
 import os
 
 from .myconfigparser import MyConfigParser
-from .loadcolormaps import loadcolormaps
-
-from gputools import init_device
+from .loadcolormaps import ColormapStore
 
 __CONFIGFILE__ = os.path.expanduser("~/.spimagine")
 
@@ -25,6 +23,8 @@ defaults = {
     "window_width": 900,
     "window_height": 800,
     "max_steps": 200,
+    "max_fps": 60,
+    "mesh_lod_pixels": 2.,
     "box_linewidth": 1.,
     "interpolation": "linear",
     "_qualifier_constant_to_global": 0,
@@ -48,16 +48,37 @@ __DEFAULT_BOX_LINEWIDTH__= _get_param("box_linewidth", float)
 
 __DEFAULT_HEIGHT__ = _get_param("window_height", int)
 __DEFAULTMAXSTEPS__ = _get_param("max_steps", int)
+__DEFAULT_MAX_FPS__ = _get_param("max_fps", float)
+# the size (in pixels) of the coarsest mesh details that are allowed to show on screen
+__DEFAULT_MESH_LOD_PIXELS__ = _get_param("mesh_lod_pixels", float)
 
 __DEFAULT_INTERP__ = _get_param("interpolation", str)
 
 __QUALIFIER_CONSTANT_TO_GLOBAL__ = _get_param("_qualifier_constant_to_global", bool)
 
-__COLORMAPDICT__ = loadcolormaps()
 
-init_device(id_platform=__ID_PLATFORM__,
-            id_device=__ID_DEVICE__,
-            use_gpu=__USE_GPU__)
+
+# the colormaps, read from the packaged lut store on first access
+__COLORMAPDICT__ = ColormapStore()
+
+
+def register_colormap(name, lut):
+    """adds the colormap name (an (N,3) array of rgb values, floats in [0,1] or uint8)"""
+    __COLORMAPDICT__.register(name, lut)
+
+_device_initialized = False
+
+
+def init_opencl():
+    """initializes the configured OpenCL device (only once, on first use of the gpu)"""
+    global _device_initialized
+    if not _device_initialized:
+        from gputools import init_device
+        logger.debug("initializing OpenCL device (platform %s, device %s)", __ID_PLATFORM__, __ID_DEVICE__)
+        init_device(id_platform=__ID_PLATFORM__,
+                    id_device=__ID_DEVICE__,
+                    use_gpu=__USE_GPU__)
+        _device_initialized = True
 
 # this should fix an annoying file url drag drop bug in mac yosemite
 import platform
@@ -1,11 +1,35 @@
+"""
+the colormap lookup tables
+
+they are stored in the packaged colormaps/colormaps.npz (one (N,3) float32 array
+of rgb values in [0,1] per name), which is only read on first access, and every
+table is decoded once when it is first used.
+Custom tables can be added with ColormapStore.register (no png needed).
+
+the npz is built from the cmap_*.png images in the same folder with
+
+python -m spimagine.config.loadcolormaps
+"""
 
 from __future__ import absolute_import
 from __future__ import print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
 import sys
 import os
 import re
+import threading
 import numpy as np
-from scipy.misc import imread
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+_STORE_NAME = "colormaps.npz"
 
 
 def _absPath(myPath):
@@ -15,51 +39,41 @@ def _absPath(myPath):
     try:
         # PyInstaller creates a temp folder and stores path in _MEIPASS
         base_path = sys._MEIPASS
-        logger.DEBUG("found MEIPASS: %s "%os.path.join(base_path, os.path.basename(myPath)))
+        logger.debug("found MEIPASS: %s "%os.path.join(base_path, os.path.basename(myPath)))
 
         return os.path.join(base_path, os.path.basename(myPath))
     except Exception:
         base_path = os.path.abspath(os.path.dirname(__file__))
         return os.path.join(base_path, myPath)
 
+
+def _colormapPath():
+    try:
+        return sys._MEIPASS
+    except:
+        return _absPath("../colormaps/")
+
+
 def _arrayFromImage(fName):
     """converts png image to float32 array
     returns an array of shape [h,w,3]
     """
-    img = imread(fName)
-    # img = np.asarray(Image.open(fName).convert("RGB"))
+    from PIL import Image
+    img = np.asarray(Image.open(fName).convert("RGB"))
 
     if len(img.shape)<3:
         raise TypeError("image %s appears not to be a 2d rgb image"%fName)
 
-    return 1./255*img[:,:,:3]
-
-# def _arrayFromImage_Qt(fName):
-#     """converts png image to float32 array
-#     returns an array of shape [w,h,3]
-#     """
-#     try:
-#         img = QtGui.QImage(fName).convertToFormat(QtGui.QImage.Format_RGB32)
-#         Nx, Ny = img.width(),img.height()
-#         tmp = img.bits().asstring(img.numBytes())
-#         arr = np.frombuffer(tmp, np.uint8).reshape((Ny,Nx,4))
-#         arr = arr.astype(np.float32)/np.amax(arr)
-#         return arr[:,:,:-1][:,:,::-1]
-#     except Exception as e:
-#         print e
-#         print "could not load image %s"%fName
-#         return np.zeros((10,100,3),np.float32)
-
-    
-def loadcolormaps():
-    cmaps = {}
+    return (1./255*img[:,:,:3]).astype(np.float32)
 
-    try:
-        basePath = sys._MEIPASS
-    except:
-        basePath = _absPath("../colormaps/")
 
-    reg = re.compile("cmap_(.*)\.png")
+def loadcolormaps_png(basePath=None):
+    """decodes all the cmap_*.png images in basePath"""
+    if basePath is None:
+        basePath = _colormapPath()
+
+    cmaps = {}
+    reg = re.compile(r"cmap_(.*)\.png")
     for fName in os.listdir(basePath):
         match = reg.match(fName)
         if match:
@@ -72,13 +86,77 @@ def loadcolormaps():
     return cmaps
 
 
-if __name__ == '__main__':
-    from time import time
+def build_store(basePath=None):
+    """writes the colormaps of all the pngs in basePath to the npz store there"""
+    if basePath is None:
+        basePath = _colormapPath()
+    cmaps = loadcolormaps_png(basePath)
+    np.savez_compressed(os.path.join(basePath, _STORE_NAME), **cmaps)
+    return sorted(cmaps.keys())
+
+
+def _as_lut(lut):
+    """(N,3) float32 array in [0,1] from a (N,3/4) float or uint8 array"""
+    lut = np.asarray(lut)
+    if lut.ndim != 2 or lut.shape[1] not in (3, 4) or len(lut) < 2:
+        raise ValueError("lut should be of shape (N,3) or (N,4) with N>1 (is %s)" % str(lut.shape))
+    if np.issubdtype(lut.dtype, np.integer):
+        lut = lut / 255.
+    return np.ascontiguousarray(np.clip(lut[:, :3], 0, 1), dtype=np.float32)
+
+
+class ColormapStore(Mapping):
+    """name -> (N,3) lookup table, read lazily from the npz store and memoized"""
+
+    def __init__(self, fName=None):
+        self._fName = fName
+        self._npz = None
+        self._names = None
+        self._luts = {}
+        self._lock = threading.RLock()
+
+    def _open(self):
+        if self._names is None:
+            fName = self._fName or os.path.join(_colormapPath(), _STORE_NAME)
+            if os.path.exists(fName):
+                self._npz = np.load(fName)
+                self._names = set(self._npz.files)
+            else:
+                logger.warning("colormap store %s not found, decoding the pngs", fName)
+                self._luts.update(loadcolormaps_png())
+                self._names = set(self._luts.keys())
+
+    def __getitem__(self, name):
+        with self._lock:
+            lut = self._luts.get(name)
+            if lut is None:
+                self._open()
+                if name not in self._names:
+                    raise KeyError(name)
+                lut = self._luts[name] = _as_lut(self._npz[name])
+            return lut
+
+    def __iter__(self):
+        with self._lock:
+            self._open()
+            return iter(sorted(self._names | set(self._luts.keys())))
+
+    def __len__(self):
+        with self._lock:
+            self._open()
+            return len(self._names | set(self._luts.keys()))
+
+    def register(self, name, lut):
+        """adds (or replaces) the colormap name, lut is an (N,3) array of rgb values
+        (floats in [0,1] or uint8)"""
+        with self._lock:
+            self._luts[name] = _as_lut(lut)
 
-    t = time()
-    
-    d =  loadcolormaps()
 
-    print("time to load cmaps: %s s"%(time()-t))
+def loadcolormaps():
+    """all the colormaps as a dict"""
+    return dict(ColormapStore())
 
-    print(len(d))
+
+if __name__ == '__main__':
+    print("written %s" % build_store())
@@ -51,7 +51,10 @@ from spimagine.volumerender.volumerender import VolumeRenderer
 from spimagine.utils.transform_matrices import *
 from spimagine.models.transform_model import TransformModel
 from spimagine.models.data_model import DataModel
-from spimagine.gui.mesh import Mesh, SphericalMesh, EllipsoidMesh
+from spimagine.gui.mesh import Mesh, SphericalMesh, EllipsoidMesh, MeshBatch, IsoSurfaceMesh
+from spimagine.gui.render_scheduler import RenderScheduler
+from spimagine.gui.render_graph import RenderGraph
+from spimagine.utils.instrumentation import instrumentation
 import numpy as np
 from spimagine.gui.gui_utils import *
 
@@ -65,6 +68,7 @@ import pyopencl.array as cl_array
 from gputools import OCLArray
 
 import time
+from collections import OrderedDict
 from spimagine.utils.quaternion import Quaternion
 
 
@@ -94,6 +98,9 @@ class GLWidget(QtOpenGL.QGLWidget):
     _BACKGROUND_BLACK = (0., 0., 0., 0.)
     _BACKGROUND_WHITE = (1., 1., 1., 0.)
 
+    # number of iso surface meshes kept (e.g. for playing back a few timepoints)
+    ISO_MESH_CACHE_SIZE = 8
+
     def __init__(self, parent=None, N_PREFETCH=0, interpolation = "linear", **kwargs):
         logger.debug("init")
         #
@@ -106,6 +113,8 @@ class GLWidget(QtOpenGL.QGLWidget):
 
         self.parent = parent
         self.texture_LUT = None
+        # one lut texture per colormap, so switching back doesnt upload it again
+        self._lut_textures = {}
 
         self.setAcceptDrops(True)
 
@@ -121,13 +130,14 @@ class GLWidget(QtOpenGL.QGLWidget):
 
         self.sliceOutput = np.zeros((100, 100), dtype=np.float32)
 
-        self.setTransform(TransformModel())
-
-        self.renderTimer = QtCore.QTimer(self)
-        self.renderTimer.setInterval(10)
-        self.renderTimer.timeout.connect(self.onRenderTimer)
-        self.renderTimer.start()
+        # renders only after something changed (see refresh)
+        self.renderScheduler = RenderScheduler(self.onRenderTimer,
+                                               max_fps=spimagine.config.__DEFAULT_MAX_FPS__,
+                                               parent=self)
         self.renderedSteps = 0
+        self._init_render_graph()
+
+        self.setTransform(TransformModel())
 
         self.N_PREFETCH = N_PREFETCH
 
@@ -136,6 +146,17 @@ class GLWidget(QtOpenGL.QGLWidget):
         self.dataModel = None
 
         self.meshes = []
+        # [batch, uploaded version, draws]
+        self.meshBatches = []
+
+        # the iso surface as mesh instead of ray casting it (see setIsoMesh)
+        self.isoMesh = False
+        # (timepoint, iso value, processors) -> [mesh, center, vbos], the most recently used last
+        self._isoMeshes = OrderedDict()
+        self._isoMeshKey = None
+
+        # overlay of the timings of the last frames
+        self.showStats = False
 
         # self.setMouseTracking(True)
 
@@ -145,6 +166,44 @@ class GLWidget(QtOpenGL.QGLWidget):
 
         # self.installEventFilter(self)
 
+    def _init_render_graph(self):
+        """the stages of a frame, each is only recomputed if its inputs changed
+        (so e.g. moving the slice doesnt render the volume again, and rotating doesnt extract the slice again)
+        """
+        self.renderGraph = RenderGraph()
+        # the volume data on the device
+        self.renderGraph.add_stage("data")
+        # the renderer state that isnt set in render() (bounds, units, interpolation)
+        self.renderGraph.add_stage("renderer")
+        self.renderGraph.add_stage("volume", key=self._volume_key, depends=("data", "renderer"))
+        self.renderGraph.add_stage("slice", key=self._slice_key, depends=("data",))
+        self.renderGraph.add_stage("volume_texture", depends=("volume",))
+        self.renderGraph.add_stage("slice_texture", depends=("slice",))
+
+    def _volume_key(self):
+        t = self.transform
+        return (tuple(t.getUnscaledModelView().ravel()), tuple(np.asarray(t.getProjection()).ravel()),
+                t.minVal, t.maxVal, t.gamma, t.alphaPow,
+                t.occ_strength, t.occ_radius, t.occ_n_points, t.isIso, self.isoMesh,
+                self.NSubrenderSteps)
+
+    def _slice_key(self):
+        t = self.transform
+        return (t.dataPos, t.sliceDim, t.slicePos)
+
+    def setIsoMesh(self, isoMesh=True):
+        """in iso mode, shows the iso surface as mesh (extracted with marching cubes) instead of ray casting it
+
+        the mesh is cached per timepoint and iso value, so rotating only costs its rasterisation
+        """
+        self.isoMesh = isoMesh
+        self.refresh()
+
+    def setShowStats(self, show=True):
+        """shows the timings of the render stages (see spimagine.utils.instrumentation) as overlay"""
+        self.showStats = show
+        self.refresh()
+
     def set_background_mode_black(self, mode_back=True):
         self._background_mode_black = mode_back
         self.refresh()
@@ -156,6 +215,8 @@ class GLWidget(QtOpenGL.QGLWidget):
             self.transform.setModel(dataModel)
             self.dataModel._dataSourceChanged.connect(self.dataSourceChanged)
             self.dataModel._dataPosChanged.connect(self.dataPosChanged)
+            self.dataModel._dataReductionChanged.connect(self.dataReductionChanged)
+            self.dataModel._dataChanged.connect(self.dataChanged)
             self._dataModelChanged.emit()
 
     def dragEnterEvent(self, event):
@@ -189,7 +250,7 @@ class GLWidget(QtOpenGL.QGLWidget):
 
         try:
             arr = spimagine.config.__COLORMAPDICT__[name]
-            self._set_colormap_array(arr)
+            self._set_colormap_array(arr, key=name)
         except KeyError:
             print("could not load colormap '%s'" % name)
             print("valid names: %s" % list(spimagine.config.__COLORMAPDICT__.keys()))
@@ -197,16 +258,25 @@ class GLWidget(QtOpenGL.QGLWidget):
     def set_colormap_rgb(self, color=[1., 1., 1.]):
         self._set_colormap_array(np.outer(np.linspace(0, 1., 255), np.array(color)))
 
-    def _set_colormap_array(self, arr):
-        """arr should be of shape (N,3) and gives the rgb components of the colormap"""
+    def _set_colormap_array(self, arr, key=None):
+        """arr should be of shape (N,3) and gives the rgb components of the colormap
+
+        the texture of key is only uploaded if arr changed (custom colors use key = None)
+        """
         self.makeCurrent()
-        self.texture_LUT = fillTexture2d(arr.reshape((1,) + arr.shape), self.texture_LUT)
+        tex_arr, tex = self._lut_textures.get(key, (None, None))
+        if tex_arr is not arr:
+            tex = fillTexture2d(arr.reshape((1,) + arr.shape), tex)
+            self._lut_textures[key] = (arr, tex)
+        self.texture_LUT = tex
         self.refresh()
 
-    def _shader_from_file(self, fname_vert, fname_frag):
+    def _shader_from_file(self, fname_vert, fname_frag, attribute_locations=None):
         shader = QOpenGLShaderProgram()
         shader.addShaderFromSourceFile(QOpenGLShader.Vertex, fname_vert)
         shader.addShaderFromSourceFile(QOpenGLShader.Fragment, fname_frag)
+        for name, loc in (attribute_locations or {}).items():
+            shader.bindAttributeLocation(name, loc)
         shader.link()
         shader.bind()
         logger.debug("GLSL program log:%s", shader.log())
@@ -234,9 +304,24 @@ class GLWidget(QtOpenGL.QGLWidget):
             absPath("shaders/mesh_light.vert"),
             absPath("shaders/mesh_light.frag"))
 
+        # position has to be at location 0, as the other attributes might be constant
+        self.programMeshBatch = self._shader_from_file(absPath("shaders/mesh_batch.vert"),
+                                                       absPath("shaders/mesh_batch.frag"),
+                                                       attribute_locations={"position": 0})
+        self._has_instancing = bool(glDrawElementsInstanced) and bool(glVertexAttribDivisor)
+        # the buffers have to be recreated in the new context (the old ones went with the old context)
+        for entry in self.meshBatches:
+            entry[1] = None
+            entry[2] = []
+
+        # the render output changes every frame, so it is streamed into persistent textures
+        self._texRender = Texture2D(use_pbo=True)
+        self._texAlpha = Texture2D(use_pbo=True)
+        self._texSlice = Texture2D()
         self.texture = None
         self.textureAlpha = None
         self.textureSlice = None
+        self.renderGraph.invalidate("volume_texture", "slice_texture")
 
         self.quadCoord = np.array([[-1., -1., 0.],
                                    [1., -1., 0.],
@@ -291,6 +376,7 @@ class GLWidget(QtOpenGL.QGLWidget):
     def set_interpolation(self, interpolate = True):
         interp = "linear" if interpolate else "nearest"
         self.renderer.rebuild_program(interpolation = interp)
+        self.renderGraph.invalidate("renderer")
         self.refresh()
 
     def setTransform(self, transform):
@@ -306,6 +392,7 @@ class GLWidget(QtOpenGL.QGLWidget):
             logger.debug("dataModelchanged")
 
             self.renderer.set_data(self.dataModel[0], autoConvert=True)
+            self.renderGraph.invalidate("data")
 
             mi, ma = self._get_min_max()
 
@@ -314,6 +401,11 @@ class GLWidget(QtOpenGL.QGLWidget):
                                  stackUnits=self.dataModel.stackUnits())
 
             self.meshes = []
+            for entry in self.meshBatches:
+                self._delete_mesh_batch(entry)
+            self.meshBatches = []
+            self._isoMeshes.clear()
+            self._isoMeshKey = None
             self.refresh()
 
     def _get_min_max(self):
@@ -343,6 +435,10 @@ class GLWidget(QtOpenGL.QGLWidget):
         logger.debug("dataSourcechanged")
 
         self.renderer.set_data(self.dataModel[0], autoConvert=True)
+        self.renderGraph.invalidate("data")
+        # the iso meshes are keyed by position, not by data
+        self._isoMeshes.clear()
+        self._isoMeshKey = None
 
         mi, ma = self._get_min_max()
 
@@ -355,13 +451,41 @@ class GLWidget(QtOpenGL.QGLWidget):
     def setBounds(self, x1, x2, y1, y2, z1, z2):
         self.cubeCoords = create_cube_coords([x1, x2, y1, y2, z1, z2])
         self.renderer.set_box_boundaries([x1, x2, y1, y2, z1, z2])
+        self.renderGraph.invalidate("renderer")
 
     def setStackUnits(self, px, py, pz):
         logger.debug("setStackUnits to %s" % [px, py, pz])
         self.renderer.set_units([px, py, pz])
+        self.renderGraph.invalidate("renderer")
+
+    def dataReductionChanged(self, fx, fy, fz):
+        # the data was cropped/binned, so the view stays but the volume changes shape
+        self.renderer.set_data(self.dataModel.getProcessed(self.transform.dataPos), autoConvert=True)
+        self.renderGraph.invalidate("data")
+        self._isoMeshes.clear()
+        self._isoMeshKey = None
+        px, py, pz = self.transform.stackUnits
+        self.transform.setStackUnits(px * fx, py * fy, pz * fz)
+        self.transform.setBounds(-1, 1, -1, 1, -1, 1)
+        nSlices = self.dataModel.size()[3 - self.transform.sliceDim]
+        if self.transform.slicePos >= nSlices:
+            self.transform.setSlicePos(nSlices - 1)
+        self.refresh()
 
     def dataPosChanged(self, pos):
-        self.renderer.update_data(self.dataModel[pos])
+        # with the active processors applied (which usually happened in the background already)
+        self.updateData(self.dataModel.getProcessed(pos))
+
+    def dataChanged(self):
+        # new frames arrived in a live container, so the current timepoint has to be read again
+        self._isoMeshes.clear()
+        self._isoMeshKey = None
+        self.updateData(self.dataModel.getProcessed(self.transform.dataPos))
+
+    def updateData(self, data):
+        """sets the rendered volume to data (of the same shape as the current one)"""
+        self.renderer.update_data(data)
+        self.renderGraph.invalidate("data")
         self.refresh()
 
     def refresh(self):
@@ -369,7 +493,7 @@ class GLWidget(QtOpenGL.QGLWidget):
         #     self.parentWidget().setWindowTitle("SpImagine %s"%self.dataModel.name())
 
         self.renderUpdate = True
-        self.renderedSteps = 0
+        self.renderScheduler.request()
 
     def resizeGL(self, width, height):
         # somehow in qt5 the OpenGLWidget width/height parameters above are double the value of self.width/height
@@ -390,24 +514,78 @@ class GLWidget(QtOpenGL.QGLWidget):
         SphericalMesh, EllipsoidMesh ...
         """
 
-        self.meshes.append([mesh,
-                            glvbo.VBO(mesh.vertices.astype(np.float32, copy=False)),
-                            glvbo.VBO(np.array(mesh.normals).astype(np.float32, copy=False)),
-                            glvbo.VBO(np.array(mesh.indices).astype(np.uint32, copy=False),
-                                      target=GL_ELEMENT_ARRAY_BUFFER)])
+        self.meshes.append(self._upload_mesh(mesh))
 
         self.refresh()
         # sort according to opacity as the opaque objects should be drawn first
         # self.meshes.sort(key=lambda x: x[0].alpha, reverse=True)
 
+    def _upload_mesh(self, mesh):
+        """[mesh, center, vbos] with the vbos of the full mesh followed by its coarser levels of detail"""
+        levels = [(mesh.vertices, mesh.normals, mesh.indices)]
+        levels += [(v, n, ind) for _, v, n, ind in mesh.lod_levels()]
+
+        vbos = [(glvbo.VBO(np.array(v).astype(np.float32, copy=False)),
+                 glvbo.VBO(np.array(n).astype(np.float32, copy=False)),
+                 glvbo.VBO(np.array(ind).astype(np.uint32, copy=False),
+                           target=GL_ELEMENT_ARRAY_BUFFER))
+                for v, n, ind in levels]
+
+        center = np.mean(np.array(mesh.vertices, np.float32).reshape((-1, 3)), axis=0)
+        return [mesh, center, vbos]
+
+    def _paintGL_mesh_lod(self, entry):
+        """paints the level of detail of the mesh entry that fits its size on screen"""
+        mesh, center, vbos = entry
+        level = mesh.lod_index(self._pixel_size_at(center), spimagine.config.__DEFAULT_MESH_LOD_PIXELS__)
+        self._paintGL_mesh(mesh, *vbos[level])
+
+    def add_mesh_batch(self, batch):
+        """
+        adds a MeshBatch, i.e. many meshes that are drawn with a few draw calls
+
+        batch = MeshBatch()
+        batch.add_ellipsoids(positions, rs = radii, colors = colors)
+        glWidget.add_mesh_batch(batch)
+
+        meshes added to the batch afterwards are uploaded with the next frame
+        (call refresh() to trigger it)
+        """
+        self.meshBatches.append([batch, None, []])
+        self.refresh()
+
+    def remove_mesh_batch(self, batch):
+        for entry in self.meshBatches:
+            if entry[0] is batch:
+                self._delete_mesh_batch(entry)
+        self.meshBatches = [e for e in self.meshBatches if e[0] is not batch]
+        self.refresh()
+
+    def _delete_mesh_batch(self, entry):
+        """frees the vbos of the mesh batch entry"""
+        if entry[2]:
+            self.makeCurrent()
+        for draw in entry[2]:
+            for vbo in draw[:5]:
+                if vbo is not None:
+                    vbo.delete()
+        entry[1] = None
+        entry[2] = []
+
+    def _pixel_size_at(self, pos):
+        """the size of a screen pixel at pos (in the coordinates the meshes are drawn in)"""
+        eye = np.dot(self._mat_modelview, np.append(pos, 1.))
+        w = abs(np.dot(self._mat_proj, eye)[3])
+        # the largest scale of the modelview, so the size is never overestimated
+        scale = np.amax(np.linalg.norm(self._mat_modelview[:3, :3], axis=0))
+        n_pixels = .5 * max(self._viewport_width, self._viewport_height)
+        return max(w, 1.e-6) / (scale * abs(self._mat_proj[0, 0]) * n_pixels + 1.e-10)
+
     def _paintGL_render(self):
         # Draw the render texture
 
         self.programTex.bind()
 
-        self.texture = fillTexture2d(self.output, self.texture)
-        # self.textureAlpha = fillTexture2d(self.output_alpha, self.textureAlpha)
-
         glEnable(GL_BLEND)
         glEnable(GL_TEXTURE_2D)
         glDisable(GL_DEPTH_TEST)
@@ -434,6 +612,15 @@ class GLWidget(QtOpenGL.QGLWidget):
 
         glDrawArrays(GL_TRIANGLES, 0, len(self.quadCoord))
 
+    def _paintGL_iso_mesh(self):
+        entry = self._isoMeshes.get(self._isoMeshKey)
+        if entry is None or len(entry[0].indices) == 0:
+            return
+        if entry[2] is None:
+            with instrumentation.span("mesh upload"):
+                entry[:] = self._upload_mesh(entry[0])
+        self._paintGL_mesh_lod(entry)
+
     def _paintGL_slice(self):
         # draw the slice
         self.programSlice.bind()
@@ -452,7 +639,10 @@ class GLWidget(QtOpenGL.QGLWidget):
         self.programSlice.setAttributeArray("position", coords)
         self.programSlice.setAttributeArray("texcoord", texcoords)
 
-        self.textureSlice = fillTexture2d(self.sliceOutput, self.textureSlice)
+        if self.renderGraph.changed("slice_texture"):
+            with instrumentation.span("texture upload"):
+                self.textureSlice = self._texSlice.update(self.sliceOutput)
+            self.renderGraph.done("slice_texture")
 
         glActiveTexture(GL_TEXTURE0)
         glBindTexture(GL_TEXTURE_2D, self.textureSlice)
@@ -564,7 +754,153 @@ class GLWidget(QtOpenGL.QGLWidget):
             #
             #     glDrawArrays(GL_LINES, 0, len(mesh.edges))
 
+    def _upload_mesh_batch(self, batch):
+        """the vbos of the draws of batch
+
+        every draw is (vbo vertices, vbo normals, vbo colors, vbo per instance matrices or None,
+        vbo indices, number of instances, whether any alpha is < 1)
+        """
+        draws = []
+
+        def _vbos(verts, norms, colors):
+            return (glvbo.VBO(np.ascontiguousarray(verts, np.float32)),
+                    glvbo.VBO(np.ascontiguousarray(norms, np.float32)),
+                    glvbo.VBO(np.ascontiguousarray(colors, np.float32)))
+
+        def _translucent(colors):
+            return bool(np.any(np.asarray(colors)[:, 3] < 1.))
+
+        if self._has_instancing:
+            verts, norms, colors, inds = batch.packed()
+            if len(inds) > 0:
+                draws.append(_vbos(verts, norms, colors) +
+                             (None, glvbo.VBO(inds, target=GL_ELEMENT_ARRAY_BUFFER), 0, _translucent(colors)))
+
+            for verts, norms, inds, mats, normal_mats, colors in batch.instances():
+                # the columns of the model and normal matrices of every instance
+                inst = np.concatenate([mats.transpose(0, 2, 1).reshape((-1, 16)),
+                                       normal_mats.transpose(0, 2, 1).reshape((-1, 9))], axis=-1)
+                draws.append(_vbos(verts, norms, colors) +
+                             (glvbo.VBO(np.ascontiguousarray(inst, np.float32)),
+                              glvbo.VBO(inds, target=GL_ELEMENT_ARRAY_BUFFER), len(mats), _translucent(colors)))
+        else:
+            # every instance is expanded into one big mesh
+            verts, norms, colors, inds = batch.expanded()
+            if len(inds) > 0:
+                draws.append(_vbos(verts, norms, colors) +
+                             (None, glvbo.VBO(inds, target=GL_ELEMENT_ARRAY_BUFFER), 0, _translucent(colors)))
+        return draws
+
+    def _paintGL_mesh_batches(self):
+        """paints all mesh batches, the opaque draws first and then the translucent ones
+        (blended and without writing depth, so they dont hide each other)
+        """
+        for entry in self.meshBatches:
+            batch = entry[0]
+            if entry[1] != batch.version:
+                with instrumentation.span("mesh upload"):
+                    self._delete_mesh_batch(entry)
+                    entry[2] = self._upload_mesh_batch(batch)
+                    entry[1] = batch.version
+
+        for entry in self.meshBatches:
+            self._paintGL_mesh_batch(entry, translucent=False)
+
+        if any(draw[6] for entry in self.meshBatches for draw in entry[2]):
+            glEnable(GL_BLEND)
+            glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+            glDepthMask(GL_FALSE)
+            for entry in self.meshBatches:
+                self._paintGL_mesh_batch(entry, translucent=True)
+            glDepthMask(GL_TRUE)
+            glDisable(GL_BLEND)
+
+    def _paintGL_mesh_batch(self, entry, translucent=False):
+        """paints the (already uploaded) opaque or translucent draws of the mesh batch entry"""
+        batch = entry[0]
+        draws = [draw for draw in entry[2] if draw[6] == translucent]
+        if not draws:
+            return
+
+        glEnable(GL_DEPTH_TEST)
+        if not translucent:
+            glDisable(GL_BLEND)
+
+        prog = self.programMeshBatch
+        prog.bind()
+        prog.setUniformValue("mvpMatrix", QtGui.QMatrix4x4(*self._mat_modelviewproject.flatten()))
+        prog.setUniformValue("mvMatrix", QtGui.QMatrix4x4(*self._mat_modelview.flatten()))
+        prog.setUniformValue("normMatrix", QtGui.QMatrix4x4(*self._mat_normal.flatten()))
+
+        if batch.light:
+            prog.setUniformValue("light", QtGui.QVector3D(*batch.light))
+            prog.setUniformValue("light_components", QtGui.QVector3D(.2, .5, .3))
+        else:
+            prog.setUniformValue("light", QtGui.QVector3D(0, 0, 0))
+            prog.setUniformValue("light_components", QtGui.QVector3D(1., 0, 0))
+
+        loc = prog.attributeLocation
+        model_locs = [loc("model%i" % i) for i in range(4)]
+        normal_locs = [loc("normal%i" % i) for i in range(3)]
+
+        def _attribute(name, vbo, size, divisor=0):
+            l = loc(name)
+            glEnableVertexAttribArray(l)
+            vbo.bind()
+            glVertexAttribPointer(l, size, GL_FLOAT, GL_FALSE, 0, vbo)
+            if self._has_instancing:
+                glVertexAttribDivisor(l, divisor)
+
+        for vbo_verts, vbo_normals, vbo_colors, vbo_inst, vbo_indices, n_instances, _ in draws:
+            _attribute("position", vbo_verts, 3)
+            _attribute("normal", vbo_normals, 3)
+
+            if vbo_inst is None:
+                # identity model/normal matrices, colors per vertex
+                _attribute("color", vbo_colors, 4)
+                for i, l in enumerate(model_locs):
+                    glDisableVertexAttribArray(l)
+                    glVertexAttrib4f(l, *np.eye(4)[i])
+                for i, l in enumerate(normal_locs):
+                    glDisableVertexAttribArray(l)
+                    glVertexAttrib3f(l, *np.eye(3)[i])
+
+                vbo_indices.bind()
+                glDrawElements(GL_TRIANGLES, len(vbo_indices.data), GL_UNSIGNED_INT, None)
+            else:
+                _attribute("color", vbo_colors, 4, divisor=1)
+                vbo_inst.bind()
+                stride = 25 * 4
+                for i, l in enumerate(model_locs):
+                    glEnableVertexAttribArray(l)
+                    glVertexAttribPointer(l, 4, GL_FLOAT, GL_FALSE, stride, vbo_inst + 16 * i)
+                    glVertexAttribDivisor(l, 1)
+                for i, l in enumerate(normal_locs):
+                    glEnableVertexAttribArray(l)
+                    glVertexAttribPointer(l, 3, GL_FLOAT, GL_FALSE, stride, vbo_inst + 64 + 12 * i)
+                    glVertexAttribDivisor(l, 1)
+
+                vbo_indices.bind()
+                glDrawElementsInstanced(GL_TRIANGLES, len(vbo_indices.data), GL_UNSIGNED_INT, None, n_instances)
+
+            vbo_indices.unbind()
+            vbo_verts.unbind()
+
+        # reset the attribute state, as other programs might use the same locations
+        for l in [loc("position"), loc("normal"), loc("color")] + model_locs + normal_locs:
+            if self._has_instancing:
+                glVertexAttribDivisor(l, 0)
+            glDisableVertexAttribArray(l)
+
+        glDisable(GL_DEPTH_TEST)
+
     def paintGL(self):
+        with instrumentation.span("paint"):
+            self._paintGL()
+        if self.showStats:
+            self._paintGL_stats()
+
+    def _paintGL(self):
 
         self.makeCurrent()
 
@@ -585,7 +921,11 @@ class GLWidget(QtOpenGL.QGLWidget):
 
         if self.dataModel:
 
-            self.textureAlpha = fillTexture2d(self.output_alpha, self.textureAlpha)
+            if self.renderGraph.changed("volume_texture"):
+                with instrumentation.span("texture upload"):
+                    self.texture = self._texRender.update(self.output)
+                    self.textureAlpha = self._texAlpha.update(self.output_alpha)
+                self.renderGraph.done("volume_texture")
 
             if self.transform.isBox:
                 self._paintGL_box()
@@ -593,16 +933,56 @@ class GLWidget(QtOpenGL.QGLWidget):
             if self.transform.isSlice and self.sliceOutput is not None:
                 self._paintGL_slice()
 
-            self._paintGL_render()
+            if self._showIsoMesh():
+                self._paintGL_iso_mesh()
+            else:
+                self._paintGL_render()
+
+        for entry in self.meshes:
+            self._paintGL_mesh_lod(entry)
+
+        self._paintGL_mesh_batches()
 
-        for (m, vbo_verts, vbo_normals, vbo_indices) in self.meshes:
-            self._paintGL_mesh(m, vbo_verts, vbo_normals, vbo_indices)
+    def _paintGL_stats(self):
+        # the median/90th percentile of the stages of the last 100 frames
+        glUseProgram(0)
+        glDisable(GL_DEPTH_TEST)
+        if self._background_mode_black:
+            glColor4f(1., 1., 1., 1.)
+        else:
+            glColor4f(0., 0., 0., 1.)
+        lines = ["%-16s %7s %7s" % ("ms", "p50", "p90")]
+        for name, stats in instrumentation.summary(frames=100).items():
+            lines.append("%-16s %7.2f %7.2f" % (name, stats["p50"], stats["p90"]))
+        font = QtGui.QFont("Monospace", 9)
+        font.setStyleHint(QtGui.QFont.TypeWriter)
+        for i, line in enumerate(lines):
+            self.renderText(10, 20 + 14 * i, line, font)
 
     def render(self):
+        """renders the volume and extracts the slice, but only if their inputs changed"""
         logger.debug("render")
 
         if self.dataModel:
 
+            if self._showIsoMesh():
+                with instrumentation.span("iso mesh"):
+                    self._render_iso_mesh()
+            else:
+                if self.renderGraph.changed("volume"):
+                    # start over with the first substep
+                    self.renderedSteps = 0
+
+                if self.renderedSteps < self.NSubrenderSteps:
+                    self._render_volume()
+
+            if self.transform.isSlice and self.renderGraph.changed("slice"):
+                with instrumentation.span("slice"):
+                    self._render_slice()
+                self.renderGraph.done("slice")
+
+    def _render_volume(self):
+        with instrumentation.span("volume render", part=self.renderedSteps):
             self.renderer.set_modelView(self.transform.getUnscaledModelView())
             self.renderer.set_projection(self.transform.getProjection())
             self.renderer.set_min_val(self.transform.minVal)
@@ -621,24 +1001,43 @@ class GLWidget(QtOpenGL.QGLWidget):
             else:
                 renderMethod = "max_project"
 
-            self.renderer.render(method=renderMethod, return_alpha=True, numParts=self.NSubrenderSteps, currentPart=(
-                                                                                                                        self.renderedSteps * _next_golden(
-                                                                                                                            self.NSubrenderSteps)) % self.NSubrenderSteps)
+            self.renderer.render(method=renderMethod, return_alpha=True, numParts=self.NSubrenderSteps,
+                                 currentPart=(self.renderedSteps * _next_golden(
+                                     self.NSubrenderSteps)) % self.NSubrenderSteps)
             self.output, self.output_alpha = self.renderer.output, self.renderer.output_alpha
-
-            if self.transform.isSlice:
-                if self.transform.sliceDim == 0:
-                    out = self.dataModel[self.transform.dataPos][:, :, self.transform.slicePos]
-                elif self.transform.sliceDim == 1:
-                    out = self.dataModel[self.transform.dataPos][:, self.transform.slicePos, :]
-                elif self.transform.sliceDim == 2:
-                    out = self.dataModel[self.transform.dataPos][self.transform.slicePos, :, :]
-
-                min_out, max_out = np.amin(out), np.amax(out)
-                if max_out > min_out:
-                    self.sliceOutput = (1. * (out - min_out) / (max_out - min_out))
-                else:
-                    self.sliceOutput = np.zeros_like(out)
+        self.renderedSteps += 1
+        self.renderGraph.done("volume")
+
+    def _showIsoMesh(self):
+        return self.isoMesh and self.transform.isIso
+
+    def _render_iso_mesh(self):
+        """extracts the iso surface of the current timepoint, unless it is cached already"""
+        pos = self.transform.dataPos
+        # the same iso value as the iso_surface render kernel
+        iso = self.transform.maxVal / 2.
+        procs = repr([(p.name, p.kwargs) for p in self.dataModel.processors])
+        key = (pos, iso, procs)
+
+        entry = self._isoMeshes.pop(key, None)
+        if entry is None:
+            # the vbos are uploaded when painted
+            entry = [IsoSurfaceMesh(self.dataModel.getProcessed(pos), iso), None, None]
+        self._isoMeshes[key] = entry
+        while len(self._isoMeshes) > self.ISO_MESH_CACHE_SIZE:
+            self._isoMeshes.popitem(last=False)
+        self._isoMeshKey = key
+
+    def _render_slice(self):
+        out = self.dataModel.get_slice(self.transform.dataPos,
+                                       2 - self.transform.sliceDim,
+                                       self.transform.slicePos)
+
+        min_out, max_out = np.amin(out), np.amax(out)
+        if max_out > min_out:
+            self.sliceOutput = (1. * (out - min_out) / (max_out - min_out))
+        else:
+            self.sliceOutput = np.zeros_like(out)
 
     # def getFrame(self):
     #     self.render()
@@ -672,17 +1071,15 @@ class GLWidget(QtOpenGL.QGLWidget):
         im.save(fName)
 
     def onRenderTimer(self):
-        # if self.renderUpdate:
-        #     self.render()
-        #     self.renderUpdate = False
-        #     self.updateGL()
-        if self.renderedSteps < self.NSubrenderSteps:
-            # print ((self.renderedSteps*7)%self.NSubrenderSteps)
-            s = time.time()
+        """renders the next substep, returns True if there are substeps left"""
+        instrumentation.new_frame()
+        s = time.time()
+        with instrumentation.span("render"):
             self.render()
-            logger.debug("time to render:  %.2f" % (1000. * (time.time() - s)))
-            self.renderedSteps += 1
-            self.updateGL()
+        logger.debug("time to render:  %.2f" % (1000. * (time.time() - s)))
+        self.renderUpdate = False
+        self.updateGL()
+        return self.dataModel is not None and self.renderedSteps < self.NSubrenderSteps
 
     def wheelEvent(self, event):
         """ self.transform.zoom should be within [1,2]"""
@@ -1,6 +1,12 @@
 from __future__ import absolute_import, print_function
 
+import logging
+
+# underscored, as the gui modules do "from gui_utils import *" and have their own logger
+_logger = logging.getLogger(__name__)
+
 import os
+import ctypes
 import numpy as np
 
 from PyQt5 import QtCore
@@ -58,7 +64,7 @@ def absPath(myPath):
     try:
         # PyInstaller creates a temp folder and stores path in _MEIPASS
         base_path = sys._MEIPASS
-        logger.debug("found MEIPASS: %s "%os.path.join(base_path, os.path.basename(myPath)))
+        _logger.debug("found MEIPASS: %s "%os.path.join(base_path, os.path.basename(myPath)))
 
         return os.path.join(base_path, os.path.basename(myPath))
     except Exception:
@@ -118,6 +124,30 @@ def createTristateCheckbox(parent, img1=None , img2 = None,img3 = None, tooltip
 
 
 
+def _texture_format(data):
+    """the (internal format, format) of the texture for data"""
+    if data.ndim == 2:
+        return GL.GL_RGB, GL.GL_RED
+    elif data.ndim == 3 and data.shape[2]==3:
+        return GL.GL_RGB, GL.GL_RGB
+    elif data.ndim == 3 and data.shape[2]==4:
+        return GL.GL_RGBA, GL.GL_RGBA
+    else:
+        raise Exception("data format not supported! \ndata.shape should be either (Ny,Nx) or (Ny,Nx,3)")
+
+
+def _set_texture_params(interp=True):
+    GL.glTexParameterf (GL.GL_TEXTURE_2D,
+                     GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
+    GL.glTexParameterf (GL.GL_TEXTURE_2D,
+                     GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR if interp else GL.GL_NEAREST)
+
+    GL.glTexParameterf (GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_CLAMP_TO_EDGE)
+    GL.glTexParameterf (GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP_TO_EDGE)
+    # GL.glTexParameterf (GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_CLAMP)
+    # GL.glTexParameterf (GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP)
+
+
 def fillTexture2d(data,tex = None, interp=True):
     """ data.shape == (Ny,Nx)
           file texture with GL_RED
@@ -132,34 +162,99 @@ def fillTexture2d(data,tex = None, interp=True):
 
     GL.glBindTexture(GL.GL_TEXTURE_2D, tex)
     GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT,1)
-    GL.glTexParameterf (GL.GL_TEXTURE_2D,
-                     GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
-    GL.glTexParameterf (GL.GL_TEXTURE_2D,
-                     GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR if interp else GL.GL_NEAREST)
+    _set_texture_params(interp)
 
-    GL.glTexParameterf (GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_CLAMP_TO_EDGE)
-    GL.glTexParameterf (GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP_TO_EDGE)
-    # GL.glTexParameterf (GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_S, GL.GL_CLAMP)
-    # GL.glTexParameterf (GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP)
+    internal_format, format = _texture_format(data)
+    Ny,Nx = data.shape[:2]
+    GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, internal_format, Nx, Ny,
+                    0, format, GL.GL_FLOAT, np.ascontiguousarray(data, dtype = np.float32))
+    return tex
 
-    if data.ndim == 2:
-        Ny,Nx = data.shape
-        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB, Nx, Ny,
-                     0, GL.GL_RED, GL.GL_FLOAT, data.astype(np.float32))
 
-    elif data.ndim == 3 and data.shape[2]==3:
-        Ny,Nx = data.shape[:2]
-        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB, Nx, Ny,
-                         0, GL.GL_RGB, GL.GL_FLOAT, data.astype(np.float32))
+class Texture2D(object):
+    """ a persistent texture for data that changes every frame (e.g. the render output)
 
-    elif data.ndim == 3 and data.shape[2]==4:
-        Ny,Nx = data.shape[:2]
-        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA, Nx, Ny,
-                         0, GL.GL_RGBA, GL.GL_FLOAT, data.astype(np.float32))
+    the texture (and its sampler state) is only (re)allocated if the shape of the data changes,
+    otherwise it is updated in place with glTexSubImage2D.
+    With use_pbo = True the data is streamed via two alternating pixel buffer objects,
+    so that the driver can still transfer the last frame while the next one is written.
+
+    data that already is contiguous float32 is not copied.
+
+    usage (with a current GL context):
+
+    tex = Texture2D()
+    glBindTexture(GL_TEXTURE_2D, tex.update(data))
+    """
+
+    def __init__(self, interp=True, use_pbo=False):
+        self.interp = interp
+        self.use_pbo = use_pbo
+        self.tex = None
+        self.shape = None
+        self._pbos = None
+        self._pbo_index = 0
+
+    def _allocate(self, data):
+        internal_format, format = _texture_format(data)
+        Ny, Nx = data.shape[:2]
+        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, internal_format, Nx, Ny,
+                        0, format, GL.GL_FLOAT, None)
+        self.shape = data.shape
+
+        if self.use_pbo:
+            try:
+                if self._pbos is None:
+                    self._pbos = GL.glGenBuffers(2)
+                for pbo in self._pbos:
+                    GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, pbo)
+                    GL.glBufferData(GL.GL_PIXEL_UNPACK_BUFFER, data.nbytes, None, GL.GL_STREAM_DRAW)
+                GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
+            except Exception as e:
+                _logger.warning("could not create pixel buffer objects, uploading directly (%s)", e)
+                self.use_pbo = False
+                self._pbos = None
+
+    def update(self, data):
+        """uploads data and returns the texture id"""
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        internal_format, format = _texture_format(data)
+
+        if self.tex is None:
+            self.tex = GL.glGenTextures(1)
+            GL.glBindTexture(GL.GL_TEXTURE_2D, self.tex)
+            _set_texture_params(self.interp)
+        else:
+            GL.glBindTexture(GL.GL_TEXTURE_2D, self.tex)
+
+        GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
+
+        if data.shape != self.shape:
+            self._allocate(data)
+
+        Ny, Nx = data.shape[:2]
+        if self.use_pbo:
+            pbo = self._pbos[self._pbo_index]
+            self._pbo_index = 1 - self._pbo_index
+            GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, pbo)
+            # orphan the old storage, so we dont have to wait until its transfer is finished
+            GL.glBufferData(GL.GL_PIXEL_UNPACK_BUFFER, data.nbytes, None, GL.GL_STREAM_DRAW)
+            GL.glBufferSubData(GL.GL_PIXEL_UNPACK_BUFFER, 0, data.nbytes, data)
+            GL.glTexSubImage2D(GL.GL_TEXTURE_2D, 0, 0, 0, Nx, Ny, format, GL.GL_FLOAT, ctypes.c_void_p(0))
+            GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
+        else:
+            GL.glTexSubImage2D(GL.GL_TEXTURE_2D, 0, 0, 0, Nx, Ny, format, GL.GL_FLOAT, data)
+
+        return self.tex
+
+    def delete(self):
+        """frees the texture (and buffers), the context they were created in has to be current"""
+        if self.tex is not None:
+            GL.glDeleteTextures([self.tex])
+        if self._pbos is not None:
+            GL.glDeleteBuffers(2, self._pbos)
+        self.tex, self.shape, self._pbos = None, None, None
 
-    else:
-        raise Exception("data format not supported! \ndata.shape should be either (Ny,Nx) or (Ny,Nx,3)")
-    return tex
 
 def arrayFromImage(fName):
     """converts png image to float32 array
@@ -8,29 +8,30 @@ from PyQt5 import QtCore, QtGui, Qt, QtWidgets
 from sortedcontainers import SortedDict
 
 from spimagine.models.imageprocessor import ImageProcessor
+from spimagine.models.image_pipeline import ImagePipeline
 
 from spimagine.gui import gui_utils
+from spimagine.utils.instrumentation import instrumentation
 import six
 
 class ImageFlow(QtCore.QObject):
     # _dataPosChanged = QtCore.pyqtSignal(int)
 
-    def __init__(self):
+    def __init__(self, max_bytes = 2**30):
         self.processors = SortedDict()
+        self.pipeline = ImagePipeline(max_bytes)
 
 
     def add_processor(self,processor):
         self.processors[len(self.processors)] = processor
 
-    def apply(self,data):
+    def apply(self,data, timepoint = None):
+        """if timepoint is given, the results of every stage are cached"""
         if len(self.processors) == 0:
             return data
 
-        data = data.copy()
-        for p in self.processors.values():
-            data = p.apply(data)
-
-        return data
+        with instrumentation.span("image flow", timepoint=timepoint):
+            return self.pipeline.apply(data, list(self.processors.values()), timepoint)
 
 
 
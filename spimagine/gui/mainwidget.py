@@ -257,9 +257,13 @@ class MainWidget(QtWidgets.QWidget):
 
         self.impListView = ImageProcessorListView([BlurProcessor(),
                                                    BlurXYZProcessor(),
+                                                   RecursiveBlurProcessor(),
                                                    NoiseProcessor(),
                                                    FFTProcessor(),
-                                                   #LucyRichProcessor()
+                                                   LucyRichProcessor(),
+                                                   TemporalMeanProcessor(),
+                                                   DeltaFProcessor(),
+                                                   TemporalMedianProcessor()
                                                    ])
 
         self.impListView.hide()
@@ -421,6 +425,7 @@ class MainWidget(QtWidgets.QWidget):
         self.settingsView.checkLoopBounce.stateChanged.connect(self.setLoopBounce)
 
         self.volSettingsView._stackUnitsChanged.connect(self.transform.setStackUnits)
+        self.volSettingsView._reductionChanged.connect(self.reductionChanged)
         self.transform._stackUnitsChanged.connect(self.volSettingsView.setStackUnits)
 
         self.settingsView._frameNumberChanged.connect(self.keyPanel.setFrameNumber)
@@ -453,15 +458,31 @@ class MainWidget(QtWidgets.QWidget):
 
 
     def impStateChanged(self):
-        data = self.transform.dataModel[self.transform.dataPos]
+        procs = [imp.proc for imp in self.impListView.impViews if imp.is_active()]
+        for p in procs:
+            logger.debug("active: %s %s", p.name, p.kwargs)
 
-        for imp in self.impListView.impViews:
-            if imp.is_active():
-                print("active: ", imp.proc.name, imp.proc.kwargs)
-                data = imp.proc.apply(data)
+        # prefetched timepoints are processed in the background from now on,
+        # and only the stages after the changed one are recomputed
+        dataModel = self.transform.dataModel
+        dataModel.setProcessors(procs)
+        data = dataModel.getProcessed(self.transform.dataPos)
 
-        self.glWidget.renderer.update_data(data)
-        self.glWidget.refresh()
+        self.glWidget.updateData(data)
+
+    def reductionChanged(self, crop, binXY, binZ):
+        dataModel = self.glWidget.dataModel
+        if dataModel is None:
+            return
+        # the bounds are relative to the uncropped data, so keep the ones of an active crop
+        bounds = dataModel.reduction()[0]
+        if not crop:
+            bounds = None
+        elif bounds is None:
+            bounds = list(self.transform.bounds)
+
+        dataModel.setReduction(bounds, binning=(binZ, binXY, binXY))
+        self.volSettingsView.dimensionLabel.setText("Dim: %s"%str(tuple(dataModel.size()[::-1])))
 
     def onColormapChanged(self,index):
         self.glWidget.set_colormap(self.volSettingsView.colormaps[index])
@@ -535,6 +556,12 @@ class MainWidget(QtWidgets.QWidget):
 
     def initActions(self):
         QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+W"), self, self.closeMe)
+        # the timings of the render stages
+        QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+I"), self,
+                            lambda: self.glWidget.setShowStats(not self.glWidget.showStats))
+        # the iso surface as mesh instead of ray casting it
+        QtWidgets.QShortcut(QtGui.QKeySequence("Ctrl+M"), self,
+                            lambda: self.glWidget.setIsoMesh(not self.glWidget.isoMesh))
 
         # self.exitAction = QtWidgets.QAction('Quit', self)
         # self.exitAction.setShortcut('Ctrl+Q')
@@ -732,7 +759,7 @@ class MainWidget(QtWidgets.QWidget):
             if hasattr(self, "glWidget"):
                 logger.debug("deleting the renderer")
                 try:
-                    self.glWidget.renderTimer.stop()
+                    self.glWidget.renderScheduler.stop()
                     del self.glWidget.renderer
                     self.glWidget.setParent(None)
                     del self.glWidget
@@ -760,8 +787,6 @@ class MainWidget(QtWidgets.QWidget):
         axis = [0,0,0]
         axis[spimagine.config.__DEFAULT_SPIN_AXIS__] = 1
         self.transform.addRotation(-.02,*axis)
-        self.glWidget.render()
-        self.glWidget.updateGL()
 
     def _show_fullscreen(self):
         self.show()
@@ -10,8 +10,53 @@ from __future__ import absolute_import, print_function
 import numpy as np
 from spimagine.utils.transform_matrices import *
 from spimagine.utils import alpha_shape
+from spimagine.utils.mesh_simplify import lod_levels
+from spimagine.utils.marching_cubes import marching_cubes
 from six.moves import range
 
+
+def _ellipsoid_matrices(positions, rs, rotations=None):
+    """the (n,4,4) model matrices that map the unit sphere onto the ellipsoids
+    with centers positions (n,3), half axes rs (n,3) and rotations (n,3,3) (or (n,4,4))"""
+    positions = np.asarray(positions, np.float32).reshape((-1, 3))
+    n = len(positions)
+    rs = np.broadcast_to(np.asarray(rs, np.float32), (n, 3))
+
+    mats = np.zeros((n, 4, 4), np.float32)
+    mats[:, [0, 1, 2], [0, 1, 2]] = rs
+    if rotations is not None:
+        rotations = np.asarray(rotations, np.float32)[..., :3, :3]
+        mats[:, :3, :3] = np.matmul(np.broadcast_to(rotations, (n, 3, 3)), mats[:, :3, :3])
+    mats[:, :3, 3] = positions
+    mats[:, 3, 3] = 1.
+    return mats
+
+
+def _normal_matrices(mats):
+    """the normals transform with the inverse transpose of the model matrices (n,4,4)"""
+    return np.linalg.inv(mats[:, :3, :3].astype(np.float64)).transpose(0, 2, 1).astype(np.float32)
+
+
+def _transform_instances(verts, normals, indices, mats, normal_mats=None):
+    """the template (verts, normals, indices) transformed by every model matrix in mats (n,4,4)
+
+    returns the concatenated vertices (n*nv,3), normals (n*nv,3) and indices
+    """
+    if normal_mats is None:
+        normal_mats = _normal_matrices(mats)
+    verts = np.asarray(verts, np.float32).reshape((-1, 3))
+    normals = np.asarray(normals, np.float32).reshape((-1, 3))
+    indices = np.asarray(indices, np.uint32).flatten()
+    n, nv = len(mats), len(verts)
+
+    vs = np.matmul(verts, mats[:, :3, :3].transpose(0, 2, 1))
+    vs += mats[:, np.newaxis, :3, 3]
+    ns = np.matmul(normals, normal_mats.transpose(0, 2, 1))
+    ns *= (1. / (np.sqrt(np.einsum("nvi,nvi->nv", ns, ns)) + 1.e-10))[..., np.newaxis]
+    inds = indices[np.newaxis] + (nv * np.arange(n, dtype=np.uint32))[:, np.newaxis]
+    return vs.reshape((-1, 3)), ns.reshape((-1, 3)), inds.flatten()
+
+
 class Mesh(object):
     """
     A mesh object is defined by its vertices, normals, indices  and edge/facecolors
@@ -64,9 +109,41 @@ class Mesh(object):
 
         self.light = light
 
+        self._lod = None
+
+    # meshes with fewer triangles are always drawn at full resolution
+    LOD_MIN_TRIANGLES = 20000
+
+    def lod_levels(self, n_levels=4):
+        """
+        the precomputed coarser levels of detail (see spimagine.utils.mesh_simplify)
+
+        list of (cell_size, vertices, normals, indices), from fine to coarse
+        (empty for small meshes)
+        """
+        if self._lod is None:
+            if len(self.indices) // 3 < self.LOD_MIN_TRIANGLES:
+                self._lod = []
+            else:
+                self._lod = lod_levels(self.vertices, self.indices, self.normals, n_levels=n_levels,
+                                       min_triangles=self.LOD_MIN_TRIANGLES // 20)
+        return self._lod
+
+    def lod_index(self, pixel_size, max_pixels=2.):
+        """
+        the coarsest level whose cells appear not bigger than max_pixels on screen,
+        where pixel_size is the size of a screen pixel in mesh coordinates
+
+        0 is the full mesh, i the level lod_levels()[i-1]
+        """
+        index = 0
+        for i, lev in enumerate(self.lod_levels()):
+            if lev[0] <= max_pixels * pixel_size:
+                index = i + 1
+        return index
 
     @classmethod
-    def mesh_from_points(points, alpha = -1):
+    def mesh_from_points(cls, points, alpha = -1):
         """
         creates the mesh from the convex or concave (alpha shape) hull of points
 
@@ -236,6 +313,42 @@ class EllipsoidMesh(Mesh):
 
         return xs, ns, inds
 
+    @classmethod
+    def create_verts_bulk(cls, positions, rs, n_phi=30, n_theta=20, rotations=None):
+        """vertices, normals and indices of many ellipsoids at once
+
+        positions: (n,3) centers
+        rs: (n,3) half axes (or a single (rx,ry,rz))
+        rotations: optional (n,3,3) (or (n,4,4)) rotation matrices
+
+        the unit sphere template is transformed to all of them with one broadcasted
+        matrix product, the indices are offset per ellipsoid
+        """
+        xs0, ns0, inds = cls.create_verts((1., 1., 1.), (0, 0, 0), n_phi, n_theta)
+        mats = _ellipsoid_matrices(positions, rs, rotations)
+        return _transform_instances(xs0, ns0, inds, mats)
+
+    @classmethod
+    def bulk(cls, positions, rs=(1., .5, .5), rotations=None,
+             n_phi=30,
+             n_theta=20,
+             facecolor=(1., 1., 1.),
+             edgecolor=None,
+             alpha=1.,
+             light=(-1, -1, 1)):
+        """a single mesh of many ellipsoids (see create_verts_bulk), e.g. one per detected nucleus
+
+        for a color per ellipsoid use MeshBatch.add_ellipsoids
+        """
+        vertices, normals, indices = cls.create_verts_bulk(positions, rs, n_phi, n_theta, rotations)
+        return Mesh(vertices=vertices,
+                    normals=normals,
+                    indices=indices,
+                    facecolor=facecolor,
+                    edgecolor=edgecolor,
+                    alpha=alpha,
+                    light=light)
+
 class SphericalMesh(EllipsoidMesh):
     def __init__(self, r=1.,
                  pos=(0, 0, 0),
@@ -257,6 +370,180 @@ class SphericalMesh(EllipsoidMesh):
                                             light=light)
 
 
+class IsoSurfaceMesh(Mesh):
+    def __init__(self, data, iso,
+                 facecolor=(1., 1., 1.),
+                 edgecolor=None,
+                 alpha=1.,
+                 light=(-1, -1, 1),
+                 gpu=True):
+        """the iso surface of the volume data (Nz,Ny,Nx) at value iso (see spimagine.utils.marching_cubes)
+
+        the vertices are in the coordinates of the rendered volume, i.e. the data fills the box [-1,1]^3
+        """
+        vertices, normals, indices = marching_cubes(data, iso, gpu=gpu)
+
+        # the voxel centers are at (i+.5)/N of the box, as in the render kernels
+        shape = np.array(data.shape[::-1], np.float32)
+        vertices = 2. * (vertices + .5) / shape - 1.
+        normals = normals * shape / 2.
+        normals /= np.linalg.norm(normals, axis=-1, keepdims=True) + 1.e-10
+
+        self.iso = iso
+        super(IsoSurfaceMesh, self).__init__(vertices=vertices,
+                                             normals=normals,
+                                             indices=indices.flatten(),
+                                             facecolor=facecolor,
+                                             edgecolor=edgecolor,
+                                             alpha=alpha,
+                                             light=light)
+
+
+class MeshBatch(object):
+    """
+    many meshes that are drawn together with only a few draw calls
+
+    - add_mesh packs arbitrary meshes into shared vertex/index buffers (one draw call for all)
+    - add_instances/add_ellipsoids draw copies of a template mesh with a per instance
+      transform, color and alpha (one instanced draw call per template)
+
+    e.g. 10k ellipsoids:
+
+    batch = MeshBatch()
+    batch.add_ellipsoids(positions, rs = radii, colors = colors)
+    glWidget.add_mesh_batch(batch)
+    """
+
+    def __init__(self, light=(-1, -1, 1)):
+        self.light = light
+        self._packed = []
+        # template key -> [template, [model matrices], [colors]]
+        self._instances = {}
+        self._order = []
+        self._cache = {}
+        # changes whenever something was added, so the gl buffers know when to update
+        self.version = 0
+
+    def __len__(self):
+        return len(self._packed) + sum(sum(len(m) for m in self._instances[k][1]) for k in self._order)
+
+    def _changed(self):
+        self.version += 1
+        self._cache = {}
+
+    def clear(self):
+        self._packed = []
+        self._instances = {}
+        self._order = []
+        self._changed()
+
+    def add_mesh(self, mesh):
+        """adds a copy of the mesh (with its facecolor and alpha)"""
+        if mesh.facecolor is None:
+            return
+        vertices = np.asarray(mesh.vertices, np.float32).reshape((-1, 3))
+        normals = np.asarray(mesh.normals, np.float32).reshape((-1, 3))
+        indices = np.asarray(mesh.indices, np.uint32).flatten()
+        color = tuple(mesh.facecolor[:3]) + (float(mesh.alpha),)
+        self._packed.append((vertices, normals, indices, color))
+        self._changed()
+
+    def add_instances(self, template, transforms, colors=(1., 1., 1.), alphas=1., key=None):
+        """adds copies of the mesh template
+
+        transforms: (n,4,4) model matrices of the instances
+        colors: (n,3) or a single (r,g,b)
+        alphas: (n,) or a single value
+        key: instances with the same key share the template (default: the template itself)
+        """
+        transforms = np.asarray(transforms, np.float32).reshape((-1, 4, 4))
+        n = len(transforms)
+        colors = np.broadcast_to(np.asarray(colors, np.float32)[..., :3], (n, 3))
+        alphas = np.broadcast_to(np.clip(np.asarray(alphas, np.float32), 0, 1), (n,))
+        rgba = np.concatenate([colors, alphas[:, np.newaxis]], axis=-1)
+
+        if key is None:
+            key = id(template)
+        if key not in self._instances:
+            self._instances[key] = [template, [], []]
+            self._order.append(key)
+        self._instances[key][1].append(transforms)
+        self._instances[key][2].append(rgba)
+        self._changed()
+
+    def add_ellipsoids(self, positions, rs=(1., 1., 1.), colors=(1., 1., 1.), alphas=1.,
+                       rotations=None, n_phi=30, n_theta=20):
+        """adds ellipsoids at positions (n,3) with half axes rs ((n,3) or a single (rx,ry,rz))
+
+        rotations are optional (n,3,3) (or (n,4,4)) rotation matrices
+        """
+        mats = _ellipsoid_matrices(positions, rs, rotations)
+
+        key = ("ellipsoid", n_phi, n_theta)
+        if key in self._instances:
+            template = self._instances[key][0]
+        else:
+            # the unit sphere, scaled/rotated/moved per instance
+            template = EllipsoidMesh(rs=(1., 1., 1.), n_phi=n_phi, n_theta=n_theta)
+        self.add_instances(template, mats, colors, alphas, key=key)
+
+    def packed(self):
+        """the added meshes concatenated
+
+        returns vertices (N,3), normals (N,3), colors (N,4) and indices (M,)
+        """
+        if "packed" not in self._cache:
+            if self._packed:
+                n_verts = np.cumsum([0] + [len(v) for v, _, _, _ in self._packed])
+                vertices = np.concatenate([v for v, _, _, _ in self._packed])
+                normals = np.concatenate([n for _, n, _, _ in self._packed])
+                colors = np.repeat(np.array([c for _, _, _, c in self._packed], np.float32),
+                                   np.diff(n_verts), axis=0)
+                indices = np.concatenate([i + np.uint32(off) for (_, _, i, _), off in zip(self._packed, n_verts)])
+            else:
+                vertices = np.zeros((0, 3), np.float32)
+                normals = np.zeros((0, 3), np.float32)
+                colors = np.zeros((0, 4), np.float32)
+                indices = np.zeros((0,), np.uint32)
+            self._cache["packed"] = (vertices, normals, colors, indices)
+        return self._cache["packed"]
+
+    def instances(self):
+        """the instanced meshes as list of (vertices, normals, indices, model matrices (n,4,4),
+        normal matrices (n,3,3), colors (n,4)) per template"""
+        if "instances" not in self._cache:
+            res = []
+            for key in self._order:
+                template, transforms, colors = self._instances[key]
+                mats = np.concatenate(transforms)
+                res.append((np.asarray(template.vertices, np.float32).reshape((-1, 3)),
+                            np.asarray(template.normals, np.float32).reshape((-1, 3)),
+                            np.asarray(template.indices, np.uint32).flatten(),
+                            mats,
+                            _normal_matrices(mats),
+                            np.concatenate(colors)))
+            self._cache["instances"] = res
+        return self._cache["instances"]
+
+    def expanded(self):
+        """all meshes (including every instance) concatenated, as packed()
+
+        used where instancing is not available
+        """
+        if "expanded" not in self._cache:
+            parts = [self.packed()]
+            for verts, norms, inds, mats, normal_mats, colors in self.instances():
+                v, nn, i = _transform_instances(verts, norms, inds, mats, normal_mats)
+                parts.append((v, nn, np.repeat(colors, len(verts), axis=0), i))
+
+            n_verts = np.cumsum([0] + [len(p[0]) for p in parts])
+            self._cache["expanded"] = (np.concatenate([p[0] for p in parts]),
+                                       np.concatenate([p[1] for p in parts]),
+                                       np.concatenate([p[2] for p in parts]),
+                                       np.concatenate([p[3] + np.uint32(off) for p, off in zip(parts, n_verts)]))
+        return self._cache["expanded"]
+
+
 if __name__=='__main__':
     from time import time
 
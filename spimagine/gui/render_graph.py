@@ -0,0 +1,75 @@
+"""
+dependency tracking between the stages of a render (volume render, slice extraction, texture uploads...)
+
+a stage has to be recomputed only if
+
+- one of its parameters changed (key() returns a different value than when it was last done)
+- one of the stages it depends on was done (or invalidated) since
+- it was explicitly invalidated
+
+usage:
+
+graph = RenderGraph()
+graph.add_stage("data")
+graph.add_stage("volume", key = lambda: (transform.gamma,), depends = ("data",))
+
+graph.invalidate("data")  # e.g. new timepoint
+
+if graph.changed("volume"):
+    ...
+    graph.done("volume")
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Stage(object):
+    def __init__(self, key, depends):
+        self.key = key
+        self.depends = tuple(depends)
+        self.version = 0
+        self.dirty = True
+        self.last_key = None
+        self.last_depends = None
+
+
+class RenderGraph(object):
+    def __init__(self):
+        self._stages = {}
+
+    def add_stage(self, name, key=None, depends=()):
+        """key() should return a comparable value (e.g. a tuple) of the parameters of the stage"""
+        for d in depends:
+            if d not in self._stages:
+                raise KeyError("stage '%s' depends on the unknown stage '%s'" % (name, d))
+        self._stages[name] = _Stage(key, depends)
+
+    def invalidate(self, *names):
+        """marks the stages as changed (and hence all the stages depending on them)"""
+        for name in names:
+            stage = self._stages[name]
+            stage.dirty = True
+            stage.version += 1
+
+    def _depends_versions(self, stage):
+        return tuple(self._stages[d].version for d in stage.depends)
+
+    def changed(self, name):
+        """True if the stage has to be recomputed"""
+        stage = self._stages[name]
+        if stage.dirty or stage.last_depends != self._depends_versions(stage):
+            return True
+        return stage.key is not None and stage.key() != stage.last_key
+
+    def done(self, name):
+        """marks the stage as up to date (and its dependents as changed)"""
+        stage = self._stages[name]
+        stage.last_key = None if stage.key is None else stage.key()
+        stage.last_depends = self._depends_versions(stage)
+        stage.dirty = False
+        stage.version += 1
+        logger.debug("stage %s done (version %s)", name, stage.version)
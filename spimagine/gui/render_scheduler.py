@@ -0,0 +1,69 @@
+"""
+schedules the rendering of a widget on demand
+
+instead of polling a flag with a fast timer, request() starts a single shot timer
+(if it isnt running already), so that
+
+- all the changes before the timer fires are rendered together in one frame
+- frames are at least 1/max_fps apart
+- nothing runs as long as nothing changes
+
+usage:
+
+scheduler = RenderScheduler(widget.renderStep, max_fps = 60, parent = widget)
+scheduler.request()
+
+renderStep should return True if it wants to be called again (e.g. for progressive rendering)
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import time
+
+from PyQt5 import QtCore
+
+
+class RenderScheduler(QtCore.QObject):
+    def __init__(self, render_func, max_fps=60, parent=None):
+        super(RenderScheduler, self).__init__(parent)
+        self.render_func = render_func
+        self.setMaxFps(max_fps)
+        self._pending = False
+        self._last = None
+        self.nFrames = 0
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._onTimeout)
+
+    def setMaxFps(self, max_fps):
+        if max_fps <= 0:
+            raise ValueError("max_fps should be positive (is %s)" % max_fps)
+        self.max_fps = max_fps
+        self._min_interval = 1. / max_fps
+
+    def isPending(self):
+        return self._pending
+
+    def request(self):
+        """renders as soon as possible, but not earlier than 1/max_fps after the last frame"""
+        self._pending = True
+        if not self._timer.isActive():
+            wait = 0 if self._last is None else self._min_interval - (time.time() - self._last)
+            self._timer.start(max(0, int(1000 * wait)))
+
+    def stop(self):
+        self._pending = False
+        self._timer.stop()
+
+    def _onTimeout(self):
+        if not self._pending:
+            return
+        self._pending = False
+        self._last = time.time()
+        self.nFrames += 1
+        if self.render_func():
+            self.request()
@@ -0,0 +1,25 @@
+uniform vec3 light;
+uniform vec3 light_components;
+
+varying vec3 var_normal;
+varying vec3 var_pos;
+varying vec4 var_color;
+
+void main()
+{
+   //Phong shading
+
+   vec3 L = normalize(light - var_pos);
+   vec3 E = normalize(-var_pos);
+   vec3 R = normalize(-reflect(L,var_normal));
+
+   //calculate Diffuse Term:
+   float c_diffuse = clamp(max(dot(var_normal,L), 0.0), 0.0, 1.0);
+
+   // calculate Specular Term:
+   float c_spec = clamp(pow(max(dot(R,E),0.0),10.), 0.0, 1.0);
+
+   float mag = (light_components.x+light_components.y*c_diffuse+light_components.z*c_spec);
+
+   gl_FragColor = vec4(mag*var_color.rgb, var_color.a);
+}
@@ -0,0 +1,37 @@
+// meshes of a MeshBatch: the per vertex color is used for packed meshes,
+// instanced meshes get model/normal matrix and color per instance
+
+attribute vec3 position;
+attribute vec3 normal;
+attribute vec4 color;
+
+attribute vec4 model0;
+attribute vec4 model1;
+attribute vec4 model2;
+attribute vec4 model3;
+
+attribute vec3 normal0;
+attribute vec3 normal1;
+attribute vec3 normal2;
+
+uniform mat4 normMatrix;
+uniform mat4 mvpMatrix;
+uniform mat4 mvMatrix;
+
+varying vec3 var_normal;
+varying vec3 var_pos;
+varying vec4 var_color;
+
+void main()
+{
+  mat4 model = mat4(model0, model1, model2, model3);
+  mat3 normModel = mat3(normal0, normal1, normal2);
+
+  vec4 pos = model*vec4(position, 1.0);
+
+  var_normal = normalize((normMatrix*vec4(normalize(normModel*normal),1.)).xyz);
+  var_pos = (mvMatrix*pos).xyz;
+  var_color = color;
+
+  gl_Position  = mvpMatrix*pos;
+}
@@ -33,6 +33,7 @@ from spimagine.models.data_model import DataModel
 from spimagine.models.transform_model import TransformModel
 from spimagine.utils.quaternion import Quaternion
 from spimagine.gui.gui_utils import *
+from spimagine.gui.render_scheduler import RenderScheduler
 
 from numpy import *
 import numpy as np
@@ -102,12 +103,13 @@ class GLSliceWidget(QtOpenGL.QGLWidget):
         self.setAcceptDrops(True)
 
         self.texture_LUT = None
-        self.setTransform(TransformModel())
+        # one lut texture per colormap, so switching back doesnt upload it again
+        self._lut_textures = {}
+        # renders only after something changed (see refresh)
+        self.renderScheduler = RenderScheduler(self.onRenderTimer, max_fps=20, parent=self)
+        self.renderScheduler.request()
 
-        self.renderTimer = QtCore.QTimer(self)
-        self.renderTimer.setInterval(50)
-        self.renderTimer.timeout.connect(self.onRenderTimer)
-        self.renderTimer.start()
+        self.setTransform(TransformModel())
 
         self.dataModel = None
 
@@ -138,6 +140,8 @@ class GLSliceWidget(QtOpenGL.QGLWidget):
 
             self.dataModel._dataSourceChanged.connect(self.dataSourceChanged)
             self.dataModel._dataPosChanged.connect(self.dataPosChanged)
+            self.dataModel._dataReductionChanged.connect(self.dataReductionChanged)
+            self.dataModel._dataChanged.connect(self.refresh)
             self._dataModelChanged.connect(self.dataModelChanged)
             self._dataModelChanged.emit()
 
@@ -164,19 +168,24 @@ class GLSliceWidget(QtOpenGL.QGLWidget):
 
         try:
             arr = spimagine.config.__COLORMAPDICT__[name]
-            self.makeCurrent()
-            self.texture_LUT = fillTexture2d(arr.reshape((1,) + arr.shape), self.texture_LUT, self.interp)
+            self._set_colormap_array(arr, key=name)
         except:
             print("could not load colormap %s" % name)
 
     def set_colormap_rgb(self, color=[1., 1., 1.]):
         self._set_colormap_array(outer(linspace(0, 1., 255), np.array(color)))
 
-    def _set_colormap_array(self, arr):
-        """arr should be of shape (N,3) and gives the rgb components of the colormap"""
+    def _set_colormap_array(self, arr, key=None):
+        """arr should be of shape (N,3) and gives the rgb components of the colormap
 
+        the texture of key is only uploaded if arr changed (custom colors use key = None)
+        """
         self.makeCurrent()
-        self.texture_LUT = fillTexture2d(arr.reshape((1,) + arr.shape), self.texture_LUT, self.interp)
+        tex_arr, tex = self._lut_textures.get(key, (None, None))
+        if tex_arr is not arr:
+            tex = fillTexture2d(arr.reshape((1,) + arr.shape), tex, self.interp)
+            self._lut_textures[key] = (arr, tex)
+        self.texture_LUT = tex
         self.refresh()
 
     def initializeGL(self):
@@ -197,6 +206,7 @@ class GLSliceWidget(QtOpenGL.QGLWidget):
         glClearColor(0, 0, 0, 1.)
 
         self.texture = None
+        self._texOutput = Texture2D(interp=self.interp)
 
         self.quadCoord = np.array([[-1., -1., 0.],
                                    [1., -1., 0.],
@@ -238,10 +248,14 @@ class GLSliceWidget(QtOpenGL.QGLWidget):
         self.dataPos = pos
         self.refresh()
 
+    def dataReductionChanged(self, fx, fy, fz):
+        self.refresh()
+
     def refresh(self):
         # if self.parentWidget() and self.dataModel:
         #     self.parentWidget().setWindowTitle("SpImagine %s"%self.dataModel.name())
         self.renderUpdate = True
+        self.renderScheduler.request()
 
     def resizeGL(self, width, height):
         # height = max(10,height)
@@ -293,7 +307,7 @@ class GLSliceWidget(QtOpenGL.QGLWidget):
             # Draw the render texture
             self.programTex.bind()
 
-            self.texture = fillTexture2d(self.output, self.texture, self.interp)
+            self.texture = self._texOutput.update(self.output)
 
             glEnable(GL_TEXTURE_2D)
             glDisable(GL_DEPTH_TEST)
@@ -317,12 +331,12 @@ class GLSliceWidget(QtOpenGL.QGLWidget):
     def render(self):
         logger.debug("render")
         if self.dataModel:
+            # only read the plane that is shown (sliceDim 0,1,2 = x,y,z)
+            out = self.dataModel.get_slice(self.transform.dataPos,
+                                           2 - self.transform.sliceDim,
+                                           self.transform.slicePos)
             if self.transform.sliceDim == 0:
-                out = fliplr(self.dataModel[self.transform.dataPos][:, :, self.transform.slicePos].T)
-            elif self.transform.sliceDim == 1:
-                out = self.dataModel[self.transform.dataPos][:, self.transform.slicePos, :]
-            elif self.transform.sliceDim == 2:
-                out = self.dataModel[self.transform.dataPos][self.transform.slicePos, :, :]
+                out = fliplr(out.T)
 
             min_out, max_out = self.transform.minVal, self.transform.maxVal
 
@@ -347,6 +361,7 @@ class GLSliceWidget(QtOpenGL.QGLWidget):
             self.render()
             self.renderUpdate = False
             self.updateGL()
+        return False
 
     def tex_coords_from_xyzoom(self, x0, y0, zoom):
         """returns array of texccords corners when zoomed
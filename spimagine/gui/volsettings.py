@@ -54,6 +54,7 @@ class VolumeSettingsPanel(QtWidgets.QWidget):
     _boundsChanged =  QtCore.pyqtSignal(float,float,float,float,float,float)
     _alphaPowChanged = QtCore.pyqtSignal(float)
     _rgbColorChanged = QtCore.pyqtSignal(float, float,float)
+    _reductionChanged = QtCore.pyqtSignal(bool, int, int)
     
     def __init__(self):
         super(QtWidgets.QWidget,self).__init__()
@@ -103,7 +104,30 @@ class VolumeSettingsPanel(QtWidgets.QWidget):
 
 
         vbox.addLayout(gridBox)
-            
+
+        # crop/binning of the data (trades resolution for speed)
+        vbox.addWidget(QtWidgets.QLabel("Resolution",alignment = QtCore.Qt.AlignCenter))
+
+        self.checkCrop = createStandardCheckbox(self, tooltip="crop data to borders")
+        self.spinBinXY = QtWidgets.QSpinBox()
+        self.spinBinZ = QtWidgets.QSpinBox()
+        for spin in (self.spinBinXY, self.spinBinZ):
+            spin.setRange(1, 8)
+            spin.setStyleSheet("background-color:none; color:black;")
+
+        gridBox = QtWidgets.QGridLayout()
+        gridBox.addWidget(QtWidgets.QLabel("crop to borders:\t"), 0, 0)
+        gridBox.addWidget(self.checkCrop, 0, 1)
+        gridBox.addWidget(QtWidgets.QLabel("binning xy:\t"), 1, 0)
+        gridBox.addWidget(self.spinBinXY, 1, 1)
+        gridBox.addWidget(QtWidgets.QLabel("binning z:\t"), 2, 0)
+        gridBox.addWidget(self.spinBinZ, 2, 1)
+        vbox.addLayout(gridBox)
+
+        self.checkCrop.stateChanged.connect(self.reductionChanged)
+        self.spinBinXY.valueChanged.connect(self.reductionChanged)
+        self.spinBinZ.valueChanged.connect(self.reductionChanged)
+
         line =  QtWidgets.QFrame()
         line.setFrameShape(QtWidgets.QFrame.HLine)
 
@@ -253,6 +277,10 @@ class VolumeSettingsPanel(QtWidgets.QWidget):
         bounds = [s.value()/100. for s in self.sliderBounds]
         self._boundsChanged.emit(*bounds)
 
+    def reductionChanged(self):
+        self._reductionChanged.emit(self.checkCrop.checkState() != 0,
+                                    self.spinBinXY.value(), self.spinBinZ.value())
+
     def stackUnitsChanged(self):
         try:
             stackUnits = [float(e.text()) for e in self.stackEdits]
@@ -14,6 +14,7 @@ from spimagine.gui.mainwidget import MainWidget
 
 from spimagine.models.data_model import DataModel, SpimData, TiffData, TiffFolderData, GenericData, EmptyData, DemoData, \
     NumpyData
+from spimagine.models.lazy_data import LazyArrayData, is_lazy_array
 import six
 
 _MAIN_APP = None
@@ -114,7 +115,8 @@ def volshow(data, autoscale=True,
             cmap=None,
             interpolation="linear",
             show_window = True,
-            raise_window=True):
+            raise_window=True,
+            prefetchSize=2):
     """
     class to visualize 3d/4d data
 
@@ -127,6 +129,13 @@ def volshow(data, autoscale=True,
         volshow( randint(0,10,(10, 20,30,40) )
 
 
+    - a lazy 3d/4d array (zarr, h5py, dask...), which is read one timepoint at a time
+
+      e.g.
+
+        volshow(h5py.File("data.h5","r")["data"])
+
+
     - an instance of a class derived from the abstract bass class GenericData
 
       e.g.
@@ -177,6 +186,9 @@ def volshow(data, autoscale=True,
     raise_window: boolean
         if true, raises the window
 
+    prefetchSize: int
+        the number of timepoints to prefetch for lazy arrays
+
     Returns
     -------
         the widget w
@@ -193,11 +205,19 @@ def volshow(data, autoscale=True,
 
     t = time()
 
+    value_range = None
+
     # if isinstance(data,GenericData):
     if isinstance(data, DataModel):
         m = data
     elif hasattr(data, "stackUnits"):
         m = DataModel(data)
+    elif is_lazy_array(data):
+        # dont materialize the whole array, the display range is estimated from a subsample
+        container = LazyArrayData(data)
+        if autoscale:
+            value_range = container.sample_range()
+        m = DataModel(container, prefetchSize=prefetchSize)
     else:
         if not isinstance(data, np.ndarray):
             data = np.array(data)
@@ -233,6 +253,9 @@ def volshow(data, autoscale=True,
 
     window.glWidget.transform.setStackUnits(*stackUnits)
 
+    if value_range is not None:
+        window.glWidget.transform.setValueScale(*value_range)
+
     if show_window:
         window.show()
 
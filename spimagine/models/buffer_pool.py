@@ -0,0 +1,159 @@
+"""
+a pool of reusable, page aligned frame buffers
+
+the file backed data containers read every timepoint into a buffer of the pool
+instead of allocating a new (multi hundred MB) array each time. Once the frame
+cache of the DataModel evicts a timepoint, the buffer is handed back via release()
+and reused for the next timepoint of the same shape and dtype, so steady state playback
+does not allocate at all.
+
+A released buffer is only reused once nothing else (e.g. the renderer or a view
+of it) references it anymore.
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import os
+import sys
+import threading
+import weakref
+from collections import defaultdict
+
+import numpy as np
+
+_ALIGNMENT = 4096
+
+
+def aligned_empty(shape, dtype, alignment=_ALIGNMENT):
+    """like np.empty, but the data pointer is aligned to alignment bytes"""
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    buf = np.empty(nbytes + alignment, np.uint8)
+    offset = (-buf.ctypes.data) % alignment
+    return buf[offset:offset + nbytes].view(dtype).reshape(shape)
+
+
+def _pread(f, buf, offset):
+    """fills the memoryview buf with the bytes of f at offset, returns the number of bytes read"""
+    n = 0
+    if hasattr(os, "preadv"):
+        fd = f.fileno()
+        while n < len(buf):
+            k = os.preadv(fd, [buf[n:]], offset + n)
+            if not k:
+                break
+            n += k
+    else:
+        f.seek(offset)
+        while n < len(buf):
+            k = f.readinto(buf[n:])
+            if not k:
+                break
+            n += k
+    return n
+
+
+def readinto_array(fName, out, offset=0):
+    """reads the bytes of fName starting at offset directly into the contiguous array out"""
+    return read_segments_into(fName, out, [(offset, out.nbytes)])
+
+
+def read_segments_into(fName, out, segments):
+    """reads the byte ranges segments = [(offset, bytecount),...] of fName
+    one after another into the contiguous array out"""
+    buf = memoryview(out.reshape(-1).view(np.uint8))
+    if sum(c for _, c in segments) != len(buf):
+        raise ValueError("segments of %s dont match the size of the output buffer" % fName)
+
+    pos = 0
+    with open(fName, "rb", buffering=0) as f:
+        for offset, count in segments:
+            n = _pread(f, buf[pos:pos + count], offset)
+            if n < count:
+                raise IOError("unexpected end of file %s (read %i of %i bytes at %i)" % (fName, n, count, offset))
+            pos += count
+    return out
+
+
+def _refcounts(arr):
+    return sys.getrefcount(arr), sys.getrefcount(arr.base)
+
+
+class BufferPool(object):
+    """thread safe pool of arrays keyed by (shape, dtype)
+
+    max_bytes limits the memory held by released buffers
+    """
+
+    def __init__(self, max_bytes=2 * 2 ** 30):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.n_allocated = 0
+        self._released = defaultdict(list)
+        # the buffers handed out (that may come back)
+        self._owned = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+        # the reference counts of a released buffer that is not used anywhere else
+        _tmp = [aligned_empty((1,), np.uint8)]
+        self._unused_refs = _refcounts(_tmp[0])
+
+    @staticmethod
+    def _key(shape, dtype):
+        return tuple(int(s) for s in shape), np.dtype(dtype).str
+
+    def _pop_unused(self, key):
+        released = self._released[key]
+        for i in range(len(released)):
+            counts = _refcounts(released[i])
+            if counts[0] <= self._unused_refs[0] and counts[1] <= self._unused_refs[1]:
+                arr = released.pop(i)
+                self.nbytes -= arr.nbytes
+                return arr
+        return None
+
+    def acquire(self, shape, dtype):
+        """returns an (uninitialized) array of given shape and dtype"""
+        key = self._key(shape, dtype)
+        with self._lock:
+            arr = self._pop_unused(key)
+            if arr is None:
+                arr = aligned_empty(*key)
+                self.n_allocated += 1
+                logger.debug("allocated new buffer %s %s", *key)
+            self._owned[id(arr)] = arr
+        return arr
+
+    def release(self, arr):
+        """hands the buffer back to the pool, returns True if it was taken
+
+        it is reused once no other reference to it (or a view of it) is left
+        """
+        if not isinstance(arr, np.ndarray):
+            return False
+
+        with self._lock:
+            if self._owned.get(id(arr)) is not arr:
+                return False
+            del self._owned[id(arr)]
+
+            released = self._released[self._key(arr.shape, arr.dtype)]
+            released.append(arr)
+            self.nbytes += arr.nbytes
+            # drop the oldest buffers if we hold too much
+            while self.nbytes > self.max_bytes and released:
+                self.nbytes -= released.pop(0).nbytes
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._released.clear()
+            self.nbytes = 0
+
+
+# the pool shared by all data containers
+frame_pool = BufferPool()
@@ -0,0 +1,347 @@
+"""
+a chunked, compressed container for (big) 4d data
+
+fname/
+|-- chunked_meta.json
+|-- level0/
+   |--t000000.bin
+   |--t000001.bin
+   ...
+|-- level1/         (optional, 2x downsampled)
+   ...
+
+every timepoint file holds the compressed 3d chunks of one volume, preceded by a
+table of int64 byte offsets (one per chunk plus the end), so single chunks can be read
+without decoding the whole volume.
+
+compression uses numcodecs (lz4, zstd, blosc...) if available and zlib otherwise.
+
+usage:
+
+write_chunked("data.spimc", SpimData("folder"), chunks = (64,64,64))
+
+d = ChunkedData("data.spimc")
+vol = d[0]
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import os
+import json
+import zlib
+import threading
+import itertools
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+from six.moves import range
+
+import numpy as np
+
+from spimagine.models.data_model import GenericData
+
+META_NAME = "chunked_meta.json"
+
+_FORMAT_NAME = "spimagine-chunked"
+_FORMAT_VERSION = 1
+
+
+def is_chunked_folder(fName):
+    return os.path.isdir(fName) and os.path.exists(os.path.join(fName, META_NAME))
+
+
+############################################################################
+# codecs
+
+class _ZlibCodec(object):
+    def __init__(self, level=1):
+        self.level = level
+
+    def encode(self, buf):
+        return zlib.compress(buf, self.level)
+
+    def decode(self, buf):
+        return zlib.decompress(buf)
+
+
+class _RawCodec(object):
+    def encode(self, buf):
+        return bytes(buf)
+
+    def decode(self, buf):
+        return buf
+
+
+def default_codec():
+    try:
+        import numcodecs
+        numcodecs.get_codec({"id": "lz4"})
+        return "lz4"
+    except Exception:
+        return "zlib"
+
+
+def get_codec(name):
+    """returns an object with encode(bytes) and decode(bytes) for the codec name"""
+    if name == "zlib":
+        return _ZlibCodec()
+    elif name == "raw":
+        return _RawCodec()
+    else:
+        try:
+            import numcodecs
+        except ImportError:
+            raise ImportError("codec '%s' needs numcodecs (pip install numcodecs)" % name)
+        return numcodecs.get_codec({"id": name})
+
+
+############################################################################
+# chunk grid
+
+def _chunk_grid(shape, chunks):
+    """the number of chunks along every dimension"""
+    return tuple(int(np.ceil(1. * s / c)) for s, c in zip(shape, chunks))
+
+
+def _chunk_slices(idx, shape, chunks):
+    return tuple(slice(i * c, min((i + 1) * c, s)) for i, s, c in zip(idx, shape, chunks))
+
+
+def _downsample(data, factor=2):
+    """mean binning by factor along every axis (dimensions are cropped to multiples of factor)"""
+    new_shape = tuple(max(1, s // factor) for s in data.shape)
+    f = tuple(min(factor, s) for s in data.shape)
+    cropped = data[tuple(slice(0, n * _f) for n, _f in zip(new_shape, f))]
+    res = cropped.reshape((new_shape[0], f[0], new_shape[1], f[1], new_shape[2], f[2]))
+    res = res.mean(axis=(1, 3, 5))
+    if np.issubdtype(data.dtype, np.integer):
+        res = np.round(res)
+    return res.astype(data.dtype, copy=False)
+
+
+def _encode_volume(data, chunks, codec):
+    """returns the offset table and the list of compressed chunks"""
+    grid = _chunk_grid(data.shape, chunks)
+    payloads = []
+    for idx in itertools.product(*[range(g) for g in grid]):
+        chunk = np.ascontiguousarray(data[_chunk_slices(idx, data.shape, chunks)])
+        payloads.append(codec.encode(chunk.tobytes()))
+
+    offsets = np.zeros(len(payloads) + 1, np.int64)
+    offsets[1:] = np.cumsum([len(p) for p in payloads])
+    return offsets, payloads
+
+
+def _timepoint_name(fName, level, pos):
+    return os.path.join(fName, "level%i" % level, "t%06d.bin" % pos)
+
+
+############################################################################
+# writing
+
+def write_chunked(fName, data, chunks=(64, 64, 64), codec=None, pyramid=True,
+                  stackUnits=None, n_workers=4):
+    """writes data as chunked container into the folder fName
+
+    Parameters
+    ----------
+    fName: str
+        the output folder
+    data: GenericData or ndarray
+        the 4d (or 3d) data to convert
+    chunks: tuple
+        the chunk shape (z,y,x)
+    codec: str
+        "zlib", "raw" or any numcodecs id (e.g. "lz4", "zstd"), defaults to lz4 if available
+    pyramid: bool
+        if True, additionally stores a 2x downsampled level
+    n_workers: int
+        number of timepoints converted in parallel
+    """
+    if isinstance(data, np.ndarray):
+        from spimagine.models.data_model import NumpyData
+        data = NumpyData(data, stackUnits=stackUnits or [1., 1., 1.])
+
+    if stackUnits is None:
+        stackUnits = data.stackUnits or (1., 1., 1.)
+
+    if codec is None:
+        codec = default_codec()
+
+    stackSize = tuple(int(s) for s in data.size())
+    Nt = stackSize[0]
+    first = np.asarray(data[0])
+    dtype = first.dtype
+
+    levels = [{"shape": list(stackSize[1:]), "factor": 1}]
+    if pyramid:
+        levels.append({"shape": list(_downsample(first).shape), "factor": 2})
+
+    for level in range(len(levels)):
+        d = os.path.join(fName, "level%i" % level)
+        if not os.path.exists(d):
+            os.makedirs(d)
+
+    _codec = get_codec(codec)
+    chunks = tuple(int(c) for c in chunks)
+
+    def _write_timepoint(pos):
+        vol = first if pos == 0 else np.asarray(data[pos])
+        vols = [vol]
+        if pyramid:
+            vols.append(_downsample(vol))
+
+        for level, v in enumerate(vols):
+            offsets, payloads = _encode_volume(v.astype(dtype, copy=False), chunks, _codec)
+            with open(_timepoint_name(fName, level, pos), "wb") as f:
+                f.write(offsets.tobytes())
+                for p in payloads:
+                    f.write(p)
+        logger.debug("written timepoint %s", pos)
+
+    pool = ThreadPool(max(1, n_workers))
+    try:
+        pool.map(_write_timepoint, range(Nt))
+    finally:
+        pool.close()
+        pool.join()
+
+    meta = {"format": _FORMAT_NAME,
+            "version": _FORMAT_VERSION,
+            "stackSize": list(stackSize),
+            "stackUnits": [float(u) for u in stackUnits],
+            "dtype": dtype.str,
+            "chunks": list(chunks),
+            "codec": codec,
+            "levels": levels}
+
+    # the meta file is written last, so an interrupted conversion is not mistaken for a valid container
+    with open(os.path.join(fName, META_NAME), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+############################################################################
+# reading
+
+class ChunkCache(object):
+    """thread safe LRU cache of decoded chunks with a limit on the total bytes held"""
+
+    def __init__(self, max_bytes=512 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            val = self._data.get(key)
+            if val is not None:
+                # mark as recently used
+                self._data.pop(key)
+                self._data[key] = val
+            return val
+
+    def put(self, key, val):
+        with self._lock:
+            if key in self._data:
+                return
+            self._data[key] = val
+            self.nbytes += val.nbytes
+            while self.nbytes > self.max_bytes and len(self._data) > 1:
+                _, old = self._data.popitem(last=False)
+                self.nbytes -= old.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+
+class ChunkedData(GenericData):
+    """data class for the chunked container written by write_chunked
+
+    level selects the resolution level (0 = full resolution, 1 = 2x downsampled...)
+    """
+
+    def __init__(self, fName="", level=0, cache_bytes=512 * 2 ** 20):
+        super(ChunkedData, self).__init__(fName)
+        self.cache = ChunkCache(cache_bytes)
+        self.load(fName, level)
+
+    def load(self, fName, level=0):
+        if fName:
+            try:
+                with open(os.path.join(fName, META_NAME)) as f:
+                    meta = json.load(f)
+                if meta.get("format") != _FORMAT_NAME:
+                    raise ValueError("unknown format %s" % meta.get("format"))
+            except Exception as e:
+                print(e)
+                self.fName = ""
+                raise Exception("couldnt open %s as ChunkedData" % fName)
+
+            self.fName = fName
+            self.meta = meta
+            self.dtype = np.dtype(meta["dtype"])
+            self.chunks = tuple(meta["chunks"])
+            self.codec = get_codec(meta["codec"])
+            self.n_levels = len(meta["levels"])
+            self.set_level(level)
+
+    def set_level(self, level):
+        if level < 0 or level >= self.n_levels:
+            raise ValueError("level should be in [0,%i]" % (self.n_levels - 1))
+        self.level = level
+        info = self.meta["levels"][level]
+        self.levelShape = tuple(info["shape"])
+        self.stackSize = (self.meta["stackSize"][0],) + self.levelShape
+        self.stackUnits = tuple(info["factor"] * u for u in self.meta["stackUnits"])
+        self.grid = _chunk_grid(self.levelShape, self.chunks)
+
+    def _read_offsets(self, f):
+        n = int(np.prod(self.grid)) + 1
+        return np.frombuffer(f.read(8 * n), dtype=np.int64), 8 * n
+
+    def _read_chunks(self, pos, indices):
+        """returns the decoded chunks with flat index in indices (using the cache)"""
+        res = {}
+        missing = []
+        for i in indices:
+            c = self.cache.get((self.level, pos, i))
+            if c is None:
+                missing.append(i)
+            else:
+                res[i] = c
+
+        if missing:
+            grid_idx = list(itertools.product(*[range(g) for g in self.grid]))
+            with open(_timepoint_name(self.fName, self.level, pos), "rb") as f:
+                offsets, start = self._read_offsets(f)
+                for i in sorted(missing):
+                    f.seek(start + offsets[i])
+                    buf = self.codec.decode(f.read(offsets[i + 1] - offsets[i]))
+                    sl = _chunk_slices(grid_idx[i], self.levelShape, self.chunks)
+                    shape = tuple(s.stop - s.start for s in sl)
+                    c = np.frombuffer(buf, dtype=self.dtype).reshape(shape)
+                    self.cache.put((self.level, pos, i), c)
+                    res[i] = c
+        return res
+
+    def get_chunk(self, pos, idx):
+        """the chunk at grid position idx = (iz,iy,ix)"""
+        i = int(np.ravel_multi_index(idx, self.grid))
+        return self._read_chunks(pos, [i])[i]
+
+    def __getitem__(self, pos):
+        if pos < 0 or pos >= self.stackSize[0]:
+            raise IndexError("0 <= pos <= %i, but pos = %i" % (self.stackSize[0] - 1, pos))
+
+        out = np.empty(self.levelShape, self.dtype)
+        grid_idx = list(itertools.product(*[range(g) for g in self.grid]))
+        chunks = self._read_chunks(pos, range(len(grid_idx)))
+        for i, idx in enumerate(grid_idx):
+            out[_chunk_slices(idx, self.levelShape, self.chunks)] = chunks[i]
+        return out
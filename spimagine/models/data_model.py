@@ -30,8 +30,76 @@ import glob
 
 from collections import defaultdict
 import spimagine.utils.imgutils as imgutils
+from spimagine.models.buffer_pool import frame_pool, readinto_array, read_segments_into
+from spimagine.utils.instrumentation import instrumentation
 
-from spimagine.gui.shape_dtype_dialog import ShapeDtypeDialog
+
+def _full_slices(slices):
+    if not isinstance(slices, tuple):
+        slices = (slices,)
+    return slices + (slice(None),) * (3 - len(slices))
+
+
+def _memmap_roi(fName, dtype, shape, offset, slices):
+    """reads the region slices of the raw stack of given shape stored at offset in fName
+    (only the bytes that are needed are touched)"""
+    m = np.memmap(fName, dtype=dtype, mode="r", offset=offset, shape=tuple(shape))
+    return np.array(m[_full_slices(slices)])
+
+
+def _planes_roi(read_planes, Nz, slices):
+    """the region slices of a stack, that is read plane by plane via read_planes(zs)"""
+    slices = _full_slices(slices)
+    if isinstance(slices[0], slice):
+        zs = list(range(Nz))[slices[0]]
+        return read_planes(zs)[(slice(None),) + slices[1:]]
+    else:
+        z = range(Nz)[slices[0]]
+        return read_planes([z])[(0,) + slices[1:]]
+
+
+def _tiff_roi(fName, shape, slices):
+    def _read(zs):
+        planes = imgutils.readTiffPlanes(fName, zs, shape[0])
+        if planes is None:
+            planes = np.squeeze(imgutils.read3dTiff(fName)).reshape(shape)[zs]
+        return planes
+
+    return _planes_roi(_read, shape[0], slices)
+
+
+def _bounds_slices(bounds, shape):
+    """the slices along z,y,x of the box bounds = (x1,x2,y1,y2,z1,z2) (in [-1,1]) of a stack of shape"""
+    if bounds is None:
+        return tuple(slice(0, n) for n in shape)
+    res = []
+    for (b1, b2), n in zip(np.reshape(bounds, (3, 2))[::-1], shape):
+        i1 = int(np.clip(np.floor(.5 * (min(b1, b2) + 1) * n), 0, n - 1))
+        i2 = int(np.clip(np.ceil(.5 * (max(b1, b2) + 1) * n), i1 + 1, n))
+        res.append(slice(i1, i2))
+    return tuple(res)
+
+
+def _bin(data, binning, mode="mean"):
+    """bins data with blocks of size binning = (bz,by,bx), with mode = "mean" or "max"
+
+    incomplete blocks at the end of every axis are dropped, the dtype is kept
+    """
+    if mode not in ("mean", "max"):
+        raise ValueError("mode should be 'mean' or 'max' (is %s)" % mode)
+    binning = tuple(int(b) for b in binning)
+    if all(b == 1 for b in binning):
+        return data
+    shape = [max(1, n // b) for n, b in zip(data.shape, binning)]
+    binning = [min(b, n) for n, b in zip(data.shape, binning)]
+    data = data[tuple(slice(0, n * b) for n, b in zip(shape, binning))]
+    blocks = data.reshape(sum(([n, b] for n, b in zip(shape, binning)), []))
+    if mode == "max":
+        return blocks.max(axis=(1, 3, 5))
+    res = blocks.mean(axis=(1, 3, 5), dtype=np.float32)
+    if np.issubdtype(data.dtype, np.integer):
+        res = np.rint(res)
+    return res.astype(data.dtype, copy=False)
 
 
 def absPath(myPath):
@@ -64,6 +132,9 @@ class GenericData(object):
     """
     dataFileError = Exception("not a valid file")
 
+    # whether a timepoint stays the same once read (and hence can be cached by the DataModel)
+    cacheable = True
+
     def __init__(self, name=""):
         self.stackSize = None
         self.stackUnits = None
@@ -80,6 +151,29 @@ class GenericData(object):
 
     def __getitem__(self, pos):
         return None
+
+    def release(self, data):
+        """called when the frame data (as returned by __getitem__) is not needed anymore,
+        buffers that came from the frame pool are reused"""
+        return frame_pool.release(data)
+
+    def get_roi(self, pos, slices):
+        """returns the region slices (a tuple of slices/indices along z,y,x) of timepoint pos
+
+        containers that can read parts of a stack without loading all of it overwrite this
+        """
+        return self[pos][_full_slices(slices)]
+
+    def get_slice(self, pos, dim, index):
+        """returns the 2d plane at index along the axis dim (0 = z, 1 = y, 2 = x) of timepoint pos"""
+        slices = [slice(None)] * 3
+        slices[dim] = index
+        return self.get_roi(pos, tuple(slices))
+
+    def _check_pos(self, pos):
+        if pos < 0 or pos >= self.stackSize[0]:
+            raise IndexError("0 <= pos <= %i, but pos = %i" % (self.stackSize[0] - 1, pos))
+
         # #this should be override by every derived class
         # def _get_single_item(self,i):
         #     return None
@@ -139,13 +233,17 @@ class SpimData(GenericData):
             # use int64 for bigger files
             offset = np.int64(2) * pos * voxels
 
-            with open(os.path.join(self.fName, "data/data.bin"), "rb") as f:
-                f.seek(offset)
-                return np.fromfile(f, dtype="<u2",
-                                   count=voxels).reshape(self.stackSize[1:])
+            out = frame_pool.acquire(self.stackSize[1:], "<u2")
+            return readinto_array(os.path.join(self.fName, "data/data.bin"), out, offset)
         else:
             return None
 
+    def get_roi(self, pos, slices):
+        self._check_pos(pos)
+        offset = np.int64(2) * pos * np.prod(self.stackSize[1:])
+        return _memmap_roi(os.path.join(self.fName, "data/data.bin"), "<u2",
+                           self.stackSize[1:], offset, slices)
+
 
 class Img2dData(GenericData):
     """2d image data"""
@@ -229,18 +327,19 @@ class RawData(GenericData):
             try:
                 print(shape, dtype)
                 if shape is None or dtype is None:
+                    # the dialog needs QtWidgets, so only import it here
+                    from spimagine.gui.shape_dtype_dialog import ShapeDtypeDialog
                     shape, dtype, ok = ShapeDtypeDialog.get_properties()
                     if not ok:
                         return None
 
-                data = np.fromfile(fname, dtype=dtype)
-
                 if len(shape) < 4:
-                    shape = (1,) * (len(shape) - 4) + shape
+                    shape = (1,) * (4 - len(shape)) + tuple(shape)
                 elif len(shape)>4:
                     raise ValueError("shape should have length of 4!")
 
-                self.data = data.reshape(shape)
+                # memory mapped, so single planes can be read without loading everything
+                self.data = np.memmap(fname, dtype=dtype, mode="r", shape=tuple(shape))
                 self.stackSize = shape
 
             except Exception as e:
@@ -254,10 +353,14 @@ class RawData(GenericData):
 
     def __getitem__(self, pos):
         if self.stackSize and self.fName:
-            return self.data[pos]
+            return np.array(self.data[pos])
         else:
             return None
 
+    def get_roi(self, pos, slices):
+        self._check_pos(pos)
+        return np.array(self.data[pos][_full_slices(slices)])
+
 
 class RawMultipleFiles(GenericData):
     """2/3d raw data inside a folder"""
@@ -276,6 +379,8 @@ class RawMultipleFiles(GenericData):
             try:
 
                 if shape is None or dtype is None:
+                    # the dialog needs QtWidgets, so only import it here
+                    from spimagine.gui.shape_dtype_dialog import ShapeDtypeDialog
                     shape, dtype, ok = ShapeDtypeDialog.get_properties()
                     if not ok:
                         return None
@@ -300,8 +405,8 @@ class RawMultipleFiles(GenericData):
     def __getitem__(self, pos):
         if len(self.fnames) > 0 and pos < len(self.fnames):
             try:
-                data = np.fromfile(self.fnames[pos], dtype=self.dtype)
-                data = data.reshape(self.stackSize[1:])
+                data = frame_pool.acquire(self.stackSize[1:], self.dtype)
+                readinto_array(self.fnames[pos], data)
 
             except Exception as e:
                 print(e)
@@ -309,6 +414,10 @@ class RawMultipleFiles(GenericData):
 
             return data
 
+    def get_roi(self, pos, slices):
+        self._check_pos(pos)
+        return _memmap_roi(self.fnames[pos], self.dtype, self.stackSize[1:], 0, slices)
+
 
 class TiffFolderData(GenericData):
     """3d tiff data inside a folder"""
@@ -351,14 +460,24 @@ class TiffFolderData(GenericData):
     def __getitem__(self, pos):
         if len(self.fNames) > 0 and pos < len(self.fNames):
             try:
-                data = np.squeeze(imgutils.read3dTiff(self.fNames[pos]))
-                data = data.reshape(self.stackSize[1:])
+                segments, dtype = imgutils.tiffDataSegments(self.fNames[pos])
+                if segments is not None:
+                    # uncompressed data can be read straight into a pooled buffer
+                    data = frame_pool.acquire(self.stackSize[1:], dtype)
+                    read_segments_into(self.fNames[pos], data, segments)
+                else:
+                    data = np.squeeze(imgutils.read3dTiff(self.fNames[pos]))
+                    data = data.reshape(self.stackSize[1:])
             except Exception as e:
                 print(e)
                 return None
 
             return data
 
+    def get_roi(self, pos, slices):
+        self._check_pos(pos)
+        return _tiff_roi(self.fNames[pos], self.stackSize[1:], slices)
+
 
 class TiffMultipleFiles(GenericData):
     """2/3d tiff data inside a folder"""
@@ -403,6 +522,10 @@ class TiffMultipleFiles(GenericData):
 
             return data
 
+    def get_roi(self, pos, slices):
+        self._check_pos(pos)
+        return _tiff_roi(self.fNames[pos], self.stackSize[1:], slices)
+
 
 class NumpyData(GenericData):
     def __init__(self, data, stackUnits=[1., 1., 1.], copy = False):
@@ -456,9 +579,9 @@ class DemoData(GenericData):
             R2 = np.sqrt((X - .4) ** 2 + (Y + .2) ** 2 + Z ** 2)
             phi = np.arctan2(Z, Y)
             theta = np.arctan2(X, np.sqrt(Y ** 2 + Z ** 2))
-            u = np.exp(-500 * (R - 1.) ** 2) * np.sum(np.exp(-150 * (-theta - t + .1 * (t - np.pi / 2.) *
-                                                                     np.exp(-np.sin(2 * (phi + np.pi / 2.)))) ** 2)
-                                                      for t in np.linspace(-np.pi / 2., np.pi / 2., 10)) * (1 + Z)
+            u = np.exp(-500 * (R - 1.) ** 2) * sum(np.exp(-150 * (-theta - t + .1 * (t - np.pi / 2.) *
+                                                                  np.exp(-np.sin(2 * (phi + np.pi / 2.)))) ** 2)
+                                                   for t in np.linspace(-np.pi / 2., np.pi / 2., 10)) * (1 + Z)
 
             u2 = np.exp(-7 * R2 ** 2)
             self.data = (10000 * (u + 2 * u2)).astype(np.float32)
@@ -508,11 +631,45 @@ class XwingData(GenericData):
 
             pos = max(0, min(pos, self.stackSize[0] - 1))
 
-            with open(self._stack_names[pos], "rb") as f:
-                return np.fromfile(f, dtype="<u2").reshape(self.stackSize[1:])
+            out = frame_pool.acquire(self.stackSize[1:], "<u2")
+            return readinto_array(self._stack_names[pos], out)
         else:
             return None
 
+    def get_roi(self, pos, slices):
+        self._check_pos(pos)
+        return _memmap_roi(self._stack_names[pos], "<u2", self.stackSize[1:], 0, slices)
+
+
+class ReducedData(GenericData):
+    """a cropped and binned view of another data container
+
+    only the region within bounds (box bounds (x1,x2,y1,y2,z1,z2) in [-1,1]) of every
+    timepoint is read, which is then binned by binning = (bz,by,bx) with mode "mean" or "max"
+    the stack units are scaled accordingly
+    """
+
+    def __init__(self, dataContainer, bounds=None, binning=(1, 1, 1), mode="mean"):
+        GenericData.__init__(self, dataContainer.name)
+        self.dataContainer = dataContainer
+        self.cacheable = dataContainer.cacheable
+        self.bounds = bounds
+        self.binning = tuple(int(b) for b in binning)
+        self.mode = mode
+        if any(b < 1 for b in self.binning):
+            raise ValueError("binning should be >= 1 (is %s)" % str(binning))
+
+        size = dataContainer.size()
+        self.slices = _bounds_slices(bounds, size[1:])
+        shape = [max(1, (sl.stop - sl.start) // b) for sl, b in zip(self.slices, self.binning)]
+        self.stackSize = (size[0],) + tuple(shape)
+
+        units = dataContainer.stackUnits or (1., 1., 1.)
+        self.stackUnits = tuple(u * b for u, b in zip(units, self.binning[::-1]))
+
+    def __getitem__(self, pos):
+        return _bin(self.dataContainer.get_roi(pos, self.slices), self.binning, self.mode)
+
 
 class EmptyData(GenericData):
     def __init__(self):
@@ -602,6 +759,8 @@ class DataLoadThread(QtCore.QThread):
     def __init__(self, _rwLock, nset=set(), data=None, dataContainer=None):
         QtCore.QThread.__init__(self)
         self._rwLock = _rwLock
+        self.processors = []
+        self.pipeline = None
         if nset and data and dataContainer:
             self.load(nset, data, dataContainer)
 
@@ -610,6 +769,35 @@ class DataLoadThread(QtCore.QThread):
         self.data = data
         self.dataContainer = dataContainer
 
+    def process(self):
+        """runs the processors on the prefetched timepoints that arent processed yet"""
+        self._rwLock.lockForRead()
+        procs = list(self.processors)
+        nset = list(self.nset)
+        self._rwLock.unlock()
+
+        if not procs or self.pipeline is None:
+            return
+
+        for k in nset:
+            if self.stopped:
+                return
+            if self.pipeline.cached(procs, k) is not None:
+                continue
+            self._rwLock.lockForRead()
+            data = self.data.get(k)
+            self._rwLock.unlock()
+            if data is not None:
+                logger.debug("processing %s", k)
+                self.pipeline.apply(data, procs, timepoint=k, frames=self.frame)
+
+    def frame(self, pos):
+        """the raw data of pos, from the prefetched ones if possible"""
+        self._rwLock.lockForRead()
+        data = self.data.get(pos)
+        self._rwLock.unlock()
+        return data if data is not None else self.dataContainer[pos]
+
     def run(self):
         import time
 
@@ -623,16 +811,21 @@ class DataLoadThread(QtCore.QThread):
             dnset = set(self.nset).difference(kset)
 
             for k in dkset:
-                del (self.data[k])
+                # hand the buffer back for reuse
+                self.dataContainer.release(self.data.pop(k))
 
             self._rwLock.unlock()
 
             if dnset:
                 logger.debug("preloading %s", list(dnset))
                 for k in dnset:
-                    newdata = self.dataContainer[k]
+                    container = self.dataContainer
+                    with instrumentation.span("prefetch", pos=k):
+                        newdata = container[k]
                     self._rwLock.lockForWrite()
-                    self.data[k] = newdata
+                    # the container might have been switched in the meantime
+                    if container is self.dataContainer:
+                        self.data[k] = newdata
                     self._rwLock.unlock()
                     logger.debug("preload: %s", k)
                     try:
@@ -640,6 +833,11 @@ class DataLoadThread(QtCore.QThread):
                     except Exception as e:
                         print(e)
 
+            try:
+                self.process()
+            except Exception as e:
+                logger.warning("processing failed: %s", e)
+
             # print "load thead dict length: ", len(self.data.keys())
 
             try:
@@ -651,19 +849,34 @@ class DataLoadThread(QtCore.QThread):
 class DataModel(QtCore.QObject):
     """the data model
     emits signals when source/time position has changed
+
+    containers that are written to while shown (with a seq() method counting the frames,
+    e.g. SharedMemoryData) are polled every pollInterval ms and _dataChanged is
+    emitted whenever new frames arrived
     """
     _dataSourceChanged = QtCore.pyqtSignal()
     _dataPosChanged = QtCore.pyqtSignal(int)
+    _dataReductionChanged = QtCore.pyqtSignal(float, float, float)
+    _dataChanged = QtCore.pyqtSignal()
 
     _rwLock = QtCore.QReadWriteLock()
 
+    pollInterval = 50
+
     def __init__(self, dataContainer=None, prefetchSize=0):
         assert prefetchSize >= 0
 
         super(DataModel, self).__init__()
+        # the active processors (applied in the background to prefetched timepoints)
+        self.processors = []
+        self.pipeline = None
         self.dataLoadThread = DataLoadThread(self._rwLock)
+        self.dataLoadThread.processors = self.processors
         self._dataSourceChanged.connect(self.dataSourceChanged)
         self._dataPosChanged.connect(self.dataPosChanged)
+        self._seq = None
+        self._pollTimer = QtCore.QTimer(self)
+        self._pollTimer.timeout.connect(self.poll)
         if dataContainer:
             self.setContainer(dataContainer, prefetchSize)
 
@@ -674,17 +887,95 @@ class DataModel(QtCore.QObject):
         return d
 
     def setContainer(self, dataContainer=None, prefetchSize=0):
+        self._setContainer(dataContainer, prefetchSize)
+        if self.dataContainer:
+            self._dataSourceChanged.emit()
+            self.setPos(0)
+
+    def _setContainer(self, dataContainer, prefetchSize):
         self.dataContainer = dataContainer
         self.prefetchSize = prefetchSize
-        self.nset = [0]
+        # timepoints of non cacheable containers are always read anew
+        self.nset = [0] if self._cacheable() else []
         self.data = defaultdict(lambda: None)
 
+        if self.pipeline is not None:
+            self.pipeline.invalidate()
+
+        self._seq = self._containerSeq()
+        if self._seq is None:
+            self._pollTimer.stop()
+        elif QtCore.QCoreApplication.instance() is not None:
+            self._pollTimer.start(self.pollInterval)
+
         if self.dataContainer:
-            self.stopDataLoadThread()
+            # a running thread just switches over to the new container
+            # (restarting it would race with its own shutdown)
+            self._rwLock.lockForWrite()
             self.dataLoadThread.load(self.nset, self.data, self.dataContainer)
-            self.dataLoadThread.start(priority=QtCore.QThread.LowPriority)
-            self._dataSourceChanged.emit()
-            self.setPos(0)
+            self.dataLoadThread.stopped = False
+            self._rwLock.unlock()
+            if not self.dataLoadThread.isRunning():
+                self.dataLoadThread.start(priority=QtCore.QThread.LowPriority)
+
+    def baseContainer(self):
+        """the data container without crop/binning"""
+        if isinstance(self.dataContainer, ReducedData):
+            return self.dataContainer.dataContainer
+        return self.dataContainer
+
+    def reduction(self):
+        """the current (bounds, binning, mode), see setReduction"""
+        if isinstance(self.dataContainer, ReducedData):
+            c = self.dataContainer
+            return c.bounds, c.binning, c.mode
+        return None, (1, 1, 1), "mean"
+
+    def setReduction(self, bounds=None, binning=(1, 1, 1), mode="mean"):
+        """crops every timepoint to the box bounds (x1,x2,y1,y2,z1,z2) in [-1,1] (of the full stack)
+        and bins it by binning = (bz,by,bx) with mode "mean" or "max"
+
+        only the cropped region is read, processed and uploaded, the stack units
+        are scaled by the binning. Emits _dataReductionChanged with the factors
+        (x,y,z) the stack units changed by (the time position is kept)
+        """
+        base = self.baseContainer()
+        if base is None:
+            return
+        _, oldBinning, _ = self.reduction()
+
+        if bounds is None and all(int(b) == 1 for b in binning):
+            container = base
+        else:
+            container = ReducedData(base, bounds, binning, mode)
+
+        pos = getattr(self, "pos", 0)
+        self._setContainer(container, self.prefetchSize)
+        self.prefetch(pos)
+        factors = [1. * b / b0 for b, b0 in zip(self.reduction()[1], oldBinning)][::-1]
+        self._dataReductionChanged.emit(*factors)
+
+    def _cacheable(self):
+        return getattr(self.dataContainer, "cacheable", True)
+
+    def _containerSeq(self):
+        base = self.baseContainer()
+        return base.seq() if hasattr(base, "seq") else None
+
+    def poll(self):
+        """checks whether the container got new frames and emits _dataChanged if so
+
+        returns True if the data has changed
+        """
+        seq = self._containerSeq()
+        if seq is None or seq == self._seq:
+            return False
+        self._seq = seq
+        logger.debug("new frames (seq = %s)", seq)
+        if self.pipeline is not None:
+            self.pipeline.invalidate()
+        self._dataChanged.emit()
+        return True
 
     def __repr__(self):
         return "DataModel: %s \t %s" % (self.dataContainer.name, self.size())
@@ -697,8 +988,11 @@ class DataModel(QtCore.QObject):
 
     def stopDataLoadThread(self):
         self.dataLoadThread.stopped = True
+        self._pollTimer.stop()
 
     def prefetch(self, pos):
+        if not self._cacheable():
+            return
         self._rwLock.lockForWrite()
         self.nset[:] = self.neighborhood(pos)
         self._rwLock.unlock()
@@ -735,13 +1029,18 @@ class DataModel(QtCore.QObject):
             print("something is wrong in datamodel as its lacking a 'data' atttribute!")
             return None
 
+        if not self._cacheable():
+            with instrumentation.span("load", pos=pos):
+                return self.dataContainer[pos]
+
         # switching of the prefetched version for now...
         # as for some instances there seems to be a race condition still
 
         self._rwLock.lockForWrite()
 
         if pos not in self.data:
-            newdata = self.dataContainer[pos]
+            with instrumentation.span("load", pos=pos):
+                newdata = self.dataContainer[pos]
             self.data[pos] = newdata
         else:
             newdata = self.data[pos]
@@ -751,38 +1050,105 @@ class DataModel(QtCore.QObject):
         self.prefetch(pos)
         return newdata
 
+    def setProcessors(self, processors, max_bytes=2 ** 30):
+        """sets the list of active ImageProcessors
+
+        prefetched timepoints are processed in the background and the results are cached
+        (results of processors whose parameters changed in the meantime are not reused)
+        """
+        if self.pipeline is None:
+            from spimagine.models.image_pipeline import ImagePipeline
+            self.pipeline = ImagePipeline(max_bytes)
+            self.dataLoadThread.pipeline = self.pipeline
+
+        self._rwLock.lockForWrite()
+        self.processors[:] = processors
+        self._rwLock.unlock()
+
+    def getProcessed(self, pos):
+        """the timepoint pos with the active processors applied"""
+        if not self.processors:
+            return self[pos]
+
+        procs = list(self.processors)
+        res = self.pipeline.cached(procs, pos)
+        if res is None:
+            res = self.pipeline.apply(self[pos], procs, timepoint=pos, frames=self.dataLoadThread.frame)
+        else:
+            self.prefetch(pos)
+        return res
+
+    def _cached(self, pos):
+        self._rwLock.lockForRead()
+        data = self.data.get(pos) if hasattr(self, "data") else None
+        self._rwLock.unlock()
+        return data
+
+    def get_roi(self, pos, slices):
+        """the region slices of timepoint pos (only that part is read if pos is not cached)"""
+        data = self._cached(pos)
+        if data is not None:
+            return data[_full_slices(slices)]
+        else:
+            return self.dataContainer.get_roi(pos, slices)
+
+    def get_slice(self, pos, dim, index):
+        """the 2d plane at index along axis dim (0 = z, 1 = y, 2 = x) of timepoint pos"""
+        data = self._cached(pos)
+        if data is not None:
+            return np.take(data, index, axis=dim)
+        else:
+            return self.dataContainer.get_slice(pos, dim, index)
+
     def neighborhood(self, pos):
         # FIXME mod stackSize!
         return np.arange(pos, pos + self.prefetchSize + 1) % self.sizeT()
 
     def loadFromPath(self, fName, prefetchSize=0):
-        print(fName)
-        if isinstance(fName, (tuple, list)):
-
-            if re.match(".*\.(tif|tiff)", fName[0]):
-                print("heye")
-                self.setContainer(TiffMultipleFiles(fName), prefetchSize)
-            elif re.match(".*\.(raw)", fName[0]):
-                self.setContainer(RawMultipleFiles(fName), prefetchSize=0)
-
-        elif re.match(".*\.(tif|tiff)", fName):
-            self.setContainer(TiffData(fName), prefetchSize=0)
-        elif re.match(".*\.(raw)", fName):
-            self.setContainer(RawData(fName), prefetchSize=0)
-        elif re.match(".*\.(png|jpg|bmp)", fName):
-            self.setContainer(Img2dData(fName), prefetchSize=0)
-        # elif re.match(".*\.h5",fName):
-        #     self.setContainer(HDF5Data(fName),prefetchSize = 0)
-        elif re.match(".*\.czi", fName):
-            self.setContainer(CZIData(fName), prefetchSize=0)
-        elif os.path.isdir(fName):
-            if os.path.exists(os.path.join(fName, "metadata.txt")):
-                self.setContainer(SpimData(fName), prefetchSize)
-            elif os.path.exists(os.path.join(fName, "default.index.txt")):
-                self.setContainer(XwingData(fName), prefetchSize)
-            else:
-                self.setContainer(TiffFolderData(fName), prefetchSize=prefetchSize)
+        container = containerFromPath(fName)
+        # containers that hold all the data in memory anyway dont need prefetching
+        if not isinstance(container, _prefetchable_containers()):
+            prefetchSize = 0
+        self.setContainer(container, prefetchSize)
+
+
+def _prefetchable_containers():
+    from spimagine.models.chunked_data import ChunkedData
+    return (TiffMultipleFiles, SpimData, XwingData, TiffFolderData, ChunkedData)
+
+
+def containerFromPath(fName):
+    """returns the GenericData container that fits the file/folder (or list of files) fName"""
+    logger.debug("opening %s", fName)
+    if isinstance(fName, (tuple, list)):
+
+        if re.match(".*\.(tif|tiff)", fName[0]):
+            return TiffMultipleFiles(fName)
+        elif re.match(".*\.(raw)", fName[0]):
+            return RawMultipleFiles(fName)
+
+    elif re.match(".*\.(tif|tiff)", fName):
+        return TiffData(fName)
+    elif re.match(".*\.(raw)", fName):
+        return RawData(fName)
+    elif re.match(".*\.(png|jpg|bmp)", fName):
+        return Img2dData(fName)
+    # elif re.match(".*\.h5",fName):
+    #     return HDF5Data(fName)
+    elif re.match(".*\.czi", fName):
+        return CZIData(fName)
+    elif os.path.isdir(fName):
+        from spimagine.models.chunked_data import is_chunked_folder, ChunkedData
+        if is_chunked_folder(fName):
+            return ChunkedData(fName)
+        elif os.path.exists(os.path.join(fName, "metadata.txt")):
+            return SpimData(fName)
+        elif os.path.exists(os.path.join(fName, "default.index.txt")):
+            return XwingData(fName)
+        else:
+            return TiffFolderData(fName)
 
+    raise ValueError("could not find a data container for %s" % str(fName))
 
 if __name__ == '__main__':
     pass
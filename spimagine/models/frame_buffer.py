@@ -0,0 +1,105 @@
+"""
+a sliding window over the last frames of a timelapse
+
+the window [t-size+1, t] is kept in memory together with the running sum of its frames,
+which is updated incrementally: advancing by one timepoint removes the oldest
+and adds the newest frame instead of summing over the whole window again.
+Frames already in the window are never requested again, frames that are missing
+are fetched with a callable frames(t) (e.g. from the DataModel cache).
+
+usage:
+
+buf = FrameRingBuffer()
+buf.update(t, 5, frames)
+mean = buf.mean()
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class FrameRingBuffer(object):
+    """the frames of the window [t-size+1, t] (clipped at 0) and their running sum
+
+    key identifies the source of the frames, if it changes the window is refilled
+    """
+
+    def __init__(self, keep_sum=True):
+        self.keep_sum = keep_sum
+        self.frames = OrderedDict()
+        self.sum = None
+        self.key = None
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.frames)
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.sum = None
+
+    def timepoints(self):
+        return sorted(self.frames)
+
+    def _add(self, t, frame):
+        frame = np.asarray(frame, dtype=np.float32)
+        if self.frames and frame.shape != next(iter(self.frames.values())).shape:
+            logger.debug("frame shape changed, clearing the window")
+            self.clear()
+        self.frames[t] = frame
+        if self.keep_sum:
+            if self.sum is None:
+                self.sum = frame.astype(np.float64)
+            else:
+                self.sum += frame
+
+    def _remove(self, t):
+        frame = self.frames.pop(t)
+        if self.keep_sum:
+            if self.frames:
+                self.sum -= frame
+            else:
+                self.sum = None
+
+    def update(self, t, size, frames, key=None, current=None):
+        """moves the window to [t-size+1, t]
+
+        frames(s) returns the frame of timepoint s, current (if given) is the frame of t
+        """
+        if size < 1:
+            raise ValueError("size should be >= 1 (is %s)" % size)
+
+        window = range(max(0, t - size + 1), t + 1)
+
+        with self.lock:
+            if key != self.key:
+                self.clear()
+                self.key = key
+
+            for s in [s for s in self.frames if s not in window]:
+                self._remove(s)
+
+            for s in window:
+                if s not in self.frames:
+                    self._add(s, current if (s == t and current is not None) else frames(s))
+
+    def mean(self):
+        """the mean of the frames in the window"""
+        with self.lock:
+            if self.sum is None:
+                raise ValueError("the window is empty")
+            return (self.sum / len(self.frames)).astype(np.float32)
+
+    def stack(self):
+        """the frames of the window in temporal order as an array of shape (n,)+frame.shape"""
+        with self.lock:
+            return np.stack([self.frames[s] for s in sorted(self.frames)])
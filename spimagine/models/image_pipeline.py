@@ -0,0 +1,159 @@
+"""
+a memoizing pipeline for chains of ImageProcessors
+
+the output of every stage is cached, keyed by the timepoint and the
+(processor, parameters) of that stage and all stages before it.
+Changing the parameters of a stage therefore only recomputes that stage and the ones after it,
+e.g. tweaking the last filter of a blur -> fft chain reuses the cached blur.
+
+usage:
+
+pipe = ImagePipeline(max_bytes = 2**30)
+out = pipe.apply(data, [BlurProcessor(), FFTProcessor()], timepoint = 0)
+
+processors must not modify their input in place, as it might be a cached result.
+Parameters might be changed (from the gui) while a stage runs, its result is then not cached
+under the old parameters (the stage key is checked again after applying it)
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from spimagine.models.imageprocessor import apply_processors, to_device, to_host
+from spimagine.utils.instrumentation import instrumentation
+
+
+def _hashable(val):
+    try:
+        hash(val)
+        return val
+    except TypeError:
+        if isinstance(val, np.ndarray):
+            return (val.shape, val.dtype.str, val.tobytes())
+        return repr(val)
+
+
+def stage_key(proc):
+    """the cache key of a single processor with its current parameters"""
+    params = tuple(sorted((k, _hashable(v)) for k, v in proc.kwargs.items()))
+    return (id(proc), proc.name, params)
+
+
+class ImagePipeline(object):
+    """applies a list of processors, caching the output of every stage
+
+    max_bytes is the memory budget for the cached results (least recently used are evicted first)
+    """
+
+    def __init__(self, max_bytes=2 ** 30):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # bumped on invalidate, so that temporal processors refill their windows
+        self._generation = 0
+
+    def _get(self, key):
+        with self._lock:
+            res = self._cache.pop(key, None)
+            if res is not None:
+                self._cache[key] = res
+            return res
+
+    def _put(self, key, res):
+        nbytes = getattr(res, "nbytes", 0)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = res
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, old = self._cache.popitem(last=False)
+                self.nbytes -= getattr(old, "nbytes", 0)
+
+    @staticmethod
+    def _keys(processors, timepoint):
+        # the key of a stage includes all the stages before it
+        keys, chain = [], ()
+        for p in processors:
+            chain = chain + (stage_key(p),)
+            keys.append((timepoint, chain))
+        return keys
+
+    def cached(self, processors, timepoint):
+        """the cached final result of processors for timepoint (with their current parameters) or None"""
+        if len(processors) == 0:
+            return None
+        return self._get(self._keys(processors, timepoint)[-1])
+
+    def apply(self, data, processors, timepoint=None, frames=None):
+        """runs data through the processors
+
+        if timepoint is None, nothing is cached
+        consecutive gpu processors keep the data on the device (and their results are cached there),
+        so the result is an OCLArray if the last processor is a gpu one
+
+        frames(t) should return the (unprocessed) data of timepoint t, it is needed by temporal processors
+        to fill their window (with the cached outputs of the stages before them)
+        """
+        if timepoint is None:
+            return apply_processors(data, processors)
+
+        keys = self._keys(processors, timepoint)
+
+        # find the last stage that is cached already
+        start, res = 0, data
+        for i in range(len(keys) - 1, -1, -1):
+            cached = self._get(keys[i])
+            if cached is not None:
+                start, res = i + 1, cached
+                break
+
+        if start > 0:
+            logger.debug("reusing %i cached stages for timepoint %s", start, timepoint)
+
+        # whether the parameters of a stage changed while it was applied
+        stale = False
+        for i in range(start, len(processors)):
+            p = processors[i]
+            res = to_device(res) if p.is_gpu else to_host(res)
+            with instrumentation.span("process: %s" % p.name, timepoint=timepoint):
+                if getattr(p, "is_temporal", False) and frames is not None:
+                    res = p.apply_temporal(res, timepoint, self._upstream(frames, processors[:i]),
+                                           key=(self._generation, keys[i][1][:-1]))
+                else:
+                    res = p.apply(res)
+            stale = stale or stage_key(p) != keys[i][1][-1]
+            if stale:
+                logger.debug("parameters of %s changed while applying it, not caching", p.name)
+            else:
+                self._put(keys[i], res)
+
+        return res
+
+    def _upstream(self, frames, processors):
+        """the function t -> output of processors for timepoint t"""
+        if not processors:
+            return frames
+        return lambda t: to_host(self.apply(frames(t), processors, timepoint=t, frames=frames))
+
+    def invalidate(self, timepoint=None):
+        """removes all cached results (of timepoint if given)"""
+        with self._lock:
+            self._generation += 1
+            if timepoint is None:
+                self._cache.clear()
+                self.nbytes = 0
+            else:
+                for key in [k for k in self._cache if k[0] == timepoint]:
+                    self.nbytes -= getattr(self._cache.pop(key), "nbytes", 0)
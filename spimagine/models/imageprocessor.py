@@ -3,20 +3,49 @@ Implements generic classes for processing of volumetric data
 """
 
 from __future__ import absolute_import, print_function
+import logging
 import sys
 import numpy as np
-import gputools
 from six.moves import zip
+from spimagine.config.config import init_opencl
+from spimagine.utils.recursive_gauss import recursive_gaussian, recursive_gaussian_gpu
+from spimagine.utils.fft_cache import fft_spectrum
+from spimagine.utils.lucy_richardson import lucy_richardson, lucy_richardson_gpu
+from spimagine.models.frame_buffer import FrameRingBuffer
+from spimagine.utils.instrumentation import instrumentation
 
+logger = logging.getLogger(__name__)
 
 
-# try:
-#     import imgtools
-#     import lucy_richardson_gpu
-# except:
-#     print "could not import imgtools or lucy_richardson module"
+def is_device_array(data):
+    """whether data lives on the device (an OCLArray or a plain pyopencl array, as some gputools
+    functions return)
+
+    pyopencl is only imported by the gpu code paths, without it there cant be device arrays
+    """
+    cl_array = sys.modules.get("pyopencl.array")
+    return cl_array is not None and isinstance(data, cl_array.Array)
+
+
+def to_device(data):
+    """uploads data as float32 OCLArray (if it isnt on the device already)"""
+    if is_device_array(data):
+        return data
+    init_opencl()
+    from gputools import OCLArray
+    return OCLArray.from_array(np.ascontiguousarray(data, dtype=np.float32))
+
+
+def to_host(data):
+    if is_device_array(data):
+        return data.get()
+    return data
+
 
 class ImageProcessor(object):
+    # if True, apply() accepts and returns OCLArrays
+    is_gpu = False
+
     def __init__(self,name = "",**kwargs):
         self.name = name
         self.set_params(**kwargs)
@@ -28,11 +57,49 @@ class ImageProcessor(object):
         raise NotImplementedError()
 
     def __getattr__(self,attr):
-        if attr in self.kwargs:
+        if attr != "kwargs" and attr in self.kwargs:
             return self.kwargs[attr]
         else:
-            return super(ImageProcessor,self).__getattr__(attr)
+            return super(ImageProcessor,self).__getattribute__(attr)
+
+    def __setattr__(self, attr, val):
+        # keep kwargs up to date, as they define the cache key of the processor
+        if attr != "kwargs" and attr in self.__dict__.get("kwargs",{}):
+            self.kwargs[attr] = val
+        else:
+            super(ImageProcessor,self).__setattr__(attr, val)
+
+
 
+class GPUImageProcessor(ImageProcessor):
+    """processor that works on the device
+
+    subclasses implement apply_gpu(data_g) that takes and returns an OCLArray,
+    so chains of them keep the data on the device
+    """
+    is_gpu = True
+
+    def apply_gpu(self, data_g):
+        raise NotImplementedError()
+
+    def apply(self, data):
+        """OCLArray -> OCLArray or ndarray -> ndarray"""
+        if is_device_array(data):
+            return self.apply_gpu(data)
+        else:
+            return self.apply_gpu(to_device(data)).get()
+
+
+def apply_processors(data, processors):
+    """applies a chain of processors, data stays on the device between consecutive gpu processors
+
+    the result is an OCLArray if the last processor is a gpu one
+    """
+    for p in processors:
+        data = to_device(data) if p.is_gpu else to_host(data)
+        with instrumentation.span("process: %s" % p.name):
+            data = p.apply(data)
+    return data
 
 
 class CopyProcessor(ImageProcessor):
@@ -44,32 +111,53 @@ class CopyProcessor(ImageProcessor):
         return data
 
 
-class BlurProcessor(ImageProcessor):
+class BlurProcessor(GPUImageProcessor):
 
     def __init__(self,sigma = 4.):
         super(BlurProcessor,self).__init__("blur",sigma = sigma)
 
-    def apply(self,data):
+    def apply_gpu(self,data):
+        import gputools
+        from gputools import OCLArray
         N  = 2*self.sigma+1
         x = np.arange(-N,N+1)
         h = np.exp(-x**2/2./self.sigma**2)
-        h *= 1./sum(h)
-        return gputools.convolve_sep3(data, h, h, h)
+        h_g = OCLArray.from_array((1./sum(h)*h).astype(np.float32))
+        return gputools.convolve_sep3(data, h_g, h_g, h_g)
 
 
-class BlurXYZProcessor(ImageProcessor):
+class BlurXYZProcessor(GPUImageProcessor):
 
     def __init__(self,sx=4.,sy=4.,sz=4.):
         super(BlurXYZProcessor,self).__init__("blur_xyz",sx=sx,sy=sy,sz=sz)
 
-    def apply(self,data):
+    def apply_gpu(self,data):
+        import gputools
+        from gputools import OCLArray
         sigs = (self.sx,self.sy,self.sz)
         Ns  = [2*s+1 for s in sigs]
 
         xs = [np.arange(-N,N+1) for N in Ns]
         hs = [np.exp(-x**2/2./s**2) for x,s in zip(xs,sigs)]
-        hs = [1.*h/sum(h) for h in hs]
-        return gputools.convolve_sep3(data, *hs)
+        hs_g = [OCLArray.from_array((1.*h/sum(h)).astype(np.float32)) for h in hs]
+        return gputools.convolve_sep3(data, *hs_g)
+
+class RecursiveBlurProcessor(GPUImageProcessor):
+    """gaussian blur via recursive filtering, the cost does not grow with sigma"""
+
+    def __init__(self,sigma = 20.):
+        super(RecursiveBlurProcessor,self).__init__("blur_recursive",sigma = sigma)
+
+    def apply_gpu(self,data):
+        return recursive_gaussian_gpu(data, self.sigma)
+
+    def apply(self,data):
+        if is_device_array(data):
+            return self.apply_gpu(data)
+        else:
+            # no transfer needed on the host
+            return recursive_gaussian(data, self.sigma)
+
 
 class NoiseProcessor(ImageProcessor):
     def __init__(self,sigma = 10):
@@ -80,19 +168,14 @@ class NoiseProcessor(ImageProcessor):
 
 
 class FFTProcessor(ImageProcessor):
+    """the centered absolute spectrum (via a cached real fft, see spimagine.utils.fft_cache)"""
     def __init__(self, log = False):
         super(FFTProcessor,self).__init__("fft", log = log)
         self.log = log
 
     def apply(self,data):
-        dshape = data.shape
-        
-        res = gputools.pad_to_power2(data.astype(np.complex64), mode = "wrap")
-
-        res = 1./np.sqrt(res.size)*np.fft.fftshift(abs(gputools.fft(res)))
-        
-        res = gputools.pad_to_shape(res,dshape)
-        
+        res = fft_spectrum(np.asarray(data, dtype=np.float32))
+
         if self.log:
             return np.log2(0.001+res)
         else:
@@ -100,24 +183,81 @@ class FFTProcessor(ImageProcessor):
 
 
 class LucyRichProcessor(ImageProcessor):
+    """richardson lucy deconvolution with a gaussian psf of width rad
 
-    def __init__(self,rad = 4., niter = 6):
-        super(LucyRichProcessor,self).__init__("RL-Deconv",rad = rad, niter = niter)
-        self.rad0 = rad
-        self.niter0 = niter
-        self.hshape = (1,)*3
-
-    def reset_psf(self,dshape):
-        # self.h = imgtools.blur_psf(dshape,self.rad)
-        pass
+    the psf transfer function and the fft buffers are cached per shape (see spimagine.utils.lucy_richardson),
+    if gpu is False or the OpenCL backend fails, the numpy/scipy backend is used
+    """
+    def __init__(self,rad = 2., niter = 6, gpu = True):
+        super(LucyRichProcessor,self).__init__("RL-Deconv",rad = rad, niter = niter, gpu = gpu)
 
     def apply(self,data):
-        if self.hshape != data.shape or self.rad != self.rad0:
-            self.reset_psf(data.shape)
-            self.rad0 = self.rad
+        rad, niter = float(self.rad), int(self.niter)
+        if self.gpu:
+            try:
+                return lucy_richardson_gpu(data, rad, niter)
+            except Exception as e:
+                logger.warning("gpu deconvolution failed (%s), using the numpy backend", e)
+        return lucy_richardson(data, rad, niter)
+
+
+class TemporalProcessor(ImageProcessor):
+    """processor that combines a timepoint with the ones before it
+
+    the last frames are kept in a FrameRingBuffer (see spimagine.models.frame_buffer)
+    that the ImagePipeline advances via apply_temporal, subclasses implement reduce(data, ring)
+    without timepoint (i.e. via apply) the window consists of data alone
+    """
+    is_temporal = True
+    keep_sum = True
+
+    def __init__(self, name = "", window = 5, **kwargs):
+        super(TemporalProcessor,self).__init__(name, window = window, **kwargs)
+        self._ring = FrameRingBuffer(keep_sum = self.keep_sum)
+
+    def reduce(self, data, ring):
+        raise NotImplementedError()
 
-        return data
-        # return lucy_richardson_gpu.lucy_richardson(data, self.h,self.niter)
+    def apply(self, data):
+        ring = FrameRingBuffer(keep_sum = self.keep_sum)
+        ring.update(0, 1, None, current = data)
+        return self.reduce(data, ring)
+
+    def apply_temporal(self, data, timepoint, frames, key = None):
+        """frames(t) returns the input of this processor at timepoint t"""
+        with self._ring.lock:
+            self._ring.update(timepoint, max(1, int(self.window)), frames, key = key, current = data)
+            return self.reduce(data, self._ring)
+
+
+class TemporalMeanProcessor(TemporalProcessor):
+    """running average over the last window timepoints"""
+    def __init__(self, window = 5):
+        super(TemporalMeanProcessor,self).__init__("temporal mean", window = window)
+
+    def reduce(self, data, ring):
+        return ring.mean()
+
+
+class DeltaFProcessor(TemporalProcessor):
+    """dF/F, with F0 the running average over the last window timepoints"""
+    def __init__(self, window = 10):
+        super(DeltaFProcessor,self).__init__("dF/F", window = window)
+
+    def reduce(self, data, ring):
+        f0 = ring.mean()
+        return (np.asarray(data, np.float32) - f0) / (np.abs(f0) + 1.e-6)
+
+
+class TemporalMedianProcessor(TemporalProcessor):
+    """median over the last window timepoints"""
+    keep_sum = False
+
+    def __init__(self, window = 5):
+        super(TemporalMedianProcessor,self).__init__("temporal median", window = window)
+
+    def reduce(self, data, ring):
+        return np.median(ring.stack(), axis = 0).astype(np.float32)
 
 
 class FuncProcessor(ImageProcessor):
@@ -326,8 +326,7 @@ class KeyFrameEncoder(json.JSONEncoder):
         elif isinstance(obj, (
                 KeyFrame,
                 KeyFrameList,
-                TransformData,
-                spimagine.models.transform_model.TransformData)):
+                TransformData)):
             return obj.__dict__
 
         elif isinstance(obj, np.generic):
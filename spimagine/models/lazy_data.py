@@ -0,0 +1,165 @@
+"""
+adapter for lazy array libraries (zarr, h5py, dask...)
+
+any object with .shape, .dtype and numpy like slicing can be wrapped into a
+GenericData container, that only reads a single timepoint at a time.
+Reads are aligned to the chunk layout of the array (if it has one), so every
+chunk is decoded exactly once per timepoint. If several timepoints share a chunk
+(e.g. zarr chunks (4,32,256,256)), the whole t-chunk is read at once and kept
+for the following timepoints, so playback decodes every chunk only once.
+
+usage:
+
+f = h5py.File("data.h5","r")
+volshow(f["data"])
+
+or
+
+m = DataModel(LazyArrayData(zarr.open("data.zarr")), prefetchSize = 2)
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import threading
+import numpy as np
+from six.moves import range
+
+from spimagine.models.data_model import GenericData
+
+
+def is_lazy_array(data):
+    """True if data is a 3d/4d array-like (but not a numpy array) that can be sliced"""
+    if isinstance(data, np.ndarray) or isinstance(data, GenericData):
+        return False
+    return (hasattr(data, "shape") and hasattr(data, "dtype")
+            and hasattr(data, "__getitem__") and len(data.shape) in (3, 4))
+
+
+def _chunk_boundaries(chunks, axis, n):
+    """the chunk boundaries along axis of an array of length n
+
+    chunks is either a tuple of ints (zarr, h5py) or a tuple of tuples (dask)
+    """
+    if chunks is None:
+        return [0, n]
+    c = chunks[axis]
+    if isinstance(c, (tuple, list)):
+        return [0] + list(np.cumsum(c))
+    else:
+        return list(range(0, n, int(c))) + [n]
+
+
+class LazyArrayData(GenericData):
+    """wraps an array-like of dimensions (z,y,x) or (t,z,y,x) without loading it
+
+    min_read_bytes is the minimal size of a single read (consecutive chunk slabs are grouped
+    together up to that size)
+
+    the last decoded t-chunk (if the array is chunked along t) is kept in memory
+    """
+
+    def __init__(self, data, stackUnits=[1., 1., 1.], min_read_bytes=32 * 2 ** 20):
+        GenericData.__init__(self, "LazyArrayData")
+        if not len(data.shape) in (3, 4):
+            raise TypeError("data should be 3 or 4 dimensional! shape = %s" % str(data.shape))
+
+        self.data = data
+        self.ndim = len(data.shape)
+        self.dtype = np.dtype(data.dtype)
+        if self.ndim == 3:
+            self.stackSize = (1,) + tuple(data.shape)
+        else:
+            self.stackSize = tuple(data.shape)
+
+        self.stackUnits = stackUnits
+        self.min_read_bytes = min_read_bytes
+        self._tbounds = self._get_tbounds()
+        self._slabs = self._get_slabs()
+        # (t0, t1, data) of the last t-chunk read
+        self._tchunk = None
+        self._lock = threading.Lock()
+
+    def _get_tbounds(self):
+        """the chunk boundaries along t if several timepoints share a chunk, else None"""
+        chunks = getattr(self.data, "chunks", None)
+        if self.ndim == 3 or chunks is None:
+            return None
+        bounds = [int(b) for b in _chunk_boundaries(chunks, 0, self.stackSize[0])]
+        if len(bounds) - 1 >= self.stackSize[0]:
+            return None
+        return bounds
+
+    def _get_slabs(self):
+        """the z ranges to read at once, aligned to the chunk boundaries"""
+        Nz = self.stackSize[1]
+        axis = self.ndim - 3
+        bounds = _chunk_boundaries(getattr(self.data, "chunks", None), axis, Nz)
+
+        plane_bytes = self.dtype.itemsize * self.stackSize[2] * self.stackSize[3]
+        if self._tbounds is not None:
+            # a slab then spans the whole t-chunk
+            plane_bytes *= max(t1 - t0 for t0, t1 in zip(self._tbounds[:-1], self._tbounds[1:]))
+        slabs = []
+        z0 = 0
+        for z1 in bounds[1:]:
+            if (z1 - z0) * plane_bytes >= self.min_read_bytes or z1 == Nz:
+                slabs.append((z0, z1))
+                z0 = z1
+        return slabs
+
+    def _index(self, pos, *sl):
+        return ((pos,) if self.ndim == 4 else ()) + sl
+
+    def _read(self, sel, out, dest_sel):
+        if hasattr(self.data, "read_direct"):
+            # h5py can decompress straight into our buffer
+            self.data.read_direct(out, source_sel=sel, dest_sel=dest_sel)
+        else:
+            out[dest_sel] = np.asarray(self.data[sel])
+
+    def _read_tchunk(self, pos):
+        """the (t0, t1, data) of the t-chunk that contains pos"""
+        i = np.searchsorted(self._tbounds, pos, side="right") - 1
+        t0, t1 = self._tbounds[i], self._tbounds[i + 1]
+        logger.debug("reading t-chunk [%s,%s)", t0, t1)
+        data = np.empty((t1 - t0,) + tuple(self.stackSize[1:]), self.dtype)
+        for z0, z1 in self._slabs:
+            self._read((slice(t0, t1), slice(z0, z1)), data, np.s_[:, z0:z1])
+        return t0, t1, data
+
+    def __getitem__(self, pos):
+        self._check_pos(pos)
+
+        if self._tbounds is not None:
+            # the prefetch thread and the gui might ask at the same time
+            with self._lock:
+                if self._tchunk is None or not self._tchunk[0] <= pos < self._tchunk[1]:
+                    self._tchunk = self._read_tchunk(pos)
+                t0, _, data = self._tchunk
+                return data[pos - t0].copy()
+
+        out = np.empty(self.stackSize[1:], self.dtype)
+        for z0, z1 in self._slabs:
+            self._read(self._index(pos, slice(z0, z1)), out, np.s_[z0:z1])
+        return out
+
+    def sample_range(self, n_timepoints=3, n_samples=2 ** 20, percentiles=(0., 100.)):
+        """estimates the display range (min, max) from a strided subsample of a few timepoints
+        instead of touching the whole dataset"""
+        Nt = self.stackSize[0]
+        positions = sorted(set(np.linspace(0, Nt - 1, min(Nt, n_timepoints)).astype(int)))
+        step = max(1, int(np.ceil((1. * np.prod(self.stackSize[1:]) / n_samples) ** (1. / 3))))
+
+        samples = []
+        for pos in positions:
+            sel = self._index(pos, *(slice(None, None, step),) * 3)
+            samples.append(np.asarray(self.data[sel]).ravel())
+
+        samples = np.concatenate(samples)
+        mi, ma = np.percentile(samples, percentiles)
+        logger.debug("sampled range from %s voxels: %s %s", samples.size, mi, ma)
+        return float(mi), float(ma)
@@ -0,0 +1,300 @@
+"""
+a shared memory ring buffer to hand over volumes from an acquisition
+process to the viewer without pickling or writing files
+
+layout of the shared memory block:
+
+|-- header        (magic, number of slots, shape, dtype, stackUnits, frame counter)
+|-- slot table    (frame number written into every slot)
+|-- slot 0        (page aligned volume)
+|-- slot 1
+   ....
+
+the producer (SharedMemoryWriter) writes volume after volume into the slots of
+the ring, the viewer attaches to it with SharedMemoryData, which is a
+GenericData container that copies the frames out of the slots.
+A copy is only returned if the slot held the expected frame before and after copying
+(a seqlock), so a frame that is overwritten meanwhile is never handed out torn.
+DataModel polls seq() and emits _dataChanged when new frames arrived.
+
+usage:
+
+# acquisition process
+w = SharedMemoryWriter("cam0", shape = (100,512,512), dtype = np.uint16, n_slots = 8)
+for vol in acquire():
+    w.push(vol)
+
+# viewer process
+volshow(SharedMemoryData("cam0"))
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import time
+import numpy as np
+
+from spimagine.models.data_model import GenericData
+
+_MAGIC = b"SPIMRING"
+
+_PAGE_SIZE = 4096
+
+_HEADER_DTYPE = np.dtype([("magic", "S8"),
+                          ("n_slots", "<i8"),
+                          ("shape", "<i8", (3,)),
+                          ("dtype", "S8"),
+                          ("stackUnits", "<f8", (3,)),
+                          ("seq", "<i8")])
+
+# frame number that currently lives in each slot (-1 if empty)
+# while a slot is being written its entry is set to -2
+_SLOT_DTYPE = np.dtype([("frame", "<i8")])
+
+_SLOT_BUSY = -2
+_SLOT_EMPTY = -1
+
+
+def _shared_memory_module():
+    try:
+        from multiprocessing import shared_memory
+    except ImportError:
+        raise ImportError("shared memory data needs python >= 3.8 (multiprocessing.shared_memory)")
+    return shared_memory
+
+
+# names of the blocks created by writers of this process
+_OWNED_NAMES = set()
+
+
+def _untrack(shm):
+    """the consumer must not unlink the block of the producer when it exits
+    (python < 3.13 registers every attached block with the resource tracker)"""
+    if shm.name in _OWNED_NAMES:
+        return
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception as e:
+        logger.debug("could not unregister %s from resource tracker (%s)", shm.name, e)
+
+
+def _close(shm):
+    try:
+        shm.close()
+    except BufferError:
+        # some arrays still point into the block, it is released once they are gone
+        logger.debug("shared memory %s still in use, not closed", shm.name)
+
+
+def _round_up(n, m=_PAGE_SIZE):
+    return ((n + m - 1) // m) * m
+
+
+def _layout(n_slots, shape, dtype):
+    """returns (offset of first slot, slot stride, total size) in bytes"""
+    table_offset = _HEADER_DTYPE.itemsize
+    data_offset = _round_up(table_offset + n_slots * _SLOT_DTYPE.itemsize)
+    slot_stride = _round_up(int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    return data_offset, slot_stride, data_offset + n_slots * slot_stride
+
+
+class _SharedRing(object):
+    """numpy views onto an (already existing) shared memory block"""
+
+    def __init__(self, shm):
+        self.shm = shm
+        self.header = np.ndarray((), dtype=_HEADER_DTYPE, buffer=shm.buf)
+        if self.header["magic"] != _MAGIC:
+            raise ValueError("shared memory '%s' is not a spimagine ring buffer" % shm.name)
+
+        self.n_slots = int(self.header["n_slots"])
+        self.shape = tuple(int(s) for s in self.header["shape"])
+        self.dtype = np.dtype(self.header["dtype"].item().decode())
+        self.data_offset, self.slot_stride, _ = _layout(self.n_slots, self.shape, self.dtype)
+
+        self.slots = np.ndarray((self.n_slots,), dtype=_SLOT_DTYPE,
+                                buffer=shm.buf, offset=_HEADER_DTYPE.itemsize)
+
+    def slot_view(self, i):
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf,
+                          offset=self.data_offset + i * self.slot_stride)
+
+    def release(self):
+        # the views have to be dropped before the buffer can be closed
+        self.header = None
+        self.slots = None
+
+
+class SharedMemoryWriter(object):
+    """producer side of the ring buffer
+
+    creates the shared memory block, every push() writes a volume into the next free slot
+
+    for zero copy acquisition, use
+
+    with w.frame() as arr:
+        camera.read_into(arr)
+    """
+
+    def __init__(self, name=None, shape=(1, 1, 1), dtype=np.uint16, n_slots=4,
+                 stackUnits=(1., 1., 1.)):
+        if len(shape) != 3:
+            raise ValueError("shape should be 3 dimensional (Nz,Ny,Nx) but is %s" % str(shape))
+        if n_slots < 1:
+            raise ValueError("n_slots should be >= 1")
+
+        shared_memory = _shared_memory_module()
+
+        dtype = np.dtype(dtype)
+        _, _, size = _layout(n_slots, shape, dtype)
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _OWNED_NAMES.add(self.shm.name)
+
+        header = np.ndarray((), dtype=_HEADER_DTYPE, buffer=self.shm.buf)
+        header["magic"] = _MAGIC
+        header["n_slots"] = n_slots
+        header["shape"] = shape
+        header["dtype"] = dtype.str.encode()
+        header["stackUnits"] = stackUnits
+        header["seq"] = 0
+        del header
+
+        self._ring = _SharedRing(self.shm)
+        self._ring.slots["frame"] = _SLOT_EMPTY
+        logger.debug("created shared ring buffer '%s' of %s MB", self.name, size // 2 ** 20)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def seq(self):
+        """number of frames written so far"""
+        return int(self._ring.header["seq"])
+
+    def set_stack_units(self, stackUnits):
+        self._ring.header["stackUnits"] = stackUnits
+
+    def frame(self):
+        """context manager that yields the array of the next slot to be written into"""
+        return _FrameWriter(self)
+
+    def push(self, data):
+        """copies the volume data into the next slot of the ring"""
+        data = np.asarray(data)
+        if data.shape != self._ring.shape:
+            raise ValueError("data.shape = %s does not match ring shape %s" % (data.shape, self._ring.shape))
+
+        with self.frame() as arr:
+            np.copyto(arr, data, casting="unsafe")
+
+    def _begin(self):
+        seq = self.seq
+        i = seq % self._ring.n_slots
+        self._ring.slots[i]["frame"] = _SLOT_BUSY
+        return seq, i
+
+    def _commit(self, seq, i):
+        self._ring.slots[i]["frame"] = seq
+        self._ring.header["seq"] = seq + 1
+
+    def close(self):
+        self._ring.release()
+        _close(self.shm)
+
+    def unlink(self):
+        """closes and removes the shared memory block (call once from the producer)"""
+        self.close()
+        self.shm.unlink()
+        _OWNED_NAMES.discard(self.shm.name)
+
+
+class _FrameWriter(object):
+    def __init__(self, writer):
+        self.writer = writer
+
+    def __enter__(self):
+        self.seq, self.i = self.writer._begin()
+        return self.writer._ring.slot_view(self.i)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.writer._commit(self.seq, self.i)
+        else:
+            self.writer._ring.slots[self.i]["frame"] = _SLOT_EMPTY
+        return False
+
+
+class SharedMemoryData(GenericData):
+    """4d data living in a shared memory ring buffer created by SharedMemoryWriter
+
+    the timepoints are the slots of the ring, ordered from oldest (pos = 0)
+    to newest (pos = sizeT()-1) frame, so the frame shown at a pos changes with every push
+    (hence DataModel doesnt cache this container by position).
+    __getitem__ returns a copy of the frame, timepoints that havent been written yet are zeros.
+    """
+
+    # the timepoints change while the data is shown
+    cacheable = False
+
+    # seconds to wait for a frame that is currently being written
+    timeout = 1.
+
+    def __init__(self, name=""):
+        super(SharedMemoryData, self).__init__("SharedMemory: %s" % name)
+        self.load(name)
+
+    def load(self, name):
+        if name:
+            shared_memory = _shared_memory_module()
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, create=False)
+                _untrack(self.shm)
+                self._ring = _SharedRing(self.shm)
+            except Exception as e:
+                print(e)
+                raise Exception("couldnt open %s as SharedMemoryData" % name)
+
+            self.fName = name
+            self.stackSize = (self._ring.n_slots,) + self._ring.shape
+            self.stackUnits = tuple(float(u) for u in self._ring.header["stackUnits"])
+
+    def seq(self):
+        """number of frames the producer has written so far"""
+        return int(self._ring.header["seq"])
+
+    def frame_number(self, pos):
+        """the (global) frame number shown at timepoint pos"""
+        seq = self.seq()
+        n = self._ring.n_slots
+        return pos if seq <= n else seq - n + pos
+
+    def __getitem__(self, pos):
+        self._check_pos(pos)
+
+        t = time.time()
+        while True:
+            seq = self.seq()
+            frame = self.frame_number(pos)
+            i = frame % self._ring.n_slots
+            if frame >= seq:
+                # not written yet
+                return np.zeros(self._ring.shape, self._ring.dtype)
+
+            if self._ring.slots[i]["frame"] == frame:
+                data = self._ring.slot_view(i).copy()
+                # valid only if the producer didnt touch the slot (or push) while copying
+                if self._ring.slots[i]["frame"] == frame and self.seq() == seq:
+                    return data
+
+            if time.time() - t > self.timeout:
+                raise RuntimeError("frame %s of '%s' is still being written" % (frame, self.fName))
+            time.sleep(.0001)
+
+    def close(self):
+        self._ring.release()
+        _close(self.shm)
@@ -16,6 +16,7 @@ from spimagine.utils.transform_matrices import *
 from spimagine.utils.quaternion import Quaternion
 
 import numpy as np
+from contextlib import contextmanager
 
 from spimagine.models.keyframe_model import TransformData
 
@@ -46,8 +47,33 @@ class TransformModel(QtCore.QObject):
 
     def __init__(self):
         super(TransformModel, self).__init__()
+        self._batchDepth = 0
+        self._batchChanged = False
         self.reset()
 
+    @contextmanager
+    def batch(self):
+        """the changes within the block emit _transformChanged only once (at its end)
+
+        with transform.batch():
+            transform.setGamma(.5)
+            transform.setZoom(1.2)
+        """
+        self._batchDepth += 1
+        try:
+            yield self
+        finally:
+            self._batchDepth -= 1
+            if self._batchDepth == 0 and self._batchChanged:
+                self._batchChanged = False
+                self._transformChanged.emit()
+
+    def _emitTransformChanged(self):
+        if self._batchDepth > 0:
+            self._batchChanged = True
+        else:
+            self._transformChanged.emit()
+
     def _update_value(self, name, newval):
         """update self.name to newval and returns True if the
         new value indeed was different than the new"""
@@ -75,96 +101,98 @@ class TransformModel(QtCore.QObject):
 
     def reset(self, minVal=0., maxVal=256., stackUnits=None):
         logger.debug("reset:  min = %s max = %s" % (minVal, maxVal))
-        self.dataPos = 0
-        self.slicePos = 0
-        self.sliceDim = 0
-        self.zoom = 1.
-        self.setIso(False)
-        self.isPerspective = True
-        self.setPerspective()
-        self.setValueScale(minVal, maxVal)
-        self.setGamma(1.)
-        self.setAlphaPow(0)
-        self.setBox(True)
-        self.setInterpolate(True)
-
-        self.setOccStrength()
-        self.setOccRadius()
-        self.setOccNPoints()
-
-        self.eye_dist_proj = 0
-        self.eye_dist_cam = 0
-        if not hasattr(self, "isSlice"):
-            self.setShowSlice(False)
-
-        if not stackUnits:
-            stackUnits = [.1, .1, .1]
-        self.setStackUnits(*stackUnits)
-        self.center()
+        with self.batch():
+            self.dataPos = 0
+            self.slicePos = 0
+            self.sliceDim = 0
+            self.zoom = 1.
+            self.setIso(False)
+            self.isPerspective = True
+            self.setPerspective()
+            self.setValueScale(minVal, maxVal)
+            self.setGamma(1.)
+            self.setAlphaPow(0)
+            self.setBox(True)
+            self.setInterpolate(True)
+
+            self.setOccStrength()
+            self.setOccRadius()
+            self.setOccNPoints()
+
+            self.eye_dist_proj = 0
+            self.eye_dist_cam = 0
+            if not hasattr(self, "isSlice"):
+                self.setShowSlice(False)
+
+            if not stackUnits:
+                stackUnits = [.1, .1, .1]
+            self.setStackUnits(*stackUnits)
+            self.center()
 
     def setIso(self, isIso):
         logger.debug("setting Iso %s" % isIso)
         if self._update_value("isIso", isIso):
             self._isoChanged.emit(isIso)
-            self._transformChanged.emit()
+            self._emitTransformChanged()
 
     def setInterpolate(self, is_interpolate):
         logger.debug("setting interpolation %s" % is_interpolate)
         if self._update_value("is_interpolate", is_interpolate):
             self._interpChanged.emit(is_interpolate)
-            self._transformChanged.emit()
+            self._emitTransformChanged()
 
 
     def setOccStrength(self, occ_strength=.15):
         if self._update_value("occ_strength", occ_strength):
-            self._transformChanged.emit()
+            self._emitTransformChanged()
 
     def setOccRadius(self, val=21):
         if self._update_value("occ_radius", val):
-            self._transformChanged.emit()
+            self._emitTransformChanged()
 
     def setOccNPoints(self, val=31):
         if self._update_value("occ_n_points", val):
-            self._transformChanged.emit()
+            self._emitTransformChanged()
 
     def center(self):
-        self.quatRot = Quaternion()
-        self.cameraZ = 5.
-        self.zoom = 1.
-        self.scaleAll = 1.
-        self.setBounds(-1, 1., -1, 1, -1, 1)
-        self.setTranslate(0, 0, 0)
+        with self.batch():
+            self.quatRot = Quaternion()
+            self.cameraZ = 5.
+            self.zoom = 1.
+            self.scaleAll = 1.
+            self.setBounds(-1, 1., -1, 1, -1, 1)
+            self.setTranslate(0, 0, 0)
 
-        self.update()
-        self._transformChanged.emit()
+            self.update()
+            self._emitTransformChanged()
 
     def setTranslate(self, x, y, z):
         newtrans = np.array([x, y, z])
 
         if self._update_value("translate", newtrans):
             self._translateChanged.emit(x, y, z)
-            self._transformChanged.emit()
+            self._emitTransformChanged()
 
     def addTranslate(self, dx, dy, dz):
         self.translate = self.translate + np.array([dx, dy, dz])
         self._translateChanged.emit(*self.translate)
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def setBounds(self, x1, x2, y1, y2, z1, z2):
         self.bounds = np.array([x1, x2, y1, y2, z1, z2])
         self._boundsChanged.emit(x1, x2, y1, y2, z1, z2)
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def setShowSlice(self, isSlice=True):
         self.isSlice = isSlice
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def setSliceDim(self, dim):
         logger.debug("setSliceDim(%s)", dim)
         if dim >= 0 and dim < 3:
             self.sliceDim = dim
             self._sliceDimChanged.emit(dim)
-            self._transformChanged.emit()
+            self._emitTransformChanged()
         else:
             raise ValueError("dim should be in [0,1,2]!")
 
@@ -172,39 +200,40 @@ class TransformModel(QtCore.QObject):
         logger.debug("setSlicePos(%s)", pos)
         self.slicePos = pos
         self._slicePosChanged.emit(pos)
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def setPos(self, pos):
         logger.debug("setPos(%s)", pos)
         self.dataPos = pos
         self.dataModel.setPos(pos)
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def setGamma(self, gamma):
         logger.debug("setGamma(%s)", gamma)
 
         self.gamma = gamma
         self._gammaChanged.emit(self.gamma)
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def setAlphaPow(self, alphaPow):
         logger.debug("setAlphaPow(%s)", alphaPow)
         self.alphaPow = alphaPow
         self._alphaPowChanged.emit(self.alphaPow)
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def setValueScale(self, minVal, maxVal):
         logger.debug("set scale to %s,%s" % (minVal, maxVal))
 
-        self.setMin(minVal)
-        self.setMax(maxVal)
+        with self.batch():
+            self.setMin(minVal)
+            self.setMax(maxVal)
 
     def setMin(self, minVal):
         self.minVal = max(1.e-6, minVal)
         logger.debug("set min to %s" % (self.minVal))
 
         self._minChanged.emit(self.minVal)
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def setMax(self, maxVal):
         self.maxVal = maxVal
@@ -212,23 +241,23 @@ class TransformModel(QtCore.QObject):
         logger.debug("set max to %s" % (self.maxVal))
 
         self._maxChanged.emit(self.maxVal)
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def setStackUnits(self, px, py, pz):
         self.stackUnits = px, py, pz
         self._stackUnitsChanged.emit(px, py, pz)
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def setBox(self, isBox=True):
         self.isBox = isBox
         self._boxChanged.emit(isBox)
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def setZoom(self, zoom=1.):
         # self.zoom = np.clip(zoom,.5,2)
         self.zoom = np.clip(zoom, .3, 2)
         self.update()
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def addRotation(self, angle, x, y, z, from_left = True):
         q = Quaternion(np.cos(angle), np.sin(angle) * x, np.sin(angle) * y, np.sin(angle) * z)
@@ -245,19 +274,19 @@ class TransformModel(QtCore.QObject):
         logger.debug("set quaternion to %s", quat.data)
         self.quatRot = Quaternion.copy(quat)
         self._rotationChanged.emit()
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def setEyeDistProj(self, eye_dist_proj=0):
         self.eye_dist_proj = eye_dist_proj
         self.update()
         print(self.eye_dist_proj)
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def setEyeDistCam(self, eye_dist_cam=0.):
         self.eye_dist_cam = eye_dist_cam
         print(self.eye_dist_cam)
         self.update()
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def update(self):
         if self.isPerspective:
@@ -278,7 +307,7 @@ class TransformModel(QtCore.QObject):
 
         self.update()
         self._perspectiveChanged.emit(isPerspective)
-        self._transformChanged.emit()
+        self._emitTransformChanged()
 
     def getProjection(self):
         return self.projection
@@ -312,21 +341,23 @@ class TransformModel(QtCore.QObject):
         return np.dot(view, model)
 
     def fromTransformData(self, transformData):
-        self.setQuaternion(transformData.quatRot)
-        self.setZoom(transformData.zoom)
-        self.setPos(transformData.dataPos)
-        self.setBounds(*transformData.bounds)
-        self.setBox(transformData.isBox)
-        self.setIso(transformData.isIso)
-
-        self.setAlphaPow(transformData.alphaPow)
-        self.setTranslate(*transformData.translate)
-        self.setValueScale(transformData.minVal,transformData.maxVal)
-        self.setGamma(transformData.gamma)
-        self.setValueScale(transformData.minVal, transformData.maxVal)
-        self.setShowSlice(transformData.isSlice)
-        self.setSlicePos(transformData.slicePos)
-        self.setSliceDim(transformData.sliceDim)
+        """sets all the parameters of transformData, emitting _transformChanged only once"""
+        with self.batch():
+            self.setQuaternion(transformData.quatRot)
+            self.setZoom(transformData.zoom)
+            self.setPos(transformData.dataPos)
+            self.setBounds(*transformData.bounds)
+            self.setBox(transformData.isBox)
+            self.setIso(transformData.isIso)
+
+            self.setAlphaPow(transformData.alphaPow)
+            self.setTranslate(*transformData.translate)
+            self.setValueScale(transformData.minVal,transformData.maxVal)
+            self.setGamma(transformData.gamma)
+            self.setValueScale(transformData.minVal, transformData.maxVal)
+            self.setShowSlice(transformData.isSlice)
+            self.setSlicePos(transformData.slicePos)
+            self.setSliceDim(transformData.sliceDim)
 
         # self.setGamma(transformData.gamma)
 
@@ -0,0 +1,139 @@
+"""
+cached real-to-complex FFTs of volumes
+
+the volume is padded (wrap mode) to the next fast size 2^a*3^b*5^c along every axis
+(instead of the next power of two), transformed with a real FFT and the centered
+power spectrum is assembled from the half spectrum via its hermitian symmetry.
+
+The padded input buffer and the index map of the spectrum are cached per shape,
+so repeated transforms of frames of the same shape dont allocate/recompute them
+(the FFT plans themselves are cached by scipy.fft/numpy.fft).
+
+usage:
+
+spec = fft_spectrum(data)
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    from scipy.fft import rfftn as _rfftn
+except ImportError:
+    from numpy.fft import rfftn as _rfftn
+
+
+def next_fast_len(n):
+    """the smallest number >= n of the form 2^a*3^b*5^c"""
+    best = None
+    p5 = 1
+    while p5 < 2 * n:
+        p35 = p5
+        while p35 < 2 * n:
+            m = p35
+            while m < n:
+                m *= 2
+            if best is None or m < best:
+                best = m
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def fast_shape(shape):
+    return tuple(next_fast_len(int(n)) for n in shape)
+
+
+class RFFTPlan(object):
+    """the cached buffers for the spectrum of arrays of shape dshape"""
+
+    def __init__(self, dshape):
+        self.dshape = tuple(dshape)
+        self.shape = fast_shape(dshape)
+        self.buf = np.empty(self.shape, np.float32)
+        self._lock = threading.Lock()
+        self.index = self._spectrum_index()
+
+    def _spectrum_index(self):
+        """flat indices into the half spectrum, that give the centered (fftshifted)
+        full spectrum cropped to dshape"""
+        half_shape = self.shape[:-1] + (self.shape[-1] // 2 + 1,)
+        ks = []
+        for n, N in zip(self.dshape, self.shape):
+            s = np.arange(n) + (N - n) // 2
+            ks.append((s - N // 2) % N)
+        K = np.meshgrid(*ks, indexing="ij")
+
+        # the missing half follows from F(-k) = conj(F(k))
+        N_last = self.shape[-1]
+        mirror = K[-1] > N_last // 2
+        for k, N in zip(K, self.shape):
+            k[mirror] = (-k[mirror]) % N
+        return np.ravel_multi_index(K, half_shape).astype(np.intp)
+
+    def _fill(self, data):
+        """copies data into the padded buffer (with wrap mode)"""
+        buf = self.buf
+        buf[tuple(slice(0, n) for n in self.dshape)] = data
+        for axis, (n, N) in enumerate(zip(self.dshape, self.shape)):
+            pos = n
+            while pos < N:
+                m = min(n, N - pos)
+                dst = [slice(None)] * buf.ndim
+                src = [slice(None)] * buf.ndim
+                dst[axis] = slice(pos, pos + m)
+                src[axis] = slice(0, m)
+                buf[tuple(dst)] = buf[tuple(src)]
+                pos += m
+
+    def spectrum(self, data):
+        """the centered absolute spectrum of data (normalized with 1/sqrt(size)), of shape dshape"""
+        if data.shape != self.dshape:
+            raise ValueError("data.shape = %s, but plan is for %s" % (data.shape, self.dshape))
+
+        with self._lock:
+            self._fill(data)
+            half = _rfftn(self.buf)
+
+        res = np.abs(half).ravel()[self.index]
+        res *= 1. / np.sqrt(self.buf.size)
+        return res.astype(np.float32, copy=False)
+
+
+class _PlanCache(object):
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, dshape):
+        dshape = tuple(dshape)
+        with self._lock:
+            plan = self._plans.pop(dshape, None)
+            if plan is None:
+                logger.debug("new fft plan for shape %s", dshape)
+                plan = RFFTPlan(dshape)
+            self._plans[dshape] = plan
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+            return plan
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+
+plan_cache = _PlanCache()
+
+
+def fft_spectrum(data):
+    """the centered absolute spectrum of data (same shape as data)"""
+    return plan_cache.get(data.shape).spectrum(data)
@@ -16,7 +16,6 @@ import warnings
 with warnings.catch_warnings():
     warnings.simplefilter("ignore")
     from spimagine.lib.tifffile import TiffFile, imsave, imread
-    from spimagine.lib.czifile import CziFile
 
 
 
@@ -38,6 +37,52 @@ def read3dTiff(fName):
     return imread(fName)
 
 
+def openImageFile(fName):
+    """reads a 2d image (png, jpg, bmp...), color images are converted to grayscale"""
+    img = np.asarray(Image.open(fName))
+    if img.ndim == 3:
+        # average the color channels (without alpha)
+        img = np.mean(img[..., :3], axis=-1).astype(np.float32)
+    return img
+
+
+def readTiffPlanes(fName, zs, nPlanes):
+    """reads only the pages zs of a multipage tiff with nPlanes 2d pages
+
+    returns an array of shape (len(zs),Ny,Nx) or None if the pages are not
+    the single planes of the stack"""
+    with TiffFile(fName) as tif:
+        if len(tif.pages) != nPlanes:
+            return None
+        pages = [tif.pages[z] for z in zs]
+        if any(len(p.shape) != 2 for p in pages):
+            return None
+        return np.stack([p.asarray() for p in pages])
+
+
+def tiffDataSegments(fName):
+    """returns the list of (offset, bytecount) of the raw pixel data of all pages
+    and the (native) dtype, if the data can be read as is (uncompressed, no predictor)
+    otherwise returns None, None
+    """
+    import sys
+    native = {'big': '>', 'little': '<'}[sys.byteorder]
+    with TiffFile(fName) as tif:
+        if tif.byteorder != native and tif.byteorder != "=":
+            return None, None
+        segments = []
+        dtype = None
+        for page in tif.pages:
+            if not page.is_contiguous or page.predictor or page.is_palette:
+                return None, None
+            if dtype is None:
+                dtype = np.dtype(page.dtype)
+            elif np.dtype(page.dtype) != dtype:
+                return None, None
+            segments.append(page.is_contiguous)
+    return segments, dtype
+
+
 def write3dTiff(data,fName):
     imsave(fName,data)
 
@@ -56,6 +101,8 @@ def getTiffSize(fName):
 
 
 def readCziFile(fName):
+    # only needed for czi files
+    from spimagine.lib.czifile import CziFile
     with CziFile(fName)  as f:
         return np.squeeze(f.asarray())
             
@@ -0,0 +1,165 @@
+"""
+lightweight per frame instrumentation of the render pipeline
+
+the stages (loading, processing, upload, kernel, readback, texture upload, paint...)
+record spans (name, start, duration, thread) into a fixed size ring buffer, tagged with
+the frame they belong to, so that a slow frame can be broken down into its stages.
+
+usage:
+
+from spimagine.utils.instrumentation import instrumentation
+
+with instrumentation.span("load"):
+    data = container[pos]
+
+instrumentation.summary()                          # percentiles of every stage (in ms)
+instrumentation.export_chrome_trace("trace.json")  # open in chrome://tracing or ui.perfetto.dev
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import os
+import json
+import threading
+from collections import deque, OrderedDict
+from timeit import default_timer as _clock
+
+import numpy as np
+
+
+class _NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span(object):
+    __slots__ = ("instr", "name", "cat", "args", "start")
+
+    def __init__(self, instr, name, cat, args):
+        self.instr, self.name, self.cat, self.args = instr, name, cat, args
+
+    def __enter__(self):
+        self.start = _clock()
+        return self
+
+    def __exit__(self, *args):
+        self.instr.record(self.name, self.start, _clock() - self.start, self.cat, self.args)
+        return False
+
+
+class Instrumentation(object):
+    """the spans of the last maxlen stages
+
+    every span is a tuple (name, category, frame, start, duration, thread id, args) with
+    start/duration in seconds
+    """
+
+    def __init__(self, maxlen=10000, enabled=True):
+        self.enabled = enabled
+        self.spans = deque(maxlen=maxlen)
+        self.frame = 0
+        self._lock = threading.Lock()
+        self._threads = {}
+
+    def span(self, name, cat="spimagine", **args):
+        """context manager that records the time spent within as the stage name"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args or None)
+
+    def record(self, name, start, duration, cat="spimagine", args=None):
+        thread = threading.current_thread()
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self.spans.append((name, cat, self.frame, start, duration, thread.ident, args))
+
+    def new_frame(self):
+        """starts a new frame (the spans recorded from now on belong to it)"""
+        self.frame += 1
+        return self.frame
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    def _spans(self, frames=None):
+        """the recorded spans (only the ones of the last frames if given)"""
+        with self._lock:
+            spans = list(self.spans)
+        if frames is not None:
+            spans = [s for s in spans if s[2] > self.frame - frames]
+        return spans
+
+    def frame_breakdown(self, frame=None):
+        """the total time (ms) of every stage in frame (default: the current one)"""
+        if frame is None:
+            frame = self.frame
+        res = OrderedDict()
+        for s in self._spans():
+            if s[2] == frame:
+                res[s[0]] = res.get(s[0], 0.) + 1000. * s[4]
+        return res
+
+    def summary(self, frames=None, percentiles=(50, 90, 99)):
+        """{stage: {"count", "mean", "p50", "p90", "p99", "max"}} of the durations (ms) of every stage
+
+        if frames is given, only the spans of the last frames are used
+        """
+        durations = OrderedDict()
+        for s in self._spans(frames):
+            durations.setdefault(s[0], []).append(s[4])
+
+        res = OrderedDict()
+        for name, ds in durations.items():
+            ds = 1000. * np.array(ds)
+            stats = OrderedDict([("count", len(ds)), ("mean", float(np.mean(ds)))])
+            for p, val in zip(percentiles, np.percentile(ds, percentiles)):
+                stats["p%s" % p] = float(val)
+            stats["max"] = float(np.max(ds))
+            res[name] = stats
+        return res
+
+    def summary_str(self, frames=None):
+        """the summary as a table"""
+        lines = ["%-20s %6s %8s %8s %8s %8s" % ("stage", "count", "mean", "p50", "p90", "p99")]
+        for name, s in self.summary(frames).items():
+            lines.append("%-20s %6d %8.2f %8.2f %8.2f %8.2f" % (name, s["count"], s["mean"],
+                                                                s["p50"], s["p90"], s["p99"]))
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """the spans in the chrome trace event format (as a dict)"""
+        pid = os.getpid()
+        events = []
+        with self._lock:
+            threads = dict(self._threads)
+        for tid, name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        for name, cat, frame, start, duration, tid, args in self._spans():
+            ev_args = {"frame": frame}
+            if args:
+                ev_args.update((k, str(v)) for k, v in args.items())
+            events.append({"name": name, "cat": cat, "ph": "X",
+                           "ts": 1.e6 * start, "dur": 1.e6 * duration,
+                           "pid": pid, "tid": tid, "args": ev_args})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, fName):
+        """writes the spans as chrome trace json (chrome://tracing, ui.perfetto.dev)"""
+        logger.info("exporting %s spans to %s", len(self.spans), fName)
+        with open(fName, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+# the instrumentation of spimagine's render pipeline
+instrumentation = Instrumentation()
@@ -0,0 +1,33 @@
+/*
+  the marching cubes case of every cell of a volume (see spimagine.utils.marching_cubes)
+
+  data is of shape (Nz, Ny, Nx), cases of shape (Nz-1, Ny-1, Nx-1) and the global size is (Nx-1, Ny-1, Nz-1)
+  bit k of the case is set if corner k = (x,y,z) = (k&1, (k>>1)&1, (k>>2)&1) is above the iso value
+*/
+
+__kernel void cube_cases(__global const float * data,
+                         __global uchar * cases,
+                         const float iso){
+
+  int i = get_global_id(0);
+  int j = get_global_id(1);
+  int k = get_global_id(2);
+
+  int nx = get_global_size(0);
+  int ny = get_global_size(1);
+
+  int Nx = nx+1;
+  int Ny = ny+1;
+
+  uchar c = 0;
+
+  for (int corner = 0; corner < 8; corner++) {
+    int x = i + (corner & 1);
+    int y = j + ((corner >> 1) & 1);
+    int z = k + ((corner >> 2) & 1);
+    if (data[x+Nx*(y+Ny*z)] > iso)
+      c |= (uchar)(1 << corner);
+  }
+
+  cases[i+nx*(j+ny*k)] = c;
+}
@@ -0,0 +1,51 @@
+/*
+  recursive (Young - van Vliet) gaussian filter along a single axis
+
+  every work item filters one line of the volume in place (causal and anticausal pass)
+  the start of the line is  i0*s0 + i1*s1, consecutive elements are stride apart
+
+  M is the 3x3 matrix of the boundary condition of the anticausal pass (Triggs and Sdika)
+*/
+
+__kernel void recursive_gauss_line(__global float * data,
+                                   const int N, const int stride,
+                                   const int s0, const int s1,
+                                   const float B, const float a1,
+                                   const float a2, const float a3,
+                                   __global const float * M){
+
+  int i0 = get_global_id(0);
+  int i1 = get_global_id(1);
+
+  __global float * x = data + i0*s0 + i1*s1;
+
+  float u = x[(N-1)*stride];
+
+  // causal pass, the boundary is the steady state of a constant signal
+  float p1 = x[0];
+  float p2 = p1;
+  float p3 = p1;
+
+  for (int n = 0; n < N; n++) {
+    float w = B*x[n*stride] + a1*p1 + a2*p2 + a3*p3;
+    x[n*stride] = w;
+    p3 = p2; p2 = p1; p1 = w;
+  }
+
+  // anticausal pass
+  float w0 = x[(N-1)*stride] - u;
+  float w1 = x[max(N-2,0)*stride] - u;
+  float w2 = x[max(N-3,0)*stride] - u;
+
+  p1 = B*(M[0]*w0 + M[1]*w1 + M[2]*w2) + u;
+  p2 = B*(M[3]*w0 + M[4]*w1 + M[5]*w2) + u;
+  p3 = B*(M[6]*w0 + M[7]*w1 + M[8]*w2) + u;
+
+  x[(N-1)*stride] = p1;
+
+  for (int n = N-2; n >= 0; n--) {
+    float w = B*x[n*stride] + a1*p1 + a2*p2 + a3*p3;
+    x[n*stride] = w;
+    p3 = p2; p2 = p1; p1 = w;
+  }
+}
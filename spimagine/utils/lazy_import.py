@@ -0,0 +1,61 @@
+"""
+module attributes that are imported on first access
+
+usage (in a package __init__):
+
+lazy_exports(__name__, {"volshow": "spimagine.gui.volshow:volshow",
+                        "imgutils": "spimagine.utils.imgutils"})
+
+so "import spimagine" stays cheap, and spimagine.volshow only pulls in the gui when used
+"""
+
+from __future__ import absolute_import, print_function
+
+import importlib
+import sys
+import types
+
+
+def _load(target):
+    """imports "module" or "module:attribute" """
+    modname, _, attr = target.partition(":")
+    module = importlib.import_module(modname)
+    return getattr(module, attr) if attr else module
+
+
+def lazy_exports(module_name, exports):
+    """makes exports = {name: "module:attribute"} attributes of the module module_name,
+    that are imported on first access
+    """
+    module = sys.modules[module_name]
+
+    def __getattr__(name):
+        try:
+            target = exports[name]
+        except KeyError:
+            raise AttributeError("module %r has no attribute %r" % (module_name, name))
+        val = _load(target)
+        setattr(module, name, val)
+        return val
+
+    def __dir__():
+        return sorted(set(module.__dict__) | set(exports))
+
+    if sys.version_info >= (3, 7):
+        module.__getattr__ = __getattr__
+        module.__dir__ = __dir__
+        return
+
+    class _LazyModule(types.ModuleType):
+        def __getattr__(self, name):
+            return __getattr__(name)
+
+        def __dir__(self):
+            return __dir__()
+
+    try:
+        module.__class__ = _LazyModule
+    except TypeError:
+        # python 2 cant change the class of a module, so import everything
+        for name, target in exports.items():
+            setattr(module, name, _load(target))
@@ -0,0 +1,229 @@
+"""
+Richardson-Lucy deconvolution with a gaussian psf
+
+the volume is padded (reflecting) to a fast FFT size, and every iteration
+
+u <- u * H^T (y / H u)
+
+is done in fourier space with a transfer function H that is cached per (shape, rad).
+The padded buffers are cached per shape as well, so deconvolving consecutive frames
+of a timelapse neither recomputes the psf nor reallocates the working arrays.
+
+lucy_richardson     -> numpy/scipy backend (real ffts), for machines without a usable OpenCL device
+lucy_richardson_gpu -> OpenCL backend (gputools/reikna ffts), all iterations stay on the device
+
+usage:
+
+u = lucy_richardson(data, rad = 2., niter = 10)
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import threading
+from collections import OrderedDict
+from time import time
+
+import numpy as np
+from six.moves import range
+
+from spimagine.config.config import init_opencl
+from spimagine.utils.fft_cache import fast_shape
+
+try:
+    from scipy.fft import rfftn as _rfftn, irfftn as _irfftn
+    _fft_kwargs = {"workers": -1}
+except ImportError:
+    from numpy.fft import rfftn as _rfftn, irfftn as _irfftn
+    _fft_kwargs = {}
+
+# the relative floor of the blurred estimate (avoids divisions by zero)
+_EPS = 1.e-6
+
+
+def gaussian_psf(shape, rad):
+    """normalized gaussian of width rad, centered at the origin (i.e. ifftshifted) of shape"""
+    grids = np.meshgrid(*[np.fft.fftfreq(n) * n for n in shape], indexing="ij", sparse=True)
+    h = np.exp(-sum(g ** 2 for g in grids) / (2. * rad ** 2))
+    return h / np.sum(h)
+
+
+def _padding(dshape, rad):
+    """the padded shape and the offset of the data within it"""
+    m = int(np.ceil(3 * rad))
+    shape = fast_shape([n + 2 * m for n in dshape])
+    return shape, tuple((N - n) // 2 for n, N in zip(dshape, shape))
+
+
+class _LRU(object):
+    """a small thread safe LRU cache, values are created by func(*key) when missing"""
+
+    def __init__(self, func, maxsize=2):
+        self.func = func
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, *key):
+        with self._lock:
+            val = self._items.pop(key, None)
+            if val is None:
+                val = self.func(*key)
+            self._items[key] = val
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+            return val
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+def _otf(shape, rad):
+    """the (real, as the psf is symmetric) transfer function of the half spectrum"""
+    logger.debug("computing otf for shape %s and rad %s", shape, rad)
+    return np.ascontiguousarray(_rfftn(gaussian_psf(shape, rad)).real.astype(np.float32))
+
+
+def _otf_gpu(shape, rad):
+    from gputools import OCLArray
+    return OCLArray.from_array(np.fft.fftn(gaussian_psf(shape, rad)).real.astype(np.complex64))
+
+
+otf_cache = _LRU(_otf)
+otf_gpu_cache = _LRU(_otf_gpu)
+
+
+class RLPlan(object):
+    """the padded working buffers for data of shape dshape"""
+
+    def __init__(self, dshape, rad):
+        self.dshape = tuple(dshape)
+        self.shape, self.offset = _padding(dshape, rad)
+        self.crop = tuple(slice(o, o + n) for o, n in zip(self.offset, self.dshape))
+        self.y = np.empty(self.shape, np.float32)
+        self.u = np.empty(self.shape, np.float32)
+        self.lock = threading.Lock()
+
+    def fill(self, data):
+        pads = [(o, N - n - o) for n, N, o in zip(self.dshape, self.shape, self.offset)]
+        self.y[...] = np.pad(np.asarray(data, np.float32), pads, mode="reflect")
+
+
+class RLPlanGPU(RLPlan):
+    def __init__(self, dshape, rad):
+        from gputools import OCLArray, fft_plan
+        super(RLPlanGPU, self).__init__(dshape, rad)
+        self.fft_plan = fft_plan(self.shape)
+        self.y_g = OCLArray.empty(self.shape, np.complex64)
+        self.u_g = OCLArray.empty(self.shape, np.complex64)
+        self.tmp_g = OCLArray.empty(self.shape, np.complex64)
+
+
+plan_cache = _LRU(RLPlan)
+plan_gpu_cache = _LRU(RLPlanGPU)
+
+
+def _check(data, rad, niter):
+    if data.ndim != 3:
+        raise ValueError("data should be 3d (is %sd)" % data.ndim)
+    if rad <= 0:
+        raise ValueError("rad should be positive (is %s)" % rad)
+    if niter < 0:
+        raise ValueError("niter should be non negative (is %s)" % niter)
+
+
+def lucy_richardson(data, rad=2., niter=10):
+    """richardson lucy deconvolution of data with a gaussian psf of width rad (numpy/scipy backend)"""
+    _check(data, rad, niter)
+    plan = plan_cache.get(data.shape, rad)
+    H = otf_cache.get(plan.shape, rad)
+
+    with plan.lock:
+        plan.fill(data)
+        y, u = plan.y, plan.u
+        u[...] = y
+        floor = _EPS * max(float(y.max()), _EPS)
+        for i in range(niter):
+            F = _rfftn(u, **_fft_kwargs)
+            F *= H
+            tmp = _irfftn(F, plan.shape, overwrite_x=True, **_fft_kwargs)
+            np.maximum(tmp, floor, out=tmp)
+            np.divide(y, tmp, out=tmp)
+            F = _rfftn(tmp, **_fft_kwargs)
+            F *= H
+            u *= _irfftn(F, plan.shape, overwrite_x=True, **_fft_kwargs)
+        return u[plan.crop].copy()
+
+
+_kernels = {}
+
+
+def _get_kernels():
+    if not _kernels:
+        from gputools import OCLElementwiseKernel
+        _kernels["divide"] = OCLElementwiseKernel(
+            "cfloat_t *y, cfloat_t *b, const float floor",
+            "b[i] = cfloat_new(y[i].x/fmax(b[i].x, floor), 0.f)",
+            "rl_divide")
+        _kernels["mult_real"] = OCLElementwiseKernel(
+            "cfloat_t *u, cfloat_t *b",
+            "u[i] = cfloat_new(u[i].x*b[i].x, 0.f)",
+            "rl_mult_real")
+        _kernels["mult"] = OCLElementwiseKernel(
+            "cfloat_t *a, cfloat_t *h",
+            "a[i] = cfloat_mul(a[i], h[i])",
+            "rl_mult")
+    return _kernels
+
+
+def lucy_richardson_gpu(data, rad=2., niter=10):
+    """the same as lucy_richardson, but the iterations run on the OpenCL device"""
+    init_opencl()
+    from gputools import fft
+
+    _check(data, rad, niter)
+    plan = plan_gpu_cache.get(data.shape, rad)
+    H_g = otf_gpu_cache.get(plan.shape, rad)
+    k = _get_kernels()
+
+    with plan.lock:
+        plan.fill(data)
+        y_g, u_g, tmp_g = plan.y_g, plan.u_g, plan.tmp_g
+        y_g.set(plan.y.astype(np.complex64))
+        u_g.copy_buffer(y_g)
+        floor = np.float32(_EPS * max(float(plan.y.max()), _EPS))
+
+        def blur(a_g):
+            fft(a_g, inplace=True, plan=plan.fft_plan)
+            k["mult"](a_g, H_g)
+            fft(a_g, inplace=True, inverse=True, plan=plan.fft_plan)
+
+        for i in range(niter):
+            tmp_g.copy_buffer(u_g)
+            blur(tmp_g)
+            k["divide"](y_g, tmp_g, floor)
+            blur(tmp_g)
+            k["mult_real"](u_g, tmp_g)
+
+        return u_g.get().real[plan.crop].astype(np.float32)
+
+
+def benchmark(shape=(512,) * 3, rad=2., niter=5, backend="numpy"):
+    """returns the iterations per second of the given backend (after a warm up)"""
+    func = {"numpy": lucy_richardson, "gpu": lucy_richardson_gpu}[backend]
+    data = np.random.uniform(0, 1, shape).astype(np.float32)
+    func(data, rad, 1)
+    t = time()
+    func(data, rad, niter)
+    return niter / (time() - t)
+
+
+if __name__ == '__main__':
+    import sys
+
+    backend = sys.argv[1] if len(sys.argv) > 1 else "numpy"
+    print("%s backend, 512^3: %.2f iterations/s" % (backend, benchmark(backend=backend)))
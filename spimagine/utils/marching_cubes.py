@@ -0,0 +1,255 @@
+"""
+vectorized marching cubes
+
+extracts the iso surface of a 3d volume as triangle mesh
+
+marching_cubes -> the case of every cell is computed with OpenCL (if available) or numpy,
+                  the triangles of all cells are then generated at once with numpy
+
+the volume is processed in chunks along z to bound the memory of the intermediate
+arrays. Vertices lie on the edges of the voxel grid and are shared between
+neighboring cells (and chunks), so the resulting mesh is closed.
+
+the triangle table is not hard coded but generated from the cube geometry: on every cube
+face the iso lines are traced (ambiguous faces always separate the corners above the iso value,
+so neighboring cubes agree), and the closed loops of those lines are triangulated.
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import os
+import numpy as np
+from six.moves import range
+
+from spimagine.config.config import init_opencl
+
+
+def absPath(myPath):
+    return os.path.join(os.path.abspath(os.path.dirname(__file__)), myPath)
+
+
+# corner k of a cube is at (x,y,z) = (k&1, (k>>1)&1, (k>>2)&1)
+_CORNERS = np.array([(k & 1, (k >> 1) & 1, (k >> 2) & 1) for k in range(8)])
+
+# the 12 edges (a,b) of a cube, a being the lower corner
+_EDGES = [(a, b) for a in range(8) for b in range(a + 1, 8) if bin(a ^ b).count("1") == 1]
+
+
+def _faces():
+    """the 6 faces of a cube as their corners in counterclockwise order (seen from outside)"""
+    faces = []
+    for d in range(3):
+        for side in (0, 1):
+            u, v = (d + 1) % 3, (d + 2) % 3
+            if side == 0:
+                u, v = v, u
+            corners = [k for k in range(8) if _CORNERS[k, d] == side]
+            angles = [np.arctan2(_CORNERS[k, v] - .5, _CORNERS[k, u] - .5) for k in corners]
+            faces.append([corners[i] for i in np.argsort(angles)])
+    return faces
+
+
+def _triangulate_case(case, faces, edge_index):
+    """the triangles (as cube edges) of the cube whose corners above iso are the bits of case"""
+    inside = [(case >> k) & 1 for k in range(8)]
+
+    # on every face, the iso line enters the region above iso at one edge and leaves it at the next
+    # crossing (counterclockwise), this gives the same lines on the face shared by two cubes
+    segments = {}
+    for face in faces:
+        crossings = []
+        for i in range(4):
+            a, b = face[i], face[(i + 1) % 4]
+            if inside[a] != inside[b]:
+                crossings.append((edge_index[(min(a, b), max(a, b))], inside[b]))
+        for i, (e, entering) in enumerate(crossings):
+            if entering:
+                segments[e] = crossings[(i + 1) % len(crossings)][0]
+
+    triangles = []
+    while segments:
+        e0, e = segments.popitem()
+        loop = [e0]
+        while e != e0:
+            loop.append(e)
+            e = segments.pop(e)
+        # the loops run such that the normals point to the values below iso
+        tris = _triangulate_loop(loop)
+        if tris is None:
+            tris = [(loop[0], loop[i], loop[i + 1]) for i in range(1, len(loop) - 1)]
+        triangles.extend(tris)
+    return triangles
+
+
+def _on_same_face(e1, e2):
+    """whether the cube edges e1 and e2 lie on a common face"""
+    corners = _CORNERS[list(_EDGES[e1]) + list(_EDGES[e2])]
+    return np.any(np.all(corners == corners[0], axis=0))
+
+
+def _triangulate_loop(loop):
+    """a triangulation of the polygon loop without diagonals that lie on a cube face
+    (those would be shared with the neighboring cube), None if there is none
+    """
+    if len(loop) < 3:
+        return []
+    if len(loop) == 3:
+        return [tuple(loop)]
+    # the triangle on the side (loop[0], loop[1])
+    for k in range(2, len(loop)):
+        if (k > 2 and _on_same_face(loop[1], loop[k])) or (k < len(loop) - 1 and _on_same_face(loop[0], loop[k])):
+            continue
+        left = _triangulate_loop(loop[1:k + 1])
+        right = _triangulate_loop([loop[0]] + loop[k:])
+        if left is not None and right is not None:
+            return [(loop[0], loop[1], loop[k])] + left + right
+    return None
+
+
+_tables = None
+
+
+def _get_tables():
+    """the triangle table (256, max_triangles, 3) of cube edges (-1 padded)"""
+    global _tables
+    if _tables is None:
+        faces = _faces()
+        edge_index = dict((e, i) for i, e in enumerate(_EDGES))
+        cases = [_triangulate_case(case, faces, edge_index) for case in range(256)]
+        table = -np.ones((256, max(len(c) for c in cases), 3), np.int64)
+        for case, tris in enumerate(cases):
+            if tris:
+                table[case, :len(tris)] = tris
+        _tables = table
+    return _tables
+
+
+def cube_cases(data, iso):
+    """the marching cubes case (uint8) of every cell of data, of shape (Nz-1, Ny-1, Nx-1)
+
+    bit k is set if corner k of the cell is above iso
+    """
+    inside = np.asarray(data) > iso
+    nz, ny, nx = (n - 1 for n in inside.shape)
+    cases = np.zeros((nz, ny, nx), np.uint8)
+    for k, (dx, dy, dz) in enumerate(_CORNERS):
+        cases |= inside[dz:dz + nz, dy:dy + ny, dx:dx + nx].view(np.uint8) << np.uint8(k)
+    return cases
+
+
+_prog = None
+
+
+def _get_program():
+    global _prog
+    if _prog is None:
+        from gputools import OCLProgram
+        _prog = OCLProgram(absPath("kernels/marching_cubes.cl"))
+    return _prog
+
+
+def cube_cases_gpu(data, iso):
+    """the same as cube_cases, computed with OpenCL"""
+    init_opencl()
+    from gputools import OCLArray
+
+    data_g = OCLArray.from_array(np.ascontiguousarray(data, dtype=np.float32))
+    Nz, Ny, Nx = data.shape
+    cases_g = OCLArray.empty((Nz - 1, Ny - 1, Nx - 1), np.uint8)
+    _get_program().run_kernel("cube_cases", (Nx - 1, Ny - 1, Nz - 1), None,
+                              data_g.data, cases_g.data, np.float32(iso))
+    return cases_g.get()
+
+
+def _gradient(data, z, y, x):
+    """the gradient (x,y,z) of data at the voxels (z,y,x) (central differences, one sided at the border)"""
+    grad = []
+    for axis, pos in ((2, x), (1, y), (0, z)):
+        inds_p, inds_m = [z, y, x], [z, y, x]
+        inds_p[axis] = np.minimum(pos + 1, data.shape[axis] - 1)
+        inds_m[axis] = np.maximum(pos - 1, 0)
+        diff = data[tuple(inds_p)].astype(np.float32) - data[tuple(inds_m)]
+        grad.append(diff / np.maximum(inds_p[axis] - inds_m[axis], 1))
+    return np.stack(grad, axis=-1)
+
+
+def marching_cubes(data, iso, chunk_size=32, gpu=True):
+    """
+    extracts the iso surface of data at the value iso
+
+    Parameters
+    ----------
+    data: ndarray of shape (Nz, Ny, Nx)
+    iso: float
+        the iso value, the surface encloses the values above it
+    chunk_size: int
+        the number of z planes processed at once
+    gpu: bool
+        compute the cube cases with OpenCL (falls back to numpy if that fails)
+
+    Returns
+    -------
+        vertices, normals, indices
+        vertices (n,3) are in (x,y,z) voxel coordinates, normals (n,3) point to the values below iso
+        and indices (n_triangles, 3) are oriented counterclockwise when seen from outside
+    """
+    data = np.asarray(data)
+    if data.ndim != 3:
+        raise ValueError("data should be 3d (is %sd)" % data.ndim)
+
+    Nz, Ny, Nx = data.shape
+    N = Nz * Ny * Nx
+    table = _get_tables()
+
+    # the offset of the global id of every cube edge: axis*N + index of its lower corner
+    edge_offsets = np.array([int(np.log2(a ^ b)) * N + (_CORNERS[a, 2] * Ny + _CORNERS[a, 1]) * Nx + _CORNERS[a, 0]
+                             for a, b in _EDGES], np.int64)
+
+    ids = []
+    for z0 in range(0, max(Nz - 1, 0), chunk_size):
+        z1 = min(z0 + chunk_size, Nz - 1)
+        chunk = data[z0:z1 + 1]
+        cases = None
+        if gpu:
+            try:
+                cases = cube_cases_gpu(chunk, iso)
+            except Exception as e:
+                logger.warning("gpu marching cubes failed (%s), using numpy", e)
+                gpu = False
+        if cases is None:
+            cases = cube_cases(chunk, iso)
+
+        cells = np.flatnonzero((cases != 0) & (cases != 255))
+        if len(cells) == 0:
+            continue
+        tris = table[cases.ravel()[cells]]
+        m, t = np.nonzero(tris[:, :, 0] >= 0)
+        z, y, x = np.unravel_index(cells[m], cases.shape)
+        corner = ((z + z0) * Ny + y) * Nx + x
+        ids.append(edge_offsets[tris[m, t]] + corner[:, np.newaxis])
+
+    if len(ids) == 0:
+        return np.zeros((0, 3), np.float32), np.zeros((0, 3), np.float32), np.zeros((0, 3), np.uint32)
+
+    # the vertices on the edges shared by several triangles
+    edges, indices = np.unique(np.concatenate(ids), return_inverse=True)
+    indices = indices.reshape((-1, 3)).astype(np.uint32)
+
+    axis, lower = np.divmod(edges, N)
+    z, y, x = np.unravel_index(lower, data.shape)
+    step = np.eye(3, dtype=np.int64)[axis]
+    z2, y2, x2 = z + step[:, 2], y + step[:, 1], x + step[:, 0]
+
+    v1 = data[z, y, x].astype(np.float32)
+    v2 = data[z2, y2, x2].astype(np.float32)
+    lam = ((iso - v1) / (v2 - v1))[:, np.newaxis]
+
+    vertices = np.stack([x, y, z], axis=-1) + lam * step
+    grad = (1. - lam) * _gradient(data, z, y, x) + lam * _gradient(data, z2, y2, x2)
+    normals = -grad / (np.linalg.norm(grad, axis=-1, keepdims=True) + 1.e-10)
+
+    return vertices.astype(np.float32), normals.astype(np.float32), indices
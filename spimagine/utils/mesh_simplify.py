@@ -0,0 +1,111 @@
+"""
+mesh simplification by vertex clustering
+
+all vertices falling into the same cell of a regular grid are merged into
+their mean, triangles that collapse are dropped.
+Used to create the levels of detail of large meshes (see spimagine.gui.mesh.Mesh.lod_levels)
+
+"""
+
+from __future__ import absolute_import, print_function
+
+import numpy as np
+
+
+def decimate(vertices, indices, cell_size, normals=None):
+    """
+    simplifies the triangle mesh (vertices, indices) by merging all vertices within
+    cubic cells of size cell_size
+
+    Parameters
+    ----------
+    vertices: ndarray of shape (n_vertices, 3)
+    indices: ndarray of shape (n_triangles, 3) (or flattened)
+    cell_size: float
+        the edge length of the cells, i.e. the size of the smallest details kept
+    normals: ndarray of shape (n_vertices, 3) or None
+        the vertex normals, that are averaged over the merged vertices
+
+    Returns
+    -------
+        vertices, normals, indices
+        (normals is None if not given)
+    """
+    vertices = np.asarray(vertices, np.float32).reshape((-1, 3))
+    indices = np.asarray(indices, np.uint32).reshape((-1, 3))
+
+    cells = np.floor((vertices - vertices.min(axis=0)) / cell_size).astype(np.int64)
+    # a single integer key per cell is much faster to sort than the rows
+    shape = cells.max(axis=0) + 1 if len(cells) > 0 else np.ones(3, np.int64)
+    _, labels = np.unique((cells[:, 0] * shape[1] + cells[:, 1]) * shape[2] + cells[:, 2], return_inverse=True)
+    labels = labels.ravel()
+    n_cells = labels.max() + 1 if len(labels) > 0 else 0
+
+    count = np.bincount(labels, minlength=n_cells).astype(np.float32)
+    new_vertices = np.stack([np.bincount(labels, vertices[:, i], minlength=n_cells)
+                             for i in range(3)], axis=-1) / count[:, np.newaxis]
+
+    new_normals = None
+    if normals is not None:
+        normals = np.asarray(normals, np.float32).reshape((-1, 3))
+        new_normals = np.stack([np.bincount(labels, normals[:, i], minlength=n_cells)
+                                for i in range(3)], axis=-1)
+        new_normals /= np.linalg.norm(new_normals, axis=-1, keepdims=True) + 1.e-10
+        new_normals = new_normals.astype(np.float32)
+
+    # drop the collapsed and the duplicated triangles (keeping their orientation)
+    tris = labels[indices]
+    tris = tris[(tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 2] != tris[:, 0])]
+    if len(tris) > 0:
+        shift = np.argmin(tris, axis=1)
+        rolled = tris[np.arange(len(tris))[:, np.newaxis], (shift[:, np.newaxis] + np.arange(3)) % 3]
+        if float(n_cells) ** 3 < 2 ** 63:
+            _, ind = np.unique((rolled[:, 0] * n_cells + rolled[:, 1]) * n_cells + rolled[:, 2], return_index=True)
+        else:
+            _, ind = np.unique(rolled, axis=0, return_index=True)
+        tris = tris[np.sort(ind)]
+
+    # remove the cells not used by any triangle
+    used = np.zeros(n_cells, bool)
+    used[tris.ravel()] = True
+    remap = np.cumsum(used) - 1
+    new_vertices = new_vertices[used].astype(np.float32)
+    if new_normals is not None:
+        new_normals = new_normals[used]
+    new_indices = remap[tris].astype(np.uint32)
+
+    return new_vertices, new_normals, new_indices
+
+
+def lod_levels(vertices, indices, normals=None, n_levels=4, factor=2., min_triangles=1000):
+    """
+    the coarser levels of detail of the mesh (vertices, indices)
+
+    the cell size of the first level is the median edge length, and grows by factor
+    with every level. Stops early if a level has less than min_triangles.
+
+    Returns
+    -------
+        list of (cell_size, vertices, normals, indices), from fine to coarse
+    """
+    vertices = np.asarray(vertices, np.float32).reshape((-1, 3))
+    indices = np.asarray(indices, np.uint32).reshape((-1, 3))
+    if len(indices) == 0:
+        return []
+
+    edges = vertices[indices] - vertices[np.roll(indices, 1, axis=1)]
+    cell_size = float(np.median(np.linalg.norm(edges, axis=-1)))
+    if cell_size <= 0:
+        return []
+
+    levels = []
+    n_tris = len(indices)
+    for _ in range(n_levels):
+        cell_size *= factor
+        # every level is decimated from the full mesh, so errors dont accumulate
+        v, n, ind = decimate(vertices, indices, cell_size, normals)
+        if len(ind) < min_triangles or len(ind) >= n_tris:
+            break
+        levels.append((cell_size, v, n, ind))
+        n_tris = len(ind)
+    return levels
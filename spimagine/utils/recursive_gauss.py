@@ -0,0 +1,167 @@
+"""
+recursive gaussian filter (Young - van Vliet, 1995)
+
+the gaussian is approximated by a third order causal + anticausal IIR filter,
+so the cost per voxel does not depend on sigma (unlike a convolution with a
+kernel of size ~ 4*sigma).
+
+recursive_gaussian   -> numpy, vectorized over whole planes
+recursive_gaussian_gpu -> OpenCL, one work item per line
+
+I.T. Young, L.J. van Vliet, "Recursive implementation of the Gaussian filter",
+Signal Processing 44 (1995)
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import os
+import numpy as np
+from six.moves import range
+
+from spimagine.config.config import init_opencl
+
+
+def absPath(myPath):
+    return os.path.join(os.path.abspath(os.path.dirname(__file__)), myPath)
+
+
+def yvv_coefficients(sigma):
+    """returns the filter coefficients (B, a1, a2, a3) of
+
+    w[n] = B*x[n] + a1*w[n-1] + a2*w[n-2] + a3*w[n-3]
+    """
+    if sigma < .5:
+        raise ValueError("sigma should be >= 0.5 (is %s)" % sigma)
+
+    if sigma >= 2.5:
+        q = 0.98711 * sigma - 0.96330
+    else:
+        q = 3.97156 - 4.14554 * np.sqrt(1. - 0.26891 * sigma)
+
+    b0 = 1.57825 + 2.44413 * q + 1.4281 * q ** 2 + 0.422205 * q ** 3
+    b1 = 2.44413 * q + 2.85619 * q ** 2 + 1.26661 * q ** 3
+    b2 = -(1.4281 * q ** 2 + 1.26661 * q ** 3)
+    b3 = 0.422205 * q ** 3
+
+    B = 1. - (b1 + b2 + b3) / b0
+    return B, b1 / b0, b2 / b0, b3 / b0
+
+
+def triggs_matrix(a1, a2, a3):
+    """the matrix M of the boundary condition of the anticausal pass (Triggs and Sdika, 2006)
+
+    [y[N-1], y[N], y[N+1]] = B * M.dot([w[N-1], w[N-2], w[N-3]] - u) + u
+
+    with w the output of the causal pass and u the (constant) continuation of the input
+    """
+    scale = 1. / ((1. + a1 - a2 + a3) * (1. - a1 - a2 - a3) * (1. + a2 + (a1 - a3) * a3))
+    return scale * np.array(
+        [[-a3 * a1 + 1. - a3 * a3 - a2, (a3 + a1) * (a2 + a3 * a1), a3 * (a1 + a3 * a2)],
+         [a1 + a3 * a2, -(a2 - 1.) * (a2 + a3 * a1), -a3 * (a3 * a1 + a3 * a3 + a2 - 1.)],
+         [a3 * a1 + a2 + a1 * a1 - a2 * a2, a1 * a2 + a3 * a2 * a2 - a1 * a3 * a3 - a3 * a3 * a3 - a3 * a2 + a3,
+          a3 * (a1 + a3 * a2)]])
+
+
+def _filter_axis0(x, sigma):
+    """filters x along the first axis in place (every step works on a whole plane)"""
+    B, a1, a2, a3 = yvv_coefficients(sigma)
+    M = triggs_matrix(a1, a2, a3)
+    B, a1, a2, a3 = [np.float32(c) for c in (B, a1, a2, a3)]
+    N = x.shape[0]
+    tmp = np.empty_like(x[0])
+    u = x[N - 1].copy()
+
+    # causal pass, the boundary is the steady state of a constant signal
+    p1 = p2 = p3 = x[0].copy()
+    for n in range(N):
+        np.multiply(B, x[n], out=tmp)
+        tmp += a1 * p1
+        tmp += a2 * p2
+        tmp += a3 * p3
+        x[n] = tmp
+        p3, p2, p1 = p2, p1, x[n]
+
+    # anticausal pass
+    w = [x[max(0, N - 1 - k)] - u for k in range(3)]
+    p1, p2, p3 = [(B * sum(M[i, k] * w[k] for k in range(3)) + u).astype(np.float32) for i in range(3)]
+    x[N - 1] = p1
+    for n in range(N - 2, -1, -1):
+        np.multiply(B, x[n], out=tmp)
+        tmp += a1 * p1
+        tmp += a2 * p2
+        tmp += a3 * p3
+        x[n] = tmp
+        p3, p2, p1 = p2, p1, x[n]
+
+
+def _sigmas(sigma, ndim):
+    if np.isscalar(sigma):
+        return (sigma,) * ndim
+    if len(sigma) != ndim:
+        raise ValueError("sigma should be a scalar or of length %i" % ndim)
+    return tuple(sigma)
+
+
+def recursive_gaussian(data, sigma):
+    """gaussian blur of data with sigma (scalar or one per axis) via recursive filtering
+
+    boundaries are treated as constant continuation of the edge values
+    """
+    out = np.array(data, dtype=np.float32)
+    for axis, s in enumerate(_sigmas(sigma, out.ndim)):
+        if s > 0 and out.shape[axis] > 1:
+            _filter_axis0(np.moveaxis(out, axis, 0), s)
+    return out
+
+
+_prog = None
+
+
+def _get_program():
+    global _prog
+    if _prog is None:
+        from gputools import OCLProgram
+        _prog = OCLProgram(absPath("kernels/recursive_gauss.cl"))
+    return _prog
+
+
+def recursive_gaussian_gpu(data_g, sigma, res_g=None):
+    """the same as recursive_gaussian for a 3d float32 OCLArray
+
+    if res_g is not given, a new array is returned, else the result is written into res_g
+    (which might be data_g itself)
+    """
+    init_opencl()
+    from gputools import OCLArray
+
+    if data_g.ndim != 3 or data_g.dtype != np.float32:
+        raise ValueError("data_g should be a 3d float32 array")
+
+    if res_g is None:
+        res_g = OCLArray.empty(data_g.shape, np.float32)
+    if res_g is not data_g:
+        res_g.copy_buffer(data_g)
+
+    prog = _get_program()
+    Nz, Ny, Nx = data_g.shape
+
+    # (number of elements, stride, global size, strides of the two other axis)
+    lines = {0: (Nz, Ny * Nx, (Nx, Ny), (1, Nx)),
+             1: (Ny, Nx, (Nx, Nz), (1, Ny * Nx)),
+             2: (Nx, 1, (Ny, Nz), (Nx, Ny * Nx))}
+
+    for axis, s in enumerate(_sigmas(sigma, 3)):
+        N, stride, gsize, (s0, s1) = lines[axis]
+        if s <= 0 or N <= 1:
+            continue
+        B, a1, a2, a3 = yvv_coefficients(s)
+        M_g = OCLArray.from_array(triggs_matrix(a1, a2, a3).astype(np.float32).ravel())
+        prog.run_kernel("recursive_gauss_line", gsize, None, res_g.data,
+                        np.int32(N), np.int32(stride), np.int32(s0), np.int32(s1),
+                        np.float32(B), np.float32(a1), np.float32(a2), np.float32(a3),
+                        M_g.data)
+    return res_g
@@ -35,15 +35,15 @@ logger = logging.getLogger(__name__)
 
 import os
 # this is due to some pyinstaller bug!
-from scipy.integrate import *
-from scipy.misc import imsave
 import numpy as np
 from scipy.linalg import inv
 from time import time
 import sys
 from gputools import init_device, get_device, OCLProgram, OCLArray, OCLImage
+from pyopencl.array import Array as CLArray
 from spimagine.utils.transform_matrices import *
 import spimagine
+from spimagine.utils.instrumentation import instrumentation
 
 
 def absPath(myPath):
@@ -73,6 +73,9 @@ class VolumeRenderer:
     def __init__(self, size=None, interpolation='linear'):
         """ e.g. size = (300,300)"""
 
+        # the configured OpenCL device is only initialised once a renderer is created
+        spimagine.config.init_opencl()
+
         try:
             # simulate GPU fail...
             # raise Exception()
@@ -279,8 +282,23 @@ class VolumeRenderer:
             #         channel_type = cl_datatype_dict[self.dtype])
 
     def update_data(self, data, copyData=False):
+        with instrumentation.span("upload"):
+            self._update_data(data, copyData)
+
+    def _update_data(self, data, copyData=False):
         # do we really want to copy here?
 
+        if isinstance(data, CLArray):
+            if self.dataSlices is None:
+                # already on the device, so just copy it into the image
+                if data.dtype != self.dtype:
+                    data = data.astype(self.dtype)
+                self._data = data
+                self.dataImg.copy_buffer(data)
+                return
+            else:
+                data = data.get()
+
         if self.dataSlices is not None:
             self._data = data[self.dataSlices].copy()
         else:
@@ -364,31 +382,39 @@ class VolumeRenderer:
 
 
 
-        self.proc.run_kernel(method,
-                             (self.width, self.height),
-                             None,
-                             self.buf.data, self.buf_alpha.data,
-                             self.buf_depth.data,
-                             np.int32(self.width), np.int32(self.height),
-                             np.float32(self.boxBounds[0]),
-                             np.float32(self.boxBounds[1]),
-                             np.float32(self.boxBounds[2]),
-                             np.float32(self.boxBounds[3]),
-                             np.float32(self.boxBounds[4]),
-                             np.float32(self.boxBounds[5]),
-                             np.float32(self.minVal),
-                             np.float32(self.maxVal),
-                             np.float32(self.gamma),
-                             np.float32(self.alphaPow),
-                             np.int32(numParts),
-                               np.int32(currentPart),
-                             self.invPBuf.data,
-                             self.invMBuf.data,
-                             self.dataImg)
-
-        self.output = self.buf.get()
-        self.output_alpha = self.buf_alpha.get()
-        self.output_depth = self.buf_depth.get()
+        with instrumentation.span("kernel", method=method):
+            self.proc.run_kernel(method,
+                                 (self.width, self.height),
+                                 None,
+                                 self.buf.data, self.buf_alpha.data,
+                                 self.buf_depth.data,
+                                 np.int32(self.width), np.int32(self.height),
+                                 np.float32(self.boxBounds[0]),
+                                 np.float32(self.boxBounds[1]),
+                                 np.float32(self.boxBounds[2]),
+                                 np.float32(self.boxBounds[3]),
+                                 np.float32(self.boxBounds[4]),
+                                 np.float32(self.boxBounds[5]),
+                                 np.float32(self.minVal),
+                                 np.float32(self.maxVal),
+                                 np.float32(self.gamma),
+                                 np.float32(self.alphaPow),
+                                 np.int32(numParts),
+                                   np.int32(currentPart),
+                                 self.invPBuf.data,
+                                 self.invMBuf.data,
+                                 self.dataImg)
+            self._finish()
+
+        with instrumentation.span("readback"):
+            self.output = self.buf.get()
+            self.output_alpha = self.buf_alpha.get()
+            self.output_depth = self.buf_depth.get()
+
+    def _finish(self):
+        # only wait for the kernels if they are timed (the readback waits for them anyway)
+        if instrumentation.enabled:
+            self.buf.queue.finish()
 
     def _convolve_scalar(self, buf, radius=11):
 
@@ -449,62 +475,65 @@ class VolumeRenderer:
         with ambient occlusion
         """
 
-        self.proc.run_kernel("iso_surface",
-                             (self.width, self.height),
-                             None,
-                             self.buf.data, self.buf_alpha.data,
-                             self.buf_depth.data, self.buf_normals.data,
-                             np.int32(self.width), np.int32(self.height),
-                             np.float32(self.boxBounds[0]),
-                             np.float32(self.boxBounds[1]),
-                             np.float32(self.boxBounds[2]),
-                             np.float32(self.boxBounds[3]),
-                             np.float32(self.boxBounds[4]),
-                             np.float32(self.boxBounds[5]),
-                             np.float32(self.maxVal/2),
-                             np.float32(self.gamma),
-                             self.invPBuf.data,
-                             self.invMBuf.data,
-                             self.dataImg,
-                             np.int32(self.dtype in [np.uint16, np.uint8])
-                             )
-        self._convolve_vec(self.buf_normals, 7)
-        #
-        self.proc.run_kernel("occlusion",
-                             (self.width, self.height),
-                             None,
-                             self.buf_occlusion.data,
-                             np.int32(self.width), np.int32(self.height),
-                             np.int32(self.occ_radius),
-                             np.int32(self.occ_n_points),
-                             self.buf_depth.data,
-                             self.buf_normals.data,
-                             )
-
-        self._convolve_scalar(self.buf_occlusion, 5)
-
-        self.proc.run_kernel("shading",
-                             (self.width, self.height),
-                             None,
-                             self.buf.data, self.buf_alpha.data,
-                             np.int32(self.width), np.int32(self.height),
-                             self.invPBuf.data,
-                             self.invMBuf.data,
-                             np.float32(self.occ_strength),
-                             self.buf_normals.data,
-                             self.buf_depth.data,
-                             self.buf_occlusion.data,
-
-                             )
+        with instrumentation.span("kernel", method="iso_surface"):
+            self.proc.run_kernel("iso_surface",
+                                 (self.width, self.height),
+                                 None,
+                                 self.buf.data, self.buf_alpha.data,
+                                 self.buf_depth.data, self.buf_normals.data,
+                                 np.int32(self.width), np.int32(self.height),
+                                 np.float32(self.boxBounds[0]),
+                                 np.float32(self.boxBounds[1]),
+                                 np.float32(self.boxBounds[2]),
+                                 np.float32(self.boxBounds[3]),
+                                 np.float32(self.boxBounds[4]),
+                                 np.float32(self.boxBounds[5]),
+                                 np.float32(self.maxVal/2),
+                                 np.float32(self.gamma),
+                                 self.invPBuf.data,
+                                 self.invMBuf.data,
+                                 self.dataImg,
+                                 np.int32(self.dtype in [np.uint16, np.uint8])
+                                 )
+            self._convolve_vec(self.buf_normals, 7)
+            #
+            self.proc.run_kernel("occlusion",
+                                 (self.width, self.height),
+                                 None,
+                                 self.buf_occlusion.data,
+                                 np.int32(self.width), np.int32(self.height),
+                                 np.int32(self.occ_radius),
+                                 np.int32(self.occ_n_points),
+                                 self.buf_depth.data,
+                                 self.buf_normals.data,
+                                 )
+
+            self._convolve_scalar(self.buf_occlusion, 5)
+
+            self.proc.run_kernel("shading",
+                                 (self.width, self.height),
+                                 None,
+                                 self.buf.data, self.buf_alpha.data,
+                                 np.int32(self.width), np.int32(self.height),
+                                 self.invPBuf.data,
+                                 self.invMBuf.data,
+                                 np.float32(self.occ_strength),
+                                 self.buf_normals.data,
+                                 self.buf_depth.data,
+                                 self.buf_occlusion.data,
+
+                                 )
+            self._finish()
 
         # self._convolve_scalar(self.buf,13)
         # self._convolve_vec(self.buf_normals,101)
 
-        self.output = self.buf.get()
-        self.output_alpha = self.buf_alpha.get()
-        self.output_depth = self.buf_depth.get()
-        self.output_normals = self.buf_normals.get()
-        self.output_occlusion = self.buf_occlusion.get()
+        with instrumentation.span("readback"):
+            self.output = self.buf.get()
+            self.output_alpha = self.buf_alpha.get()
+            self.output_depth = self.buf_depth.get()
+            self.output_normals = self.buf_normals.get()
+            self.output_occlusion = self.buf_occlusion.get()
 
     def render(self, data=None, stackUnits=None,
                minVal=None, maxVal=None, gamma=None,
@@ -0,0 +1,260 @@
+"""
+the benchmark groups
+
+render:       VolumeRenderer.render for every method
+containers:   open and __getitem__ of every GenericData container
+datamodel:    DataModel.__getitem__ during playback, with and without prefetching
+keyframes:    KeyFrameList.getTransform
+alpha_shape:  alpha_shape in 2d and 3d
+meshes:       EllipsoidMesh generation and marching cubes
+"""
+
+from __future__ import print_function, unicode_literals, absolute_import, division
+
+import os
+import numpy as np
+
+from tests.benchmarks.suite import Case, benchmark
+from tests.benchmarks import synthetic
+from tests.benchmarks.synthetic import SIZES
+
+# number of timepoints of the container volumes
+N_T = 4
+
+# image size of the renderer
+RENDER_SIZE = (256, 256)
+
+# number of points for the alpha shapes
+ALPHA_POINTS = {"small": 300, "medium": 1000, "large": 3000}
+
+# (n_phi, n_theta) of the ellipsoid meshes
+MESH_RESOLUTION = {"small": (30, 20), "medium": (100, 50), "large": (300, 150)}
+
+# data models whose load thread is still running down (a QThread must not be destroyed while running)
+_stopped_models = []
+
+
+def _cycle(n):
+    """a callable returning 0,1,...,n-1,0,1,..."""
+    state = [-1]
+
+    def _next():
+        state[0] = (state[0] + 1) % n
+        return state[0]
+
+    return _next
+
+
+@benchmark("render")
+def render_cases(sizes, dtypes, workdir):
+    from spimagine.volumerender.volumerender import VolumeRenderer
+
+    rend = VolumeRenderer(RENDER_SIZE)
+    for size in sizes:
+        for dtype in dtypes:
+            data = synthetic.synthetic_volume((SIZES[size],) * 3, dtype)
+            rend.set_data(data)
+            rend.set_max_val(float(data.max()))
+            rend.set_min_val(0.)
+
+            for method in ("max_project", "iso_surface"):
+                yield Case("render.%s.%s.%s" % (method, size, dtype),
+                           lambda method=method: rend.render(method=method))
+
+
+def _container_factories(size, dtype, workdir):
+    """(name, open function) of every container holding N_T synthetic volumes of size and dtype"""
+    from spimagine.models.data_model import (SpimData, XwingData, TiffData, TiffFolderData,
+                                             TiffMultipleFiles, RawData, RawMultipleFiles,
+                                             NumpyData, Img2dData, ReducedData, DemoData, EmptyData)
+    from spimagine.models.lazy_data import LazyArrayData
+    from spimagine.models.chunked_data import ChunkedData, write_chunked
+
+    N = SIZES[size]
+    shape = (N_T, N, N, N)
+    data = synthetic.synthetic_volume(shape, dtype)
+    folder = os.path.join(workdir, "%s_%s" % (size, dtype))
+    os.makedirs(folder)
+
+    def _path(name):
+        return os.path.join(folder, name)
+
+    yield "NumpyData", lambda: NumpyData(data)
+    yield "ReducedData", lambda: ReducedData(NumpyData(data), binning=(2, 2, 2))
+
+    raw = synthetic.write_raw(_path("data.raw"), data)
+    yield "RawData", lambda: RawData(raw, shape, dtype)
+    yield "LazyArrayData", lambda: LazyArrayData(np.memmap(raw, dtype=dtype, mode="r", shape=shape))
+
+    raws = synthetic.write_raw_files(_path("raws"), data)
+    yield "RawMultipleFiles", lambda: RawMultipleFiles(raws, (1,) + shape[1:], dtype)
+
+    tiff = synthetic.write_tiff(_path("data.tif"), data)
+    yield "TiffData", lambda: TiffData(tiff)
+
+    tiffs = synthetic.write_tiff_files(_path("tiffs"), data)
+    yield "TiffFolderData", lambda: TiffFolderData(_path("tiffs"))
+    yield "TiffMultipleFiles", lambda: TiffMultipleFiles(tiffs)
+
+    write_chunked(_path("data.spimc"), data, chunks=(32, 32, 32))
+    yield "ChunkedData", lambda: ChunkedData(_path("data.spimc"))
+
+    if dtype == "uint16":
+        # these formats are always 16 bit
+        spim = synthetic.write_spim(_path("spim"), data)
+        yield "SpimData", lambda: SpimData(spim)
+        xwing = synthetic.write_xwing(_path("xwing"), data)
+        yield "XwingData", lambda: XwingData(xwing)
+
+        png = synthetic.write_png(_path("img.png"), data)
+        yield "Img2dData", lambda: Img2dData(png)
+        yield "DemoData", lambda: DemoData(N)
+        yield "EmptyData", lambda: EmptyData()
+
+
+@benchmark("containers")
+def container_cases(sizes, dtypes, workdir):
+    from spimagine.models.shared_memory_data import SharedMemoryWriter, SharedMemoryData
+
+    for size in sizes:
+        for dtype in dtypes:
+            for name, open_container in _container_factories(size, dtype, workdir):
+                yield Case("container.%s.open.%s.%s" % (name, size, dtype), open_container)
+
+                def _getitem(open_container=open_container, state={}):
+                    # opened in the (untimed) warmup call, so a broken container only fails its own cases
+                    if not state:
+                        state["d"] = open_container()
+                        state["pos"] = _cycle(state["d"].sizeT())
+                    d = state["d"]
+                    d.release(d[state["pos"]()])
+
+                yield Case("container.%s.getitem.%s.%s" % (name, size, dtype), _getitem)
+
+            N = SIZES[size]
+            writer = SharedMemoryWriter(shape=(N, N, N), dtype=dtype, n_slots=N_T)
+            for vol in synthetic.synthetic_volume((N_T, N, N, N), dtype):
+                writer.push(vol)
+
+            yield Case("container.SharedMemoryData.open.%s.%s" % (size, dtype),
+                       lambda: SharedMemoryData(writer.name).close())
+
+            d = SharedMemoryData(writer.name)
+            pos = _cycle(d.sizeT())
+
+            def _teardown(d=d, writer=writer):
+                d.close()
+                writer.close()
+                writer.unlink()
+
+            yield Case("container.SharedMemoryData.getitem.%s.%s" % (size, dtype),
+                       lambda d=d, pos=pos: d[pos()], teardown=_teardown)
+
+
+@benchmark("datamodel")
+def datamodel_cases(sizes, dtypes, workdir, fps=20):
+    """the time to get the current frame while playing back at fps"""
+    from spimagine.models.data_model import DataModel, RawMultipleFiles, TiffFolderData
+
+    n_t = 8
+    for size in sizes:
+        N = SIZES[size]
+        data = synthetic.synthetic_volume((n_t, N, N, N), np.uint16)
+        folder = os.path.join(workdir, "playback_%s" % size)
+        raws = synthetic.write_raw_files(os.path.join(folder, "raws"), data)
+        synthetic.write_tiff_files(os.path.join(folder, "tiffs"), data)
+
+        containers = (("RawMultipleFiles", lambda: RawMultipleFiles(raws, (1, N, N, N), np.uint16)),
+                      ("TiffFolderData", lambda: TiffFolderData(os.path.join(folder, "tiffs"))))
+
+        for name, open_container in containers:
+            for prefetchSize in (0, 2):
+                model = DataModel(open_container(), prefetchSize=prefetchSize)
+                pos = _cycle(n_t)
+
+                def _step(model=model, pos=pos):
+                    p = pos()
+                    model.setPos(p)
+                    return model[p]
+
+                def _teardown(model=model):
+                    model.stopDataLoadThread()
+                    _stopped_models.append(model)
+
+                yield Case("datamodel.playback.%s.prefetch%s.%s" % (name, prefetchSize, size),
+                           _step, repeat=2 * n_t, interval=1. / fps, teardown=_teardown)
+
+
+@benchmark("keyframes")
+def keyframe_cases(sizes, dtypes, workdir):
+    from spimagine.models.keyframe_model import KeyFrameList, KeyFrame, TransformData
+    from spimagine.utils.quaternion import Quaternion
+
+    rng = np.random.RandomState(0)
+    for n_keys in (2, 10, 100):
+        keys = KeyFrameList()
+        for i, t in enumerate(np.linspace(0, 1, n_keys)):
+            q = Quaternion(*rng.uniform(-1, 1, 4))
+            keys.addItem(KeyFrame(t, TransformData(quatRot=q.normalize(),
+                                                   zoom=rng.uniform(.5, 2),
+                                                   dataPos=i,
+                                                   maxVal=rng.uniform(10, 100),
+                                                   translate=list(rng.uniform(-1, 1, 3)))))
+
+        ts = np.linspace(0, 1, 200)
+
+        def _interpolate(keys=keys):
+            for t in ts:
+                keys.getTransform(t)
+
+        yield Case("keyframes.getTransform.%skeys" % n_keys, _interpolate)
+
+
+@benchmark("alpha_shape")
+def alpha_shape_cases(sizes, dtypes, workdir):
+    from spimagine.utils import alpha_shape
+
+    for size in sizes:
+        for ndim, alpha in ((2, .1), (3, .2)):
+            points = synthetic.synthetic_points(ALPHA_POINTS[size], ndim)
+            yield Case("alpha_shape.%sd.%s" % (ndim, size),
+                       lambda points=points, alpha=alpha: alpha_shape(points, alpha))
+
+
+@benchmark("meshes")
+def mesh_cases(sizes, dtypes, workdir):
+    from spimagine.gui.mesh import EllipsoidMesh
+
+    for size in sizes:
+        n_phi, n_theta = MESH_RESOLUTION[size]
+
+        def _cold(n_phi=n_phi, n_theta=n_theta):
+            EllipsoidMesh.memoize_dict.pop((n_theta, n_phi), None)
+            EllipsoidMesh(rs=(1., .5, .3), n_phi=n_phi, n_theta=n_theta)
+
+        def _warm(n_phi=n_phi, n_theta=n_theta):
+            EllipsoidMesh(rs=(1., .5, .3), n_phi=n_phi, n_theta=n_theta)
+
+        yield Case("mesh.ellipsoid.cold.%s" % size, _cold)
+        yield Case("mesh.ellipsoid.warm.%s" % size, _warm)
+
+    # one mesh per detected nucleus
+    rng = np.random.RandomState(0)
+    n = 1000
+    positions, rs = rng.uniform(-1, 1, (n, 3)), rng.uniform(.01, .05, (n, 3))
+
+    def _loop():
+        for p, r in zip(positions, rs):
+            EllipsoidMesh(rs=r, pos=p)
+
+    yield Case("mesh.ellipsoids.loop.%s" % n, _loop)
+    yield Case("mesh.ellipsoids.bulk.%s" % n, lambda: EllipsoidMesh.bulk(positions, rs))
+
+    from spimagine.utils.marching_cubes import marching_cubes
+
+    for size in sizes:
+        data = synthetic.synthetic_volume((SIZES[size],) * 3, np.float32)
+        iso = .5 * float(data.max())
+        for gpu in (False, True):
+            yield Case("mesh.marching_cubes.%s.%s" % ("gpu" if gpu else "numpy", size),
+                       lambda data=data, iso=iso, gpu=gpu: marching_cubes(data, iso, gpu=gpu))
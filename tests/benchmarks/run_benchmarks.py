@@ -0,0 +1,113 @@
+"""
+runs the benchmark suite and compares it to a json baseline
+
+python -m tests.benchmarks.run_benchmarks --save tests/benchmarks/baselines/cpu.json
+python -m tests.benchmarks.run_benchmarks --compare tests/benchmarks/baselines/cpu.json --threshold .3
+
+exits with 1 if a case got slower than the threshold allows.
+By default the OpenCL CPU device is used, so that the numbers are comparable between machines
+without a gpu (and on CI); use --device gpu to benchmark the gpu instead.
+
+for all the options run
+python -m tests.benchmarks.run_benchmarks -h
+"""
+
+from __future__ import print_function, unicode_literals, absolute_import, division
+
+import sys
+import json
+import logging
+import argparse
+
+from tests.benchmarks import suite
+from tests.benchmarks.synthetic import SIZES, DTYPES
+# registers the benchmark groups
+from tests.benchmarks import benchmarks
+
+
+def init_device(device="cpu"):
+    """initializes the OpenCL device spimagine will use ("cpu", "gpu" or "default")"""
+    import spimagine.config as config
+    if device != "default":
+        config.__USE_GPU__ = device == "gpu"
+        config.__ID_PLATFORM__ = -1
+        config.__ID_DEVICE__ = -1
+    config.init_opencl()
+    return suite.device_info()
+
+
+def _parse_thresholds(items):
+    """["render.*=.5", ...] -> {"render.*": .5}"""
+    thresholds = {}
+    for item in items or []:
+        pattern, t = item.rsplit("=", 1)
+        thresholds[pattern] = float(t)
+    return thresholds
+
+
+def _print_result(name, res):
+    if "error" in res:
+        print("%-50s  error: %s" % (name, res["error"]))
+    else:
+        print("%-50s %10.3f ms  (+- %.3f, n = %s)" % (name, 1000. * res["median"], 1000. * res["std"], res["n"]))
+    sys.stdout.flush()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="spimagine benchmarks")
+    parser.add_argument("-g", "--groups", nargs="+", choices=list(suite.BENCHMARKS.keys()), default=None,
+                        help="the benchmark groups to run (default: all)")
+    parser.add_argument("-k", "--filter", default="*",
+                        help="only run the cases matching this pattern, e.g. 'render.*'")
+    parser.add_argument("-s", "--sizes", nargs="+", choices=sorted(SIZES.keys()), default=["small", "medium"])
+    parser.add_argument("-t", "--dtypes", nargs="+", choices=DTYPES, default=list(DTYPES))
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="number of timed calls per case")
+    parser.add_argument("--device", choices=("cpu", "gpu", "default"), default="cpu",
+                        help="the OpenCL device to use")
+    parser.add_argument("--save", default=None, help="write the results as baseline to this json file")
+    parser.add_argument("--compare", default=None, help="compare the results to this json baseline")
+    parser.add_argument("--threshold", type=float, default=suite.DEFAULT_THRESHOLD,
+                        help="relative slowdown that counts as regression (default %(default)s)")
+    parser.add_argument("--case-threshold", nargs="+", default=None, metavar="PATTERN=THRESHOLD",
+                        help="thresholds for single cases, e.g. 'datamodel.*=1.'")
+    parser.add_argument("-v", "--verbose", action="store_true")
+
+    args = parser.parse_args(args)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    device = init_device(args.device)
+    print("OpenCL device: %s" % json.dumps(device))
+
+    results = suite.run(args.groups, sizes=args.sizes, dtypes=args.dtypes, repeat=args.repeat,
+                        pattern=args.filter, callback=_print_result)
+
+    thresholds = _parse_thresholds(args.case_threshold)
+
+    if args.save:
+        meta = suite.metadata(sizes=args.sizes, dtypes=args.dtypes, repeat=args.repeat)
+        suite.save(args.save, results, meta, thresholds)
+        print("written %s" % args.save)
+
+    if args.compare:
+        baseline = suite.load(args.compare)
+        base_device = baseline["meta"].get("device", {})
+        if base_device.get("name") != device.get("name"):
+            print("WARNING: baseline was recorded on a different device (%s)" % base_device.get("name"))
+
+        comparison = suite.compare(results, baseline, args.threshold, thresholds)
+        # cases of the baseline that werent run (e.g. because of --groups/--filter) are only counted
+        missing = [c for c in comparison if c[-1] == "missing"]
+        print(suite.format_comparison([c for c in comparison if c[-1] != "missing"]))
+        if missing:
+            print("%s case(s) of the baseline not run" % len(missing))
+        slower = suite.regressions(comparison)
+        if slower:
+            print("%s regression(s) (slower or broken): %s" % (len(slower), ", ".join(c[0] for c in slower)))
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+the benchmark infrastructure
+
+a benchmark group is a generator function registered with @benchmark(group) that yields
+Case objects (a name and a callable to time). Every case is run once to warm up
+(program compilation, caches...) and then timed repeat times.
+
+results are dicts {case name: {"median", "min", "mean", "std", "n"}} (seconds), that
+can be saved as json baselines and compared against them with a relative threshold
+(which can be overwritten per case name pattern)
+"""
+
+from __future__ import print_function, unicode_literals, absolute_import, division
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+import sys
+import time
+import json
+import fnmatch
+import platform
+import traceback
+from collections import OrderedDict
+
+import numpy as np
+
+# group name -> generator function
+BENCHMARKS = OrderedDict()
+
+DEFAULT_THRESHOLD = .25
+
+
+class Case(object):
+    """a single benchmark
+
+    func: the callable to time
+    repeat: number of timed calls (None uses the default of the run)
+    interval: seconds to sleep between the calls (not timed), e.g. for playback
+    teardown: called once after the case was timed
+    """
+
+    def __init__(self, name, func, repeat=None, interval=0., teardown=None):
+        self.name = name
+        self.func = func
+        self.repeat = repeat
+        self.interval = interval
+        self.teardown = teardown
+
+
+def benchmark(group):
+    """registers a generator function (sizes, dtypes, workdir) -> Case objects"""
+
+    def _register(func):
+        BENCHMARKS[group] = func
+        return func
+
+    return _register
+
+
+def measure(func, repeat=5, interval=0., warmup=True):
+    """the timings (seconds) of repeat calls of func"""
+    if warmup:
+        func()
+    ts = []
+    for _ in range(repeat):
+        if interval > 0:
+            time.sleep(interval)
+        t = time.time()
+        func()
+        ts.append(time.time() - t)
+    return ts
+
+
+def stats(ts):
+    ts = np.asarray(ts)
+    return OrderedDict([("median", float(np.median(ts))),
+                        ("min", float(np.min(ts))),
+                        ("mean", float(np.mean(ts))),
+                        ("std", float(np.std(ts))),
+                        ("n", len(ts))])
+
+
+def run(groups=None, sizes=("small",), dtypes=("uint16",), repeat=5, workdir=None, pattern="*",
+        callback=None):
+    """runs the cases of all (or the given) groups whose names match pattern
+
+    a case that fails is stored as {"error": message} instead of failing the run
+    """
+    import tempfile
+    import shutil
+
+    if groups is None:
+        groups = list(BENCHMARKS.keys())
+
+    own_workdir = workdir is None
+    if own_workdir:
+        workdir = tempfile.mkdtemp(prefix="spimagine_bench_")
+
+    results = OrderedDict()
+    try:
+        for group in groups:
+            try:
+                cases = BENCHMARKS[group](sizes, dtypes, workdir)
+                for case in cases:
+                    if not fnmatch.fnmatch(case.name, pattern):
+                        continue
+                    try:
+                        ts = measure(case.func, case.repeat or repeat, case.interval)
+                        results[case.name] = stats(ts)
+                    except Exception as e:
+                        logger.debug(traceback.format_exc())
+                        results[case.name] = {"error": "%s: %s" % (type(e).__name__, e)}
+                    finally:
+                        if case.teardown is not None:
+                            case.teardown()
+                    if callback is not None:
+                        callback(case.name, results[case.name])
+            except Exception as e:
+                logger.debug(traceback.format_exc())
+                results[group] = {"error": "%s: %s" % (type(e).__name__, e)}
+                if callback is not None:
+                    callback(group, results[group])
+    finally:
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def device_info():
+    """name and type of the OpenCL device in use"""
+    try:
+        import pyopencl
+        from gputools import get_device
+        dev = get_device().device
+        return {"name": dev.name.strip(),
+                "type": pyopencl.device_type.to_string(dev.type),
+                "platform": dev.platform.name.strip()}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def metadata(**kwargs):
+    import spimagine
+    meta = OrderedDict([("date", time.strftime("%Y-%m-%d %H:%M:%S")),
+                        ("spimagine", spimagine.__version__),
+                        ("python", sys.version.split()[0]),
+                        ("numpy", np.__version__),
+                        ("platform", platform.platform()),
+                        ("machine", platform.node()),
+                        ("device", device_info())])
+    meta.update(kwargs)
+    return meta
+
+
+def save(fName, results, meta=None, thresholds=None):
+    """writes the results as json baseline
+
+    thresholds is a dict {case name pattern: relative threshold} stored along,
+    e.g. {"render.*": .5}
+    """
+    with open(fName, "w") as f:
+        json.dump(OrderedDict([("meta", meta or metadata()),
+                               ("thresholds", thresholds or {}),
+                               ("results", results)]), f, indent=2)
+
+
+def load(fName):
+    with open(fName) as f:
+        return json.load(f, object_pairs_hook=OrderedDict)
+
+
+def threshold_for(name, threshold=DEFAULT_THRESHOLD, thresholds=None):
+    """the threshold of the first pattern in thresholds that matches name (or the default)"""
+    for pattern, t in (thresholds or {}).items():
+        if fnmatch.fnmatch(name, pattern):
+            return t
+    return threshold
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, thresholds=None, key="median"):
+    """compares results to the baseline (as returned by load)
+
+    a case is a regression if its time is more than (1+threshold) times the baseline
+    the thresholds given take precedence over the ones stored in the baseline
+    a case that had a time in the baseline but fails now is "broken"
+
+    returns a list of (name, baseline time, time, ratio, status) with status in
+    "ok", "faster", "regression", "broken", "new", "missing", "error"
+    """
+    base = baseline["results"]
+    # the given patterns are matched first
+    _thresholds = OrderedDict(thresholds or {})
+    for pattern, t in baseline.get("thresholds", {}).items():
+        _thresholds.setdefault(pattern, t)
+
+    res = []
+    for name, r in results.items():
+        b = base.get(name)
+        if "error" in r:
+            if b is None or "error" in b:
+                res.append((name, None, None, None, "error"))
+            else:
+                res.append((name, b[key], None, None, "broken"))
+        elif b is None or "error" in b:
+            res.append((name, None, r[key], None, "new"))
+        else:
+            ratio = r[key] / max(b[key], 1.e-9)
+            t = threshold_for(name, threshold, _thresholds)
+            if ratio > 1. + t:
+                status = "regression"
+            elif ratio < 1. / (1. + t):
+                status = "faster"
+            else:
+                status = "ok"
+            res.append((name, b[key], r[key], ratio, status))
+
+    for name in base:
+        if name not in results:
+            res.append((name, None, None, None, "missing"))
+    return res
+
+
+def regressions(comparison):
+    """the cases that got slower or fail now (but worked in the baseline)"""
+    return [c for c in comparison if c[-1] in ("regression", "broken")]
+
+
+def format_comparison(comparison):
+    def _ms(t):
+        return "%10.3f" % (1000. * t) if t is not None else "%10s" % "-"
+
+    lines = ["%-50s %10s %10s %7s  %s" % ("case", "base (ms)", "now (ms)", "ratio", "")]
+    for name, b, t, ratio, status in comparison:
+        lines.append("%-50s %s %s %7s  %s" % (name, _ms(b), _ms(t),
+                                              "%.2f" % ratio if ratio is not None else "-",
+                                              status))
+    return "\n".join(lines)
@@ -0,0 +1,129 @@
+"""
+synthetic data for the benchmarks
+
+volumes of a given shape/dtype (a few blobs on a noisy background, so compression and
+rendering behave roughly like on real data) and writers that store them in the layout
+every GenericData container expects
+"""
+
+from __future__ import print_function, unicode_literals, absolute_import, division
+
+import os
+import json
+import numpy as np
+
+from spimagine.utils import imgutils
+
+# edge length of the volumes per size preset
+SIZES = {"small": 32, "medium": 64, "large": 128}
+
+DTYPES = ("uint8", "uint16", "float32")
+
+
+def synthetic_volume(shape, dtype=np.uint16, n_blobs=10, seed=0):
+    """a (z,y,x) or (t,z,y,x) volume of gaussian blobs plus noise, scaled to the range of dtype"""
+    rng = np.random.RandomState(seed)
+    shape = tuple(shape)
+    zyx = shape[-3:]
+    grid = np.meshgrid(*[np.linspace(-1, 1, n, dtype=np.float32) for n in zyx], indexing="ij")
+
+    vol = np.zeros(zyx, np.float32)
+    for _ in range(n_blobs):
+        center = rng.uniform(-.7, .7, 3)
+        sigma = rng.uniform(.05, .2)
+        vol += np.exp(-sum((g - c) ** 2 for g, c in zip(grid, center)) / (2 * sigma ** 2))
+
+    n_t = shape[0] if len(shape) == 4 else 1
+    # every timepoint is slightly different
+    vols = np.stack([vol * (1. - .05 * t) for t in range(n_t)])
+    vols += .05 * rng.uniform(0, 1, vols.shape).astype(np.float32)
+    vols /= vols.max()
+
+    dtype = np.dtype(dtype)
+    if np.issubdtype(dtype, np.integer):
+        vols = np.iinfo(dtype).max * vols
+
+    vols = vols.astype(dtype)
+    return vols if len(shape) == 4 else vols[0]
+
+
+def synthetic_points(n, ndim=3, seed=0):
+    """n points on a concave (dented) sphere/circle"""
+    rng = np.random.RandomState(seed)
+    if ndim == 2:
+        phi = rng.uniform(0, 2 * np.pi, n)
+        return np.stack([np.cos(phi), np.sin(phi) * np.cos(phi)]).T
+    elif ndim == 3:
+        phi = rng.uniform(0, 2 * np.pi, n)
+        theta = np.arccos(rng.uniform(-1, 1, n))
+        return np.stack([np.cos(phi) * np.sin(theta) * np.cos(theta),
+                         np.sin(phi) * np.sin(theta) * np.cos(theta),
+                         np.cos(theta)]).T
+    else:
+        raise ValueError("ndim should be 2 or 3 (is %s)" % ndim)
+
+
+def _makedirs(d):
+    if not os.path.exists(d):
+        os.makedirs(d)
+    return d
+
+
+def write_spim(folder, data):
+    """SpimData folder (uint16 only)"""
+    imgutils.createSpimFolder(folder, stackSize=data.shape)
+    data.astype(np.uint16).tofile(os.path.join(folder, "data", "data.bin"))
+    return folder
+
+
+def write_xwing(folder, data):
+    """XwingData folder (uint16 only)"""
+    _makedirs(os.path.join(folder, "stacks", "default"))
+    Nt, Nz, Ny, Nx = data.shape
+    with open(os.path.join(folder, "default.index.txt"), "w") as f:
+        for t in range(Nt):
+            f.write("%i, 0.0, %i, %i, %i\n" % (t, Nx, Ny, Nz))
+    with open(os.path.join(folder, "default.metadata.txt"), "w") as f:
+        f.write(json.dumps({"VoxelDimX": 1., "VoxelDimY": 1., "VoxelDimZ": 1.}) + "\n")
+    for t in range(Nt):
+        data[t].astype(np.uint16).tofile(os.path.join(folder, "stacks", "default", "%06d.raw" % t))
+    return folder
+
+
+def write_tiff(fName, data):
+    """a single 4d tiff (TiffData)"""
+    imgutils.write3dTiff(data, fName)
+    return fName
+
+
+def write_tiff_files(folder, data):
+    """one tiff per timepoint (TiffFolderData, TiffMultipleFiles)"""
+    _makedirs(folder)
+    fNames = [os.path.join(folder, "t%04d.tif" % t) for t in range(len(data))]
+    for d, fName in zip(data, fNames):
+        imgutils.write3dTiff(d, fName)
+    return fNames
+
+
+def write_raw(fName, data):
+    """a single raw file (RawData)"""
+    data.tofile(fName)
+    return fName
+
+
+def write_raw_files(folder, data):
+    """one raw file per timepoint (RawMultipleFiles)"""
+    _makedirs(folder)
+    fNames = [os.path.join(folder, "t%04d.raw" % t) for t in range(len(data))]
+    for d, fName in zip(data, fNames):
+        d.tofile(fName)
+    return fNames
+
+
+def write_png(fName, data):
+    """the first plane as 8 bit png (Img2dData)"""
+    from PIL import Image
+    plane = data.reshape((-1,) + data.shape[-2:])[0].astype(np.float32)
+    plane = (255. * plane / max(1., plane.max())).astype(np.uint8)
+    Image.fromarray(plane).save(fName)
+    return fName
@@ -0,0 +1,76 @@
+from __future__ import print_function, unicode_literals, absolute_import, division
+import os
+import tempfile
+import numpy as np
+
+from tests.benchmarks import suite, synthetic
+from tests.benchmarks.suite import Case
+
+
+def test_synthetic():
+    for dtype in synthetic.DTYPES:
+        d = synthetic.synthetic_volume((2, 16, 17, 18), dtype)
+        assert d.shape == (2, 16, 17, 18)
+        assert d.dtype == np.dtype(dtype)
+        assert d.max() > 0
+
+    from spimagine.models.data_model import SpimData, XwingData
+    d = synthetic.synthetic_volume((2, 8, 9, 10), np.uint16)
+    folder = tempfile.mkdtemp()
+    for Container, write in ((SpimData, synthetic.write_spim), (XwingData, synthetic.write_xwing)):
+        c = Container(write(os.path.join(folder, Container.__name__), d))
+        assert tuple(c.size()) == d.shape
+        assert np.array_equal(c[1], d[1])
+
+
+def test_run():
+    calls = []
+
+    @suite.benchmark("_test")
+    def _cases(sizes, dtypes, workdir):
+        yield Case("test.ok", lambda: calls.append(1), repeat=4)
+        yield Case("test.skipped", lambda: None)
+        yield Case("test.fail", lambda: 1 / 0)
+
+    try:
+        res = suite.run(["_test"], pattern="test.[of]*")
+    finally:
+        suite.BENCHMARKS.pop("_test")
+
+    assert list(res.keys()) == ["test.ok", "test.fail"]
+    # one warmup call
+    assert len(calls) == 5
+    assert res["test.ok"]["n"] == 4
+    assert "ZeroDivisionError" in res["test.fail"]["error"]
+
+
+def test_compare():
+    def _res(**ts):
+        return dict((k.replace("_", "."), suite.stats([t])) for k, t in ts.items())
+
+    fName = os.path.join(tempfile.mkdtemp(), "baseline.json")
+    base = _res(a_x=1., a_y=1., b=1., c=1., gone=1., fails=1.)
+    base["failed"] = {"error": "ValueError()"}
+    suite.save(fName, base, meta={}, thresholds={"a.*": 1.})
+    baseline = suite.load(fName)
+
+    res = _res(a_x=1.9, a_y=2.1, b=1.1, c=.5, new=1.)
+    res["fails"] = {"error": "ValueError()"}
+    res["failed"] = {"error": "ValueError()"}
+    comp = suite.compare(res, baseline, threshold=.2)
+    status = dict((c[0], c[-1]) for c in comp)
+    assert status == {"a.x": "ok", "a.y": "regression", "b": "ok", "c": "faster",
+                      "new": "new", "gone": "missing", "fails": "broken", "failed": "error"}
+    # a case that worked in the baseline and fails now is the worst regression
+    assert sorted(c[0] for c in suite.regressions(comp)) == ["a.y", "fails"]
+
+    # thresholds given overwrite the stored ones
+    comp = suite.compare(_res(a_x=1.9), baseline, thresholds={"a.x": .5})
+    assert comp[0][-1] == "regression"
+    print(suite.format_comparison(comp))
+
+
+if __name__ == '__main__':
+    test_synthetic()
+    test_run()
+    test_compare()
@@ -0,0 +1,47 @@
+from __future__ import print_function, unicode_literals, absolute_import, division
+import numpy as np
+import numpy.testing as npt
+
+from spimagine.config.loadcolormaps import ColormapStore, loadcolormaps_png
+
+
+def test_store_matches_png():
+    cmaps = ColormapStore()
+    pngs = loadcolormaps_png()
+    assert sorted(cmaps.keys()) == sorted(pngs.keys())
+    for name, lut in pngs.items():
+        assert cmaps[name].shape == (256, 3)
+        assert cmaps[name].dtype == np.float32
+        npt.assert_allclose(cmaps[name], lut, atol=1.e-6)
+
+
+def test_lazy_and_memoized():
+    cmaps = ColormapStore()
+    assert cmaps._names is None
+    lut = cmaps["viridis"]
+    assert cmaps._names is not None
+    assert cmaps["viridis"] is lut
+
+
+def test_register():
+    cmaps = ColormapStore()
+    cmaps.register("red", np.stack([np.arange(256), np.zeros(256), np.zeros(256), np.full(256, 255)], -1).astype(np.uint8))
+    assert "red" in cmaps
+    assert "viridis" in cmaps
+    npt.assert_allclose(cmaps["red"][-1], (1, 0, 0))
+
+    import spimagine
+    spimagine.register_colormap("my_gray", np.outer(np.linspace(0, 1, 100), (1, 1, 1)))
+    assert spimagine.config.__COLORMAPDICT__["my_gray"].shape == (100, 3)
+
+    try:
+        cmaps.register("wrong", np.zeros((10, 2)))
+        assert False
+    except ValueError:
+        pass
+
+
+if __name__ == '__main__':
+    test_store_matches_png()
+    test_lazy_and_memoized()
+    test_register()
@@ -0,0 +1,75 @@
+"""
+guards the startup latency of "import spimagine"
+
+the heavy subsystems (Qt widgets, OpenGL, OpenCL/gputools, scipy...) should only be
+imported when used
+"""
+from __future__ import print_function, unicode_literals, absolute_import, division
+import sys
+import json
+import subprocess
+
+_HEAVY = ("gputools", "pyopencl", "PyQt5.QtWidgets", "OpenGL", "scipy.integrate", "scipy.spatial",
+          "spimagine.lib.czifile", "spimagine.gui.mainwidget")
+
+# generous, the import itself takes a few tens of ms
+MAX_IMPORT_TIME = 1.
+
+
+def _run(code):
+    script = """
+import sys, json, time
+import numpy
+t = time.time()
+%s
+t = time.time() - t
+print(json.dumps({"time": t, "modules": [m for m in %r if m in sys.modules]}))
+""" % (code, _HEAVY)
+    out = subprocess.check_output([sys.executable, "-c", script])
+    return json.loads(out.decode().strip().splitlines()[-1])
+
+
+def test_import_spimagine():
+    res = _run("import spimagine")
+    print("import spimagine: %.1f ms" % (1000 * res["time"]))
+    assert res["modules"] == []
+    assert res["time"] < MAX_IMPORT_TIME
+
+
+def test_import_read3dTiff():
+    res = _run("from spimagine import read3dTiff")
+    print("from spimagine import read3dTiff: %.1f ms" % (1000 * res["time"]))
+    assert res["modules"] == []
+    assert res["time"] < MAX_IMPORT_TIME
+
+
+def test_lazy_opencl():
+    # the OpenCL device is only initialised on the first use of the gpu
+    # (the failing assert makes the subprocess and hence _run fail)
+    res = _run("import spimagine.models.image_pipeline\n"
+               "from spimagine.config import config\n"
+               "assert not config._device_initialized")
+    assert "gputools" not in res["modules"]
+    assert "pyopencl" not in res["modules"]
+
+    _run("import spimagine.volumerender.volumerender\n"
+         "from spimagine.config import config\n"
+         "assert not config._device_initialized")
+
+
+def test_lazy_attributes():
+    res = _run("import spimagine; spimagine.DataModel; spimagine.config.__DEFAULTCOLORMAP__")
+    assert "PyQt5.QtWidgets" not in res["modules"]
+    assert "gputools" not in res["modules"]
+
+    import spimagine
+    assert "volshow" in dir(spimagine)
+    assert callable(spimagine.volshow)
+    assert len(spimagine.config.__COLORMAPDICT__) > 0
+
+
+if __name__ == '__main__':
+    test_import_spimagine()
+    test_import_read3dTiff()
+    test_lazy_opencl()
+    test_lazy_attributes()
@@ -0,0 +1,100 @@
+from __future__ import absolute_import, print_function
+import numpy as np
+import numpy.testing as npt
+
+from spimagine.gui.mesh import Mesh, EllipsoidMesh, MeshBatch
+from spimagine.utils.transform_matrices import mat4_rotation
+
+
+def _normalized(x):
+    return x / np.linalg.norm(x, axis=-1, keepdims=True)
+
+
+def test_ellipsoids():
+    rng = np.random.RandomState(0)
+    n = 20
+    pos = rng.uniform(-1, 1, (n, 3))
+    rs = rng.uniform(.1, .5, (n, 3))
+    rots = np.stack([mat4_rotation(*rng.uniform(-1, 1, 4)) for _ in range(n)])
+
+    batch = MeshBatch()
+    batch.add_ellipsoids(pos, rs=rs, colors=rng.uniform(0, 1, (n, 3)), alphas=.5, rotations=rots,
+                         n_phi=12, n_theta=8)
+    assert len(batch) == n
+    assert len(batch.instances()) == 1
+    verts, norms, inds, mats, normal_mats, colors = batch.instances()[0]
+    assert mats.shape == (n, 4, 4) and normal_mats.shape == (n, 3, 3) and colors.shape == (n, 4)
+    npt.assert_allclose(colors[:, 3], .5)
+
+    v, nn, c, i = batch.expanded()
+    nv = len(verts)
+    assert v.shape == (n * nv, 3) and c.shape == (n * nv, 4)
+    assert i.max() == n * nv - 1
+
+    # every instance is the same as the single EllipsoidMesh
+    for k in range(n):
+        m = EllipsoidMesh(rs=rs[k], pos=pos[k], n_phi=12, n_theta=8, transform_mat=rots[k])
+        npt.assert_allclose(v[k * nv:(k + 1) * nv], m.vertices, atol=1.e-5)
+        npt.assert_allclose(nn[k * nv:(k + 1) * nv], _normalized(m.normals), atol=1.e-4)
+        npt.assert_array_equal(i[len(inds) * k:len(inds) * (k + 1)] - k * nv, np.asarray(m.indices, np.uint32))
+
+    # the same template is shared
+    batch.add_ellipsoids(pos, rs=(.1, .1, .1), n_phi=12, n_theta=8)
+    assert len(batch) == 2 * n
+    assert len(batch.instances()) == 1
+    assert len(batch.instances()[0][3]) == 2 * n
+
+
+def test_bulk_ellipsoids():
+    rng = np.random.RandomState(1)
+    n = 50
+    pos = rng.uniform(-1, 1, (n, 3))
+    rs = rng.uniform(.1, .5, (n, 3))
+    rots = np.stack([mat4_rotation(*rng.uniform(-1, 1, 4)) for _ in range(n)])
+
+    for rotations in (None, rots, rots[:, :3, :3]):
+        m = EllipsoidMesh.bulk(pos, rs, rotations=rotations, n_phi=16, n_theta=10, facecolor=(1, 0, 0))
+        nv = 16 * 10
+        assert m.vertices.shape == (n * nv, 3)
+        assert len(m.indices) == n * 6 * 15 * 9
+        for k in (0, n // 2, n - 1):
+            single = EllipsoidMesh(rs=rs[k], pos=pos[k], n_phi=16, n_theta=10,
+                                   transform_mat=None if rotations is None else rots[k])
+            npt.assert_allclose(m.vertices[k * nv:(k + 1) * nv], single.vertices, atol=1.e-5)
+            npt.assert_allclose(m.normals[k * nv:(k + 1) * nv], _normalized(single.normals), atol=1.e-4)
+
+    # a single radius for all
+    verts, normals, indices = EllipsoidMesh.create_verts_bulk(pos, (.1, .2, .3), n_phi=16, n_theta=10)
+    npt.assert_allclose(verts[:nv], EllipsoidMesh(rs=(.1, .2, .3), pos=pos[0], n_phi=16, n_theta=10).vertices,
+                        atol=1.e-5)
+    assert indices.max() == n * nv - 1
+
+
+def test_packed():
+    batch = MeshBatch()
+    version = batch.version
+    m1 = Mesh(facecolor=(1, 0, 0), alpha=.5)
+    m2 = EllipsoidMesh(rs=(1, 2, 3), n_phi=10, n_theta=6, facecolor=(0, 1, 0))
+    batch.add_mesh(m1)
+    batch.add_mesh(m2)
+    batch.add_mesh(Mesh(facecolor=None))
+    assert batch.version > version
+    assert len(batch) == 2
+
+    v, nn, c, i = batch.packed()
+    assert v.shape == (3 + len(m2.vertices), 3)
+    npt.assert_allclose(c[:3], [(1, 0, 0, .5)] * 3)
+    npt.assert_allclose(c[3:], np.tile((0, 1, 0, 1), (len(m2.vertices), 1)))
+    npt.assert_array_equal(i[3:] - 3, np.asarray(m2.indices, np.uint32))
+    # cached until something is added
+    assert batch.packed()[0] is v
+
+    batch.clear()
+    assert len(batch) == 0
+    assert len(batch.expanded()[3]) == 0
+
+
+if __name__ == '__main__':
+    test_ellipsoids()
+    test_bulk_ellipsoids()
+    test_packed()
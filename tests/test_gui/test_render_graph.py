@@ -0,0 +1,48 @@
+from __future__ import absolute_import, print_function
+
+from spimagine.gui.render_graph import RenderGraph
+
+
+def test_render_graph():
+    params = {"rot": 0, "slice": 0}
+
+    g = RenderGraph()
+    g.add_stage("data")
+    g.add_stage("volume", key=lambda: params["rot"], depends=("data",))
+    g.add_stage("slice", key=lambda: params["slice"], depends=("data",))
+    g.add_stage("texture", depends=("volume",))
+
+    # everything has to be computed initially
+    assert all(g.changed(s) for s in ("volume", "slice", "texture"))
+    for s in ("volume", "slice", "texture"):
+        g.done(s)
+    assert not any(g.changed(s) for s in ("volume", "slice", "texture"))
+
+    # moving the slice doesnt touch the volume
+    params["slice"] = 1
+    assert g.changed("slice")
+    assert not g.changed("volume") and not g.changed("texture")
+    g.done("slice")
+
+    # rotating doesnt touch the slice
+    params["rot"] = 1
+    assert g.changed("volume") and not g.changed("slice")
+    g.done("volume")
+    assert g.changed("texture")
+    g.done("texture")
+
+    # new data invalidates everything downstream
+    g.invalidate("data")
+    assert g.changed("volume") and g.changed("slice")
+    g.done("volume")
+    assert g.changed("texture")
+
+    try:
+        g.add_stage("foo", depends=("bar",))
+        assert False
+    except KeyError:
+        pass
+
+
+if __name__ == '__main__':
+    test_render_graph()
@@ -0,0 +1,52 @@
+from __future__ import absolute_import, print_function
+
+import time
+
+from PyQt5 import QtCore
+
+from spimagine.gui.render_scheduler import RenderScheduler
+
+
+def _run(app, secs):
+    t = time.time()
+    while time.time() - t < secs:
+        app.processEvents()
+        time.sleep(.001)
+
+
+def test_scheduler():
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+    frames = []
+    s = RenderScheduler(lambda: frames.append(time.time()), max_fps=20)
+
+    # idle -> nothing rendered
+    _run(app, .1)
+    assert len(frames) == 0
+
+    # many requests -> coalesced into one frame
+    for i in range(100):
+        s.request()
+    _run(app, .1)
+    assert len(frames) == 1
+
+    # continuous requests -> capped at max_fps
+    t = time.time()
+    while time.time() - t < .5:
+        s.request()
+        app.processEvents()
+        time.sleep(.001)
+    _run(app, .1)
+    assert 5 <= len(frames) <= 13
+    assert min(b - a for a, b in zip(frames[1:], frames[2:])) > .9 / 20
+
+    # render_func returning True asks for another frame
+    steps = []
+    s2 = RenderScheduler(lambda: steps.append(1) or len(steps) < 3, max_fps=100)
+    s2.request()
+    _run(app, .2)
+    assert len(steps) == 3
+
+
+if __name__ == '__main__':
+    test_scheduler()
@@ -0,0 +1,71 @@
+"""
+the streaming texture, tested in a headless (EGL, e.g. Mesa llvmpipe) context in a subprocess
+"""
+from __future__ import absolute_import, print_function
+
+import sys
+import json
+import subprocess
+
+import pytest
+
+_SCRIPT = """
+import os, ctypes, json
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+import numpy as np
+from OpenGL import EGL
+
+d = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+if not EGL.eglInitialize(d, None, None):
+    raise SystemExit(3)
+attrs = (EGL.EGLint * 5)(EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT, EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+                         EGL.EGL_NONE)
+cfg, n = EGL.EGLConfig(), EGL.EGLint()
+EGL.eglChooseConfig(d, attrs, ctypes.pointer(cfg), 1, ctypes.pointer(n))
+surf = EGL.eglCreatePbufferSurface(d, cfg, (EGL.EGLint * 5)(EGL.EGL_WIDTH, 16, EGL.EGL_HEIGHT, 16, EGL.EGL_NONE))
+EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+ctx = EGL.eglCreateContext(d, cfg, EGL.EGL_NO_CONTEXT, None)
+if n.value < 1 or not EGL.eglMakeCurrent(d, surf, surf, ctx):
+    raise SystemExit(3)
+
+from OpenGL import GL
+from spimagine.gui.gui_utils import Texture2D
+
+def read(shape, format):
+    return np.asarray(GL.glGetTexImage(GL.GL_TEXTURE_2D, 0, format, GL.GL_FLOAT)).reshape(shape)
+
+res = {}
+for use_pbo in (False, True):
+    tex = Texture2D(use_pbo=use_pbo)
+    ok, ids = [], set()
+    for shape in [(30, 40)] * 3 + [(20, 10)]:
+        x = np.random.uniform(0, 1, shape).astype(np.float32)
+        ids.add(tex.update(x))
+        ok.append(bool(np.allclose(read(shape, GL.GL_RED), x, atol=.6 / 255)))
+    x = np.random.uniform(0, 1, (8, 9, 3))
+    tex.update(x)
+    ok.append(bool(np.allclose(read(x.shape, GL.GL_RGB), x, atol=.6 / 255)))
+    res["pbo" if use_pbo else "direct"] = {"ok": ok, "ids": len(ids), "use_pbo": tex.use_pbo}
+    tex.delete()
+
+print(json.dumps(res))
+"""
+
+
+def test_texture_streaming():
+    p = subprocess.Popen([sys.executable, "-c", _SCRIPT], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = p.communicate()
+    if p.returncode != 0:
+        pytest.skip("no headless OpenGL context available (%s)" % err.decode()[-200:])
+    res = json.loads(out.decode().strip().splitlines()[-1])
+    print(res)
+    for key in ("direct", "pbo"):
+        assert all(res[key]["ok"])
+        # the same texture is reused
+        assert res[key]["ids"] == 1
+    assert res["pbo"]["use_pbo"]
+
+
+if __name__ == '__main__':
+    test_texture_streaming()
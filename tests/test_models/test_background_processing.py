@@ -0,0 +1,48 @@
+"""
+tests for the background processing of prefetched timepoints
+"""
+from __future__ import absolute_import, print_function
+import threading
+import time
+import numpy as np
+from spimagine import DataModel, NumpyData
+from spimagine.models.imageprocessor import FuncProcessor
+
+
+def test_background_processing():
+    d = np.random.uniform(0, 1, (6, 10, 20, 30)).astype(np.float32)
+    m = DataModel(NumpyData(d), prefetchSize=2)
+
+    threads = []
+
+    def scale(data, factor=2.):
+        threads.append(threading.current_thread().ident)
+        return factor * data
+
+    proc = FuncProcessor(scale, "scale", factor=2.)
+    m.setProcessors([proc])
+
+    for pos in range(3):
+        m.setPos(pos)
+        time.sleep(.2)
+        n = len(threads)
+        res = m.getProcessed(pos)
+        # was already processed in the background
+        assert len(threads) == n
+        assert np.allclose(res, 2. * d[pos])
+
+    assert threading.current_thread().ident not in threads
+
+    # changing the parameters invalidates the old results
+    proc.factor = 3.
+    assert np.allclose(m.getProcessed(2), 3. * d[2])
+
+    m.setProcessors([])
+    assert np.allclose(m.getProcessed(2), d[2])
+
+    m.stopDataLoadThread()
+    time.sleep(.1)
+
+
+if __name__ == '__main__':
+    test_background_processing()
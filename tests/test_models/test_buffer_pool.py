@@ -0,0 +1,102 @@
+"""
+tests for the frame buffer pool
+"""
+from __future__ import absolute_import, print_function
+import os
+import shutil
+import tempfile
+import numpy as np
+from spimagine import DataModel, SpimData, TiffFolderData
+from spimagine.models.buffer_pool import BufferPool, frame_pool
+from spimagine.utils import imgutils
+from six.moves import range
+import time
+
+
+def rel_path(name):
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), name))
+
+
+def test_pool():
+    pool = BufferPool()
+    a = pool.acquire((10, 20, 30), np.uint16)
+    assert a.ctypes.data % 4096 == 0
+    assert a.shape == (10, 20, 30) and a.dtype == np.uint16
+
+    a_id = id(a)
+    assert pool.release(a)
+    del a
+    b = pool.acquire((10, 20, 30), np.uint16)
+    assert id(b) == a_id
+    assert pool.n_allocated == 1
+
+    # a buffer still referenced (here via a view) must not be reused
+    view = b[2:4]
+    pool.release(b)
+    c = pool.acquire((10, 20, 30), np.uint16)
+    assert not np.shares_memory(c, view)
+    assert pool.n_allocated == 2
+
+    # foreign arrays are ignored
+    assert not pool.release(np.zeros(10))
+
+
+def test_spimdata_pool():
+    d = SpimData(rel_path("../data/spimdata"))
+    with open(os.path.join(rel_path("../data/spimdata"), "data/data.bin"), "rb") as f:
+        ref = np.fromfile(f, dtype="<u2").reshape(d.size())
+
+    for pos in range(d.sizeT()):
+        x = d[pos]
+        assert np.array_equal(x, ref[pos])
+        assert x.ctypes.data % 4096 == 0
+        d.release(x)
+        del x
+
+    n_allocated = frame_pool.n_allocated
+    for _ in range(3):
+        for pos in range(d.sizeT()):
+            x = d[pos]
+            d.release(x)
+            del x
+    print("allocated: ", frame_pool.n_allocated - n_allocated)
+    assert frame_pool.n_allocated == n_allocated
+
+
+def test_tiff_folder_pool():
+    fName = tempfile.mkdtemp()
+    try:
+        data = np.random.randint(0, 1000, (3, 10, 32, 40)).astype(np.uint16)
+        for i, d in enumerate(data):
+            imgutils.write3dTiff(d, os.path.join(fName, "stack_%03d.tif" % i))
+
+        segments, dtype = imgutils.tiffDataSegments(os.path.join(fName, "stack_000.tif"))
+        assert segments is not None and dtype == np.uint16
+
+        c = TiffFolderData(fName)
+        for pos in range(c.sizeT()):
+            assert np.array_equal(c[pos], data[pos])
+    finally:
+        shutil.rmtree(fName)
+
+
+def test_datamodel_release():
+    m = DataModel.fromPath(rel_path("../data/spimdata"), prefetchSize=1)
+    n_allocated = frame_pool.n_allocated
+    for _ in range(3):
+        for pos in range(m.sizeT()):
+            m.setPos(pos)
+            d = m[pos]
+            print(pos, d.shape)
+            del d
+            time.sleep(.05)
+    print("allocated: ", frame_pool.n_allocated - n_allocated)
+    m.stopDataLoadThread()
+    time.sleep(.1)
+
+
+if __name__ == '__main__':
+    test_pool()
+    test_spimdata_pool()
+    test_tiff_folder_pool()
+    test_datamodel_release()
@@ -0,0 +1,61 @@
+"""
+mweigert@mpi-cbg.de
+"""
+from __future__ import absolute_import, print_function
+import os
+import shutil
+import tempfile
+import numpy as np
+from spimagine import DataModel, SpimData, ChunkedData, write_chunked
+from spimagine.models.data_model import containerFromPath
+from six.moves import range
+import time
+
+
+def rel_path(name):
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), name))
+
+
+def test_chunked_roundtrip():
+    d = np.random.randint(0, 1000, (3, 33, 40, 51)).astype(np.uint16)
+
+    fName = tempfile.mkdtemp()
+    try:
+        write_chunked(fName, d, chunks=(16, 16, 16), codec="zlib", stackUnits=(.5, .5, 2.))
+
+        c = containerFromPath(fName)
+        assert isinstance(c, ChunkedData)
+        assert c.size() == d.shape
+        assert c.stackUnits == (.5, .5, 2.)
+
+        for pos in range(d.shape[0]):
+            assert np.array_equal(c[pos], d[pos])
+
+        assert np.array_equal(c.get_chunk(1, (2, 0, 3)), d[1, 32:, :16, 48:])
+
+        c.set_level(1)
+        assert c.size() == (3, 16, 20, 25)
+        assert c.stackUnits == (1., 1., 4.)
+        print(c[2].shape)
+    finally:
+        shutil.rmtree(fName)
+
+
+def test_chunked_spimdata():
+    d = SpimData(rel_path("../data/spimdata"))
+
+    fName = tempfile.mkdtemp()
+    try:
+        write_chunked(fName, d, n_workers=2)
+        m = DataModel.fromPath(fName, 1)
+        print(m)
+        for pos in range(m.sizeT()):
+            assert np.array_equal(m[pos], d[pos])
+        m.stopDataLoadThread()
+        time.sleep(.1)
+    finally:
+        shutil.rmtree(fName)
+
+
+if __name__ == '__main__':
+    test_chunked_roundtrip()
@@ -115,6 +115,22 @@ def test_rawdata():
 
 
 
+def test_img2d_demo():
+    import tempfile
+    from PIL import Image
+    from spimagine.models.data_model import Img2dData, DemoData
+
+    fName = os.path.join(tempfile.mkdtemp(), "img.png")
+    Image.fromarray((255 * np.random.uniform(0, 1, (20, 30, 3))).astype(np.uint8)).save(fName)
+    d = Img2dData(fName)
+    assert d.size() == (1, 1, 20, 30)
+    assert d[0].shape == (1, 20, 30)
+
+    d = DemoData(32)
+    assert d[0].shape == (32, 32, 32)
+    assert np.amax(d[0]) > 0
+
+
 def test_xwing():
 
     d = XwingData("/Users/mweigert/Data/XwingTest")
@@ -0,0 +1,46 @@
+"""
+tests for the device resident processor chain
+"""
+from __future__ import absolute_import, print_function
+import numpy as np
+from pyopencl.array import Array as CLArray
+from spimagine.models.imageprocessor import BlurProcessor, BlurXYZProcessor, NoiseProcessor, apply_processors
+from spimagine.models.image_pipeline import ImagePipeline
+from spimagine.volumerender.volumerender import VolumeRenderer
+
+
+def test_chain():
+    d = np.random.uniform(0, 100, (32, 33, 34)).astype(np.float32)
+    procs = [BlurProcessor(sigma=2.), BlurXYZProcessor(1, 2, 3)]
+
+    # host in, host out
+    res_host = procs[1].apply(procs[0].apply(d))
+    assert isinstance(res_host, np.ndarray)
+
+    # the chain stays on the device
+    res_g = apply_processors(d, procs)
+    assert isinstance(res_g, CLArray)
+    assert np.allclose(res_g.get(), res_host)
+
+    # mixed chains end on the host
+    res = apply_processors(d, procs + [NoiseProcessor(0)])
+    assert isinstance(res, np.ndarray)
+    assert np.allclose(res, res_host)
+
+    res = ImagePipeline().apply(d, procs, timepoint=0)
+    assert isinstance(res, CLArray)
+
+
+def test_renderer_update():
+    d = np.random.uniform(0, 100, (32, 33, 34)).astype(np.float32)
+    res_g = apply_processors(d, [BlurProcessor(sigma=2.)])
+
+    rend = VolumeRenderer((100, 100))
+    rend.set_data(d)
+    rend.update_data(res_g)
+    assert np.allclose(rend.dataImg.get(), res_g.get())
+
+
+if __name__ == '__main__':
+    test_chain()
+    test_renderer_update()
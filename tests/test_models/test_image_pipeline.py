@@ -0,0 +1,107 @@
+"""
+tests for the memoizing image processor pipeline
+"""
+from __future__ import absolute_import, print_function
+import numpy as np
+from collections import Counter
+from spimagine.models.imageprocessor import FuncProcessor
+from spimagine.models.image_pipeline import ImagePipeline
+
+
+def _counting_processors(calls):
+    def blur(data, sigma=1.):
+        calls["blur"] += 1
+        return data + sigma
+
+    def scale(data, factor=2.):
+        calls["scale"] += 1
+        return data * factor
+
+    return FuncProcessor(blur, "blur", sigma=1.), FuncProcessor(scale, "scale", factor=2.)
+
+
+def test_incremental():
+    calls = Counter()
+    blur, scale = _counting_processors(calls)
+    pipe = ImagePipeline()
+    data = np.ones((10, 20, 30), np.float32)
+
+    out = pipe.apply(data, [blur, scale], timepoint=0)
+    assert np.allclose(out, 4.)
+    assert calls == Counter(blur=1, scale=1)
+
+    # changing the last stage should not rerun the first
+    scale.factor = 3.
+    out = pipe.apply(data, [blur, scale], timepoint=0)
+    assert np.allclose(out, 6.)
+    assert calls == Counter(blur=1, scale=2)
+
+    # nothing changed
+    pipe.apply(data, [blur, scale], timepoint=0)
+    assert calls == Counter(blur=1, scale=2)
+
+    # changing the first stage reruns everything downstream
+    blur.sigma = 2.
+    out = pipe.apply(data, [blur, scale], timepoint=0)
+    assert np.allclose(out, 9.)
+    assert calls == Counter(blur=2, scale=3)
+
+    # other timepoint
+    pipe.apply(data, [blur, scale], timepoint=1)
+    assert calls == Counter(blur=3, scale=4)
+
+    pipe.invalidate(1)
+    pipe.apply(data, [blur, scale], timepoint=1)
+    assert calls == Counter(blur=4, scale=5)
+
+
+def test_budget():
+    calls = Counter()
+    blur, scale = _counting_processors(calls)
+    data = np.ones((10, 20, 30), np.float32)
+    pipe = ImagePipeline(max_bytes=3 * data.nbytes)
+
+    for t in range(5):
+        pipe.apply(data, [blur, scale], timepoint=t)
+
+    print(pipe.nbytes, len(pipe._cache))
+    assert pipe.nbytes <= pipe.max_bytes
+
+    # the last timepoint is still cached
+    pipe.apply(data, [blur, scale], timepoint=4)
+    assert calls == Counter(blur=5, scale=5)
+
+
+def test_params_changed_while_applying():
+    blur = FuncProcessor(lambda data, sigma=1.: data + sigma, "blur", sigma=1.)
+
+    def scale_func(data, factor=2.):
+        # the gui changes the parameters of the first stage in the meantime
+        blur.sigma = 5.
+        return data * factor
+
+    scale = FuncProcessor(scale_func, "scale", factor=2.)
+    pipe = ImagePipeline()
+    data = np.ones((10, 20, 30), np.float32)
+
+    out = pipe.apply(data, [blur, scale], timepoint=0)
+    assert np.allclose(out, 4.)
+    # both stages ran with the old parameters, so they are cached under those
+    assert len(pipe._cache) == 2
+    assert pipe.cached([blur, scale], 0) is None
+
+    # a stage that changes its own parameters
+    def blur_func(data, sigma=1.):
+        blur.sigma = sigma + 1
+        return data + sigma
+
+    blur.func = blur_func
+    pipe.invalidate()
+    out = pipe.apply(data, [blur, scale], timepoint=0)
+    assert np.allclose(out, 12.)
+    assert len(pipe._cache) == 0
+
+if __name__ == '__main__':
+    test_incremental()
+    test_budget()
+    test_params_changed_while_applying()
@@ -0,0 +1,85 @@
+"""
+mweigert@mpi-cbg.de
+"""
+from __future__ import absolute_import, print_function
+import numpy as np
+from spimagine import DataModel, LazyArrayData
+from spimagine.models.lazy_data import is_lazy_array
+from six.moves import range
+import time
+
+
+class ChunkedArray(object):
+    """a minimal zarr like array that records every read"""
+
+    def __init__(self, data, chunks):
+        self._data = data
+        self.shape = data.shape
+        self.dtype = data.dtype
+        self.chunks = chunks
+        self.reads = []
+
+    def __getitem__(self, sl):
+        self.reads.append(sl)
+        return self._data[sl]
+
+
+def test_lazy_array():
+    d = np.random.randint(0, 100, (4, 40, 30, 20)).astype(np.uint16)
+    arr = ChunkedArray(d, chunks=(1, 16, 30, 20))
+
+    assert is_lazy_array(arr)
+    assert not is_lazy_array(d)
+
+    c = LazyArrayData(arr, min_read_bytes=0)
+    assert c.size() == d.shape
+
+    # reads should be aligned to the z chunks
+    assert c._slabs == [(0, 16), (16, 32), (32, 40)]
+
+    for pos in range(d.shape[0]):
+        assert np.array_equal(c[pos], d[pos])
+
+    mi, ma = c.sample_range()
+    assert d.min() <= mi <= ma <= d.max()
+
+    m = DataModel(c, prefetchSize=1)
+    print(m)
+    for pos in range(m.sizeT()):
+        print(pos, np.mean(m[pos]))
+    m.stopDataLoadThread()
+    time.sleep(.1)
+
+
+def test_lazy_array_3d():
+    d = np.random.uniform(0, 1, (33, 20, 10)).astype(np.float32)
+    c = LazyArrayData(ChunkedArray(d, chunks=((10, 10, 13), (20,), (10,))))
+    assert c.size() == (1,) + d.shape
+    assert np.array_equal(c[0], d)
+
+
+def test_lazy_array_tchunks():
+    d = np.random.randint(0, 100, (10, 40, 30, 20)).astype(np.uint16)
+    arr = ChunkedArray(d, chunks=(4, 16, 30, 20))
+    c = LazyArrayData(arr, min_read_bytes=0)
+
+    # playback decodes every chunk once
+    for pos in range(d.shape[0]):
+        assert np.array_equal(c[pos], d[pos])
+    assert len(arr.reads) == 3 * len(c._slabs)
+    assert all(sl[0] in (slice(0, 4), slice(4, 8), slice(8, 10)) for sl in arr.reads)
+
+    # the kept t-chunk is not handed out
+    c[9][:] = 0
+    assert np.array_equal(c[9], d[9])
+    assert len(arr.reads) == 3 * len(c._slabs)
+
+    # every timepoint its own chunk -> no t-chunk
+    c = LazyArrayData(ChunkedArray(d, chunks=(1, 16, 30, 20)))
+    assert c._tbounds is None
+
+
+if __name__ == '__main__':
+    test_lazy_array()
+    test_lazy_array_3d()
+    test_lazy_array_tchunks()
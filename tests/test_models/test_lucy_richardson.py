@@ -0,0 +1,71 @@
+"""
+tests for the richardson lucy deconvolution processor
+"""
+from __future__ import absolute_import, print_function
+import time
+import numpy as np
+from scipy.ndimage import gaussian_filter
+from spimagine import DataModel, NumpyData
+from spimagine.utils import lucy_richardson as rl
+from spimagine.models.imageprocessor import LucyRichProcessor
+
+
+def _blurred_points(shape=(40, 50, 60), rad=2.):
+    np.random.seed(0)
+    x = np.zeros(shape, np.float32)
+    idx = tuple(np.random.randint(10, n - 10, 20) for n in shape)
+    x[idx] = 100.
+    return x, gaussian_filter(x, rad, mode="reflect").astype(np.float32)
+
+
+def test_deconv():
+    x, y = _blurred_points()
+    for func in (rl.lucy_richardson, rl.lucy_richardson_gpu):
+        u = func(y, 2., 20)
+        assert u.shape == y.shape
+        assert u.dtype == np.float32
+        # gets sharper and keeps the total intensity
+        assert u.max() > 2 * y.max()
+        assert abs(u.sum() / y.sum() - 1) < .01
+        print("%s: max %.2f -> %.2f" % (func.__name__, y.max(), u.max()))
+
+    assert np.allclose(rl.lucy_richardson(y, 2., 10), rl.lucy_richardson_gpu(y, 2., 10),
+                       rtol=1.e-2, atol=1.e-2 * y.max())
+
+
+def test_caches():
+    _, y = _blurred_points()
+    rl.lucy_richardson(y, 2., 2)
+    plan = rl.plan_cache.get(y.shape, 2.)
+    H = rl.otf_cache.get(plan.shape, 2.)
+    rl.lucy_richardson(y, 2., 2)
+    assert rl.plan_cache.get(y.shape, 2.) is plan
+    assert rl.otf_cache.get(plan.shape, 2.) is H
+    # another width means another transfer function
+    assert rl.otf_cache.get(plan.shape, 3.) is not H
+
+
+def test_background():
+    _, y = _blurred_points((30, 40, 50))
+    d = np.stack([y] * 4)
+    m = DataModel(NumpyData(d), prefetchSize=2)
+    proc = LucyRichProcessor(rad=2., niter=5, gpu=False)
+    m.setProcessors([proc])
+    m.setPos(1)
+    time.sleep(1.)
+    assert m.pipeline.cached([proc], 1) is not None
+    assert np.allclose(m.getProcessed(1), rl.lucy_richardson(y, 2., 5))
+    m.stopDataLoadThread()
+    time.sleep(.1)
+
+
+def test_benchmark():
+    for backend in ("numpy", "gpu"):
+        print("%s backend, 64^3: %.2f iterations/s" % (backend, rl.benchmark((64,) * 3, backend=backend)))
+
+
+if __name__ == '__main__':
+    test_deconv()
+    test_caches()
+    test_background()
+    test_benchmark()
@@ -0,0 +1,48 @@
+"""
+tests for the recursive gaussian blur
+"""
+from __future__ import absolute_import, print_function
+import numpy as np
+from time import time
+from scipy.ndimage import gaussian_filter
+from gputools import OCLArray
+from spimagine.utils.recursive_gauss import recursive_gaussian, recursive_gaussian_gpu
+from spimagine.models.imageprocessor import RecursiveBlurProcessor, apply_processors
+
+
+def test_accuracy():
+    d = np.random.uniform(0, 1, (40, 50, 60)).astype(np.float32)
+    for sigma in (2., 5., (2., 3., 4.)):
+        res = recursive_gaussian(d, sigma)
+        ref = gaussian_filter(d, sigma, mode="nearest")
+        err = np.abs(res - ref).max() / np.abs(ref).max()
+        print("sigma = %s  rel. error = %.4f" % (sigma, err))
+        assert err < .05
+
+        res_g = recursive_gaussian_gpu(OCLArray.from_array(d), sigma).get()
+        assert np.allclose(res, res_g, atol=1.e-4)
+
+
+def test_cost_independent_of_sigma():
+    d = np.random.uniform(0, 1, (64, 128, 128)).astype(np.float32)
+    ts = []
+    for sigma in (2., 32.):
+        t = time()
+        recursive_gaussian(d, sigma)
+        ts.append(time() - t)
+    print("times: ", ts)
+    assert ts[1] < 3 * ts[0]
+
+
+def test_processor():
+    d = np.random.uniform(0, 1, (40, 50, 60)).astype(np.float32)
+    p = RecursiveBlurProcessor(sigma=4.)
+    res = p.apply(d)
+    assert isinstance(res, np.ndarray)
+    assert np.allclose(apply_processors(d, [p]).get(), res, atol=1.e-4)
+
+
+if __name__ == '__main__':
+    test_accuracy()
+    test_cost_independent_of_sigma()
+    test_processor()
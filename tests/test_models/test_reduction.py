@@ -0,0 +1,80 @@
+"""
+tests for cropping/binning the data at the data model level
+"""
+from __future__ import absolute_import, print_function
+import time
+import numpy as np
+from spimagine import DataModel, NumpyData
+from spimagine.models.data_model import ReducedData, RawData, _bin, _bounds_slices
+
+
+def test_bin():
+    d = np.random.randint(0, 1000, (10, 21, 32)).astype(np.uint16)
+    res = _bin(d, (2, 3, 4))
+    assert res.shape == (5, 7, 8)
+    assert res.dtype == np.uint16
+    ref = d.reshape(5, 2, 7, 3, 8, 4).mean(axis=(1, 3, 5))
+    assert np.abs(res.astype(np.float32) - ref).max() <= .5
+    assert np.array_equal(_bin(d, (2, 3, 4), "max"), d.reshape(5, 2, 7, 3, 8, 4).max(axis=(1, 3, 5)))
+    assert _bin(d, (1, 1, 1)) is d
+
+
+def test_bounds():
+    full = (slice(0, 10), slice(0, 20), slice(0, 30))
+    assert _bounds_slices(None, (10, 20, 30)) == full
+    assert _bounds_slices([-1, 1, -1, 1, -1, 1], (10, 20, 30)) == full
+    # x,y,z bounds map to the last, middle and first axis
+    assert _bounds_slices([0, 1, -1, 0, -.5, .5], (10, 20, 30)) == (slice(2, 8), slice(0, 10), slice(15, 30))
+
+
+def test_reduced_data(tmpdir):
+    d = np.random.randint(0, 1000, (64, 65, 66)).astype(np.uint16)
+    fName = str(tmpdir.join("data.raw"))
+    d.tofile(fName)
+    raw = RawData(fName, d.shape, np.uint16)
+    raw.stackUnits = (.1, .2, .5)
+
+    bounds = [-1, 1, -1, 1, 0, 1]
+    red = ReducedData(raw, bounds, (1, 2, 2), mode="max")
+    assert red.size() == (1, 32, 32, 33)
+    assert np.allclose(red.stackUnits, (.2, .4, .5))
+    assert np.array_equal(red[0], _bin(d[32:], (1, 2, 2), "max"))
+
+
+def test_datamodel():
+    d = np.random.uniform(0, 1, (3, 16, 32, 48)).astype(np.float32)
+    m = DataModel(NumpyData(d, stackUnits=(1., 1., 2.)), prefetchSize=1)
+    m.setPos(1)
+
+    factors = []
+    m._dataReductionChanged.connect(lambda *f: factors.append(f))
+
+    m.setReduction(binning=(2, 2, 4))
+    assert m.size() == (3, 8, 16, 12)
+    assert m.stackUnits() == (4., 2., 4.)
+    assert m.pos == 1
+    assert np.allclose(m[1], d[1].reshape(8, 2, 16, 2, 12, 4).mean(axis=(1, 3, 5)), atol=1.e-6)
+    assert factors[-1] == (4., 2., 2.)
+
+    # prefetching goes on with the reduced data
+    time.sleep(.2)
+    assert m.dataLoadThread.isRunning()
+    assert m._cached(1).shape == (8, 16, 12)
+
+    m.setReduction(bounds=[-1, 0, -1, 1, -1, 1])
+    assert m.size() == (3, 16, 32, 24)
+    assert factors[-1] == (.25, .5, .5)
+    assert np.array_equal(m.get_slice(2, 0, 3), d[2, 3, :, :24])
+
+    m.setReduction()
+    assert m.dataContainer is m.baseContainer()
+    assert m.size() == d.shape
+
+    m.stopDataLoadThread()
+    time.sleep(.1)
+
+
+if __name__ == '__main__':
+    test_bin()
+    test_bounds()
+    test_datamodel()
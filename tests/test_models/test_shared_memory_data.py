@@ -0,0 +1,125 @@
+"""
+mweigert@mpi-cbg.de
+"""
+from __future__ import absolute_import, print_function
+import numpy as np
+from spimagine import DataModel, SharedMemoryData, SharedMemoryWriter
+from six.moves import range
+import time
+
+
+def test_shared_memory_ring():
+    shape = (16, 32, 48)
+    w = SharedMemoryWriter(shape=shape, dtype=np.uint16, n_slots=3, stackUnits=(.5, .5, 2.))
+
+    d = SharedMemoryData(w.name)
+    assert d.size() == (3,) + shape
+    assert d.stackUnits == (.5, .5, 2.)
+
+    for i in range(5):
+        w.push(i * np.ones(shape, np.uint16))
+
+    # the ring holds the last 3 frames, oldest first
+    for pos, val in enumerate([2, 3, 4]):
+        assert np.all(d[pos] == val)
+
+    # zero copy write via the frame context
+    with w.frame() as arr:
+        arr[:] = 7
+
+    assert np.all(d[2] == 7)
+    assert np.all(d[0] == 3)
+
+    m = DataModel(d)
+    print(m)
+    for pos in range(m.sizeT()):
+        print(pos, np.mean(m[pos]))
+
+    m.stopDataLoadThread()
+    time.sleep(.1)
+    d.close()
+    w.unlink()
+
+
+def test_shared_memory_wrap_around():
+    shape = (4, 8, 8)
+    w = SharedMemoryWriter(shape=shape, dtype=np.uint16, n_slots=3)
+    d = SharedMemoryData(w.name)
+
+    m = DataModel(d)
+    changed = []
+    m._dataChanged.connect(lambda: changed.append(True))
+
+    for i in range(3):
+        w.push(i * np.ones(shape, np.uint16))
+    assert m.poll()
+    assert not m.poll()
+    assert np.all(m[2] == 2)
+
+    # the ring wraps around, every pos now shows the next frame
+    w.push(3 * np.ones(shape, np.uint16))
+    assert m.poll()
+    assert len(changed) == 2
+    for pos, val in enumerate([1, 2, 3]):
+        assert np.all(m[pos] == val)
+        assert np.all(m.getProcessed(pos) == val)
+
+    # the returned frames are copies
+    frame = m[2]
+    w.push(4 * np.ones(shape, np.uint16))
+    assert np.all(frame == 3)
+    assert np.all(m[2] == 4)
+
+    m.stopDataLoadThread()
+    time.sleep(.1)
+    d.close()
+    w.unlink()
+
+
+def test_shared_memory_busy_empty():
+    shape = (4, 8, 8)
+    w = SharedMemoryWriter(shape=shape, dtype=np.uint16, n_slots=3)
+    d = SharedMemoryData(w.name)
+    d.timeout = .05
+
+    # not yet written timepoints are zeros
+    assert np.all(d[0] == 0)
+
+    w.push(np.ones(shape, np.uint16))
+    assert np.all(d[0] == 1)
+
+    # a slot that is being written is never returned
+    w.push(2 * np.ones(shape, np.uint16))
+    w.push(3 * np.ones(shape, np.uint16))
+    seq, i = w._begin()
+    w._ring.slot_view(i)[:] = 4
+    try:
+        d[0]
+        assert False, "busy slot was returned"
+    except RuntimeError:
+        pass
+    w._commit(seq, i)
+    assert np.all(d[0] == 2)
+    assert np.all(d[2] == 4)
+
+    # a failed write leaves an empty slot
+    try:
+        with w.frame() as arr:
+            arr[:] = 5
+            raise ValueError()
+    except ValueError:
+        pass
+    try:
+        d[0]
+        assert False, "empty slot was returned"
+    except RuntimeError:
+        pass
+
+    d.close()
+    w.unlink()
+
+
+if __name__ == '__main__':
+    test_shared_memory_ring()
+    test_shared_memory_wrap_around()
+    test_shared_memory_busy_empty()
@@ -0,0 +1,73 @@
+"""
+tests for reading single planes/regions via get_slice/get_roi
+"""
+from __future__ import absolute_import, print_function
+import os
+import shutil
+import tempfile
+import numpy as np
+from spimagine import DataModel, SpimData, NumpyData, RawData, RawMultipleFiles, TiffFolderData
+from spimagine.utils import imgutils
+from six.moves import range
+import time
+
+
+def rel_path(name):
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), name))
+
+
+def _check_container(c):
+    print("checking %s" % c.name)
+    for pos in range(c.sizeT()):
+        vol = np.array(c[pos])
+        for dim in range(3):
+            for index in (0, vol.shape[dim] // 2, vol.shape[dim] - 1):
+                assert np.array_equal(c.get_slice(pos, dim, index), np.take(vol, index, axis=dim))
+
+        for slices in [(slice(1, 3), slice(None), slice(2, 10, 2)),
+                       (2, slice(0, 5)),
+                       (slice(None, None, -1),)]:
+            assert np.array_equal(c.get_roi(pos, slices), vol[slices])
+
+
+def test_spimdata():
+    _check_container(SpimData(rel_path("../data/spimdata")))
+
+
+def test_numpy():
+    _check_container(NumpyData(np.random.uniform(0, 1, (2, 10, 20, 30))))
+
+
+def test_raw_and_tiff():
+    data = np.random.randint(0, 1000, (3, 10, 32, 40)).astype(np.uint16)
+    fName = tempfile.mkdtemp()
+    try:
+        data.tofile(os.path.join(fName, "all.raw"))
+        _check_container(RawData(os.path.join(fName, "all.raw"), shape=data.shape, dtype=np.uint16))
+
+        fnames = []
+        for i, d in enumerate(data):
+            fnames.append(os.path.join(fName, "stack_%03d.raw" % i))
+            d.tofile(fnames[-1])
+            imgutils.write3dTiff(d, os.path.join(fName, "stack_%03d.tif" % i))
+
+        _check_container(RawMultipleFiles(fnames, shape=(1,) + data.shape[1:], dtype=np.uint16))
+        _check_container(TiffFolderData(fName))
+    finally:
+        shutil.rmtree(fName)
+
+
+def test_datamodel():
+    m = DataModel(SpimData(rel_path("../data/spimdata")))
+    vol = np.array(SpimData(rel_path("../data/spimdata"))[1])
+    assert np.array_equal(m.get_slice(1, 0, 3), vol[3])
+    assert np.array_equal(m.get_roi(1, (slice(None), 4)), vol[:, 4])
+    m.stopDataLoadThread()
+    time.sleep(.1)
+
+
+if __name__ == '__main__':
+    test_spimdata()
+    test_numpy()
+    test_raw_and_tiff()
+    test_datamodel()
@@ -0,0 +1,86 @@
+"""
+tests for the temporal processors and their frame ring buffer
+"""
+from __future__ import absolute_import, print_function
+import time
+import numpy as np
+from collections import Counter
+from spimagine import DataModel, NumpyData
+from spimagine.models.frame_buffer import FrameRingBuffer
+from spimagine.models.image_pipeline import ImagePipeline
+from spimagine.models.imageprocessor import (FuncProcessor, TemporalMeanProcessor,
+                                             DeltaFProcessor, TemporalMedianProcessor)
+
+
+def test_ring_buffer():
+    d = np.random.uniform(0, 1, (20, 10, 20, 30)).astype(np.float32)
+    calls = Counter()
+
+    def frames(t):
+        calls[t] += 1
+        return d[t]
+
+    ring = FrameRingBuffer()
+    for t in range(len(d)):
+        ring.update(t, 5, frames)
+        assert ring.timepoints() == list(range(max(0, t - 4), t + 1))
+        assert np.allclose(ring.mean(), np.mean(d[max(0, t - 4):t + 1], axis=0), atol=1.e-5)
+
+    # advancing one by one loads every frame only once
+    assert set(calls.values()) == {1}
+
+    # jumping back refills the window
+    ring.update(3, 5, frames)
+    assert np.allclose(ring.mean(), np.mean(d[:4], axis=0), atol=1.e-5)
+
+    # a new source does as well
+    ring.update(3, 5, lambda t: 2 * d[t], key="other")
+    assert np.allclose(ring.mean(), 2 * np.mean(d[:4], axis=0), atol=1.e-5)
+
+
+def test_pipeline():
+    d = np.random.uniform(1, 2, (10, 10, 20, 30)).astype(np.float32)
+    calls = Counter()
+
+    def scale(data, factor=2.):
+        calls["scale"] += 1
+        return factor * data
+
+    pre = FuncProcessor(scale, "scale", factor=2.)
+    mean, med, df = TemporalMeanProcessor(window=3), TemporalMedianProcessor(window=3), DeltaFProcessor(window=4)
+    pipe = ImagePipeline()
+    frames = lambda t: d[t]
+
+    for t in range(len(d)):
+        sl = slice(max(0, t - 2), t + 1)
+        res = pipe.apply(d[t], [pre, mean], timepoint=t, frames=frames)
+        assert np.allclose(res, 2 * np.mean(d[sl], axis=0), atol=1.e-5)
+        res = pipe.apply(d[t], [pre, med], timepoint=t, frames=frames)
+        assert np.allclose(res, 2 * np.median(d[sl], axis=0), atol=1.e-5)
+        res = pipe.apply(d[t], [df], timepoint=t, frames=frames)
+        f0 = np.mean(d[max(0, t - 3):t + 1], axis=0)
+        assert np.allclose(res, (d[t] - f0) / f0, atol=1.e-4)
+
+    # the upstream stage ran once per timepoint, its results are shared by the windows
+    assert calls["scale"] == len(d)
+
+    # without a timepoint the window is just the frame itself
+    assert np.allclose(mean.apply(d[0]), d[0])
+
+
+def test_datamodel():
+    d = np.random.uniform(0, 1, (8, 10, 20, 30)).astype(np.float32)
+    m = DataModel(NumpyData(d), prefetchSize=2)
+    m.setProcessors([TemporalMeanProcessor(window=3)])
+    for t in range(4):
+        m.setPos(t)
+        time.sleep(.1)
+        assert np.allclose(m.getProcessed(t), np.mean(d[max(0, t - 2):t + 1], axis=0), atol=1.e-5)
+    m.stopDataLoadThread()
+    time.sleep(.1)
+
+
+if __name__ == '__main__':
+    test_ring_buffer()
+    test_pipeline()
+    test_datamodel()
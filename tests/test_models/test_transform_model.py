@@ -0,0 +1,59 @@
+from __future__ import print_function, unicode_literals, absolute_import, division
+import numpy as np
+
+from spimagine.models.transform_model import TransformModel
+from spimagine.models.keyframe_model import TransformData
+from spimagine import Quaternion
+
+
+class _Model(object):
+    def setPos(self, pos):
+        pass
+
+
+def _count(transform):
+    counts = []
+    transform._transformChanged.connect(lambda: counts.append(1))
+    return counts
+
+
+def test_batch():
+    t = TransformModel()
+    counts = _count(t)
+
+    with t.batch():
+        t.setGamma(.5)
+        t.setZoom(1.2)
+        with t.batch():
+            t.setBox(False)
+        assert len(counts) == 0
+    assert len(counts) == 1
+    assert t.gamma == .5 and not t.isBox
+
+    # nothing changed -> nothing emitted
+    with t.batch():
+        pass
+    assert len(counts) == 1
+
+    t.setGamma(.7)
+    assert len(counts) == 2
+
+
+def test_fromTransformData():
+    t = TransformModel()
+    t.setModel(_Model())
+    counts = _count(t)
+
+    data = TransformData(quatRot=Quaternion(.71, .71, 0, 0), zoom=1.5, gamma=.8, bounds=[-.5, .5] * 3)
+    t.fromTransformData(data)
+    assert len(counts) == 1
+    assert np.allclose(t.bounds, data.bounds)
+    assert t.gamma == .8
+
+    t.reset()
+    assert len(counts) == 2
+
+
+if __name__ == '__main__':
+    test_batch()
+    test_fromTransformData()
@@ -0,0 +1,62 @@
+from __future__ import absolute_import, print_function
+import numpy as np
+import numpy.testing as npt
+from collections import Counter
+
+from spimagine.utils import alpha_shape
+
+
+def _concave_points(N, ndim, seed=0):
+    rng = np.random.RandomState(seed)
+    phi = rng.uniform(0, 2*np.pi, N)
+    if ndim == 2:
+        points = np.stack([np.cos(phi), np.sin(phi)*np.cos(phi)]).T
+    else:
+        theta = np.arccos(rng.uniform(-1, 1, N))
+        points = np.stack([np.cos(phi)*np.sin(theta)*np.cos(theta),
+                           np.sin(phi)*np.sin(theta)*np.cos(theta),
+                           np.cos(theta)]).T
+    return points+.05*rng.uniform(-1, 1, points.shape)
+
+
+def _sorted_faces(faces):
+    return set(tuple(sorted(f)) for f in faces)
+
+
+def test_closed():
+    for ndim, alpha in ((2, .1), (3, .2)):
+        points, normals, indices = alpha_shape(_concave_points(1000, ndim), alpha)
+        assert indices.shape[1] == ndim and len(indices) > 0
+        assert normals.shape == points.shape
+
+        # every edge (3d) or vertex (2d) of the border is shared by exactly two faces
+        if ndim == 2:
+            count = Counter(indices.ravel().tolist())
+        else:
+            count = Counter(tuple(sorted(e)) for f in indices for e in ((f[0], f[1]), (f[1], f[2]), (f[2], f[0])))
+        assert set(count.values()) == {2}
+
+        # and consistently oriented, so that every directed edge appears once
+        if ndim == 3:
+            directed = Counter((f[i], f[(i+1) % 3]) for f in indices for i in range(3))
+            assert set(directed.values()) == {1}
+
+
+def test_convex():
+    rng = np.random.RandomState(1)
+    for ndim in (2, 3):
+        points = rng.uniform(-1, 1, (300, ndim))
+        _, normals_hull, hull = alpha_shape(points)
+        # a big alpha removes nothing, so the border is the convex hull
+        _, normals, indices = alpha_shape(points, 100.)
+        assert _sorted_faces(indices) == _sorted_faces(hull)
+
+        # normals point outwards
+        used = np.unique(indices)
+        assert np.all(np.sum(normals[used]*points[used], axis=-1) > 0)
+        npt.assert_allclose(normals[used], normals_hull[used], atol=1.e-6)
+
+
+if __name__ == '__main__':
+    test_closed()
+    test_convex()
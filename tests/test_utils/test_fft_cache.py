@@ -0,0 +1,54 @@
+from __future__ import absolute_import, print_function
+
+import numpy as np
+from time import time
+from spimagine.utils.fft_cache import next_fast_len, fast_shape, fft_spectrum, plan_cache
+
+
+def test_fast_len():
+    for n in range(1, 600):
+        m = next_fast_len(n)
+        assert m >= n
+        k = m
+        for p in (2, 3, 5):
+            while k % p == 0:
+                k //= p
+        assert k == 1
+        # nothing in between
+        assert all(next_fast_len(j) == m for j in range(n, m + 1))
+    print(fast_shape((100, 257, 1000)))
+
+
+def test_spectrum():
+    d = np.random.uniform(0, 1, (31, 45, 50)).astype(np.float32)
+
+    # reference via full complex fft of the same padded volume
+    plan = plan_cache.get(d.shape)
+    res = fft_spectrum(d)
+    full = np.fft.fftshift(np.abs(np.fft.fftn(plan.buf))) / np.sqrt(plan.buf.size)
+    offs = [(N - n) // 2 for n, N in zip(d.shape, plan.shape)]
+    ref = full[tuple(slice(o, o + n) for o, n in zip(offs, d.shape))]
+
+    assert res.shape == d.shape
+    assert np.allclose(res, ref, rtol=1.e-3, atol=1.e-4)
+
+
+def test_speed():
+    d = np.random.uniform(0, 1, (64, 256, 256)).astype(np.float32)
+    fft_spectrum(d)
+    t = time()
+    for _ in range(3):
+        fft_spectrum(d)
+    t_rfft = (time() - t) / 3
+
+    t = time()
+    for _ in range(3):
+        np.fft.fftshift(np.abs(np.fft.fftn(d.astype(np.complex64))))
+    t_fft = (time() - t) / 3
+    print("rfft: %.1f ms   fft: %.1f ms" % (1000 * t_rfft, 1000 * t_fft))
+
+
+if __name__ == '__main__':
+    test_fast_len()
+    test_spectrum()
+    test_speed()
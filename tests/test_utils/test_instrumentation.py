@@ -0,0 +1,102 @@
+from __future__ import print_function, unicode_literals, absolute_import, division
+import json
+import os
+import tempfile
+import threading
+import time
+
+from spimagine.utils.instrumentation import Instrumentation
+
+
+def test_spans():
+    instr = Instrumentation()
+    instr.new_frame()
+    with instr.span("load"):
+        time.sleep(.01)
+    with instr.span("kernel", part=1):
+        pass
+    assert [s[0] for s in instr.spans] == ["load", "kernel"]
+    assert all(s[2] == 1 for s in instr.spans)
+    assert instr.spans[0][4] >= .009
+    assert instr.spans[1][6] == {"part": 1}
+
+
+def test_ring_buffer():
+    instr = Instrumentation(maxlen=10)
+    for i in range(25):
+        with instr.span("stage%s" % i):
+            pass
+    assert len(instr.spans) == 10
+    assert instr.spans[0][0] == "stage15"
+
+
+def test_summary():
+    instr = Instrumentation()
+    for i in range(1, 101):
+        instr.new_frame()
+        instr.record("kernel", 0, 1.e-3 * i)
+        instr.record("upload", 0, 1.e-3)
+        instr.record("upload", 0, 2.e-3)
+
+    summary = instr.summary()
+    assert list(summary.keys()) == ["kernel", "upload"]
+    assert summary["kernel"]["count"] == 100
+    assert abs(summary["kernel"]["p50"] - 50.5) < 1.e-6
+    assert abs(summary["kernel"]["max"] - 100) < 1.e-6
+    assert summary["kernel"]["p90"] < summary["kernel"]["p99"]
+
+    # only the last 10 frames
+    assert instr.summary(frames=10)["kernel"]["count"] == 10
+    assert abs(instr.summary(frames=10)["kernel"]["p50"] - 95.5) < 1.e-6
+
+    breakdown = instr.frame_breakdown()
+    assert abs(breakdown["kernel"] - 100) < 1.e-6
+    assert abs(breakdown["upload"] - 3) < 1.e-6
+    assert abs(instr.frame_breakdown(1)["kernel"] - 1) < 1.e-6
+
+    print(instr.summary_str())
+
+
+def test_chrome_trace():
+    instr = Instrumentation()
+
+    def load():
+        with instr.span("prefetch"):
+            pass
+
+    t = threading.Thread(target=load, name="loader")
+    t.start()
+    t.join()
+    with instr.span("paint", cat="gl"):
+        pass
+
+    fName = os.path.join(tempfile.mkdtemp(), "trace.json")
+    instr.export_chrome_trace(fName)
+    with open(fName) as f:
+        trace = json.load(f)
+
+    events = trace["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    assert [e["name"] for e in spans] == ["prefetch", "paint"]
+    assert spans[1]["cat"] == "gl"
+    assert spans[0]["tid"] != spans[1]["tid"]
+    assert abs(spans[1]["dur"] - 1.e6 * instr.spans[1][4]) < 1.e-3
+
+    names = dict((e["tid"], e["args"]["name"]) for e in events if e["ph"] == "M")
+    assert names[spans[0]["tid"]] == "loader"
+
+
+def test_disabled():
+    instr = Instrumentation(enabled=False)
+    with instr.span("load"):
+        pass
+    assert len(instr.spans) == 0
+    assert instr.summary() == {}
+
+
+if __name__ == '__main__':
+    test_spans()
+    test_ring_buffer()
+    test_summary()
+    test_chrome_trace()
+    test_disabled()
@@ -0,0 +1,82 @@
+from __future__ import absolute_import, print_function
+import numpy as np
+import numpy.testing as npt
+from collections import Counter
+
+from spimagine.utils.marching_cubes import marching_cubes, cube_cases
+from spimagine.gui.mesh import IsoSurfaceMesh
+
+
+def _ball(shape=(40, 50, 60), center=(30.3, 24.1, 19.7), r=12.):
+    z, y, x = np.meshgrid(*[np.arange(n) for n in shape], indexing="ij")
+    dist = np.sqrt((x - center[0]) ** 2 + (y - center[1]) ** 2 + (z - center[2]) ** 2)
+    return (100. * (1. - dist / (2 * r))).astype(np.float32), np.array(center)
+
+
+def _is_closed(indices):
+    """every directed edge appears once, together with its reverse"""
+    directed = Counter((a, b) for f in indices for a, b in ((f[0], f[1]), (f[1], f[2]), (f[2], f[0])))
+    return set(directed.values()) == {1} and all((b, a) in directed for (a, b) in directed)
+
+
+def test_ball():
+    data, center = _ball()
+    verts, normals, indices = marching_cubes(data, 50., gpu=False)
+
+    npt.assert_allclose(np.linalg.norm(verts - center, axis=-1), 12., atol=2.e-2)
+    assert _is_closed(indices)
+    # a sphere: V - E + F = 2
+    assert len(verts) - len(indices) * 3 // 2 + len(indices) == 2
+
+    # normals and triangles point outwards
+    npt.assert_allclose(normals, (verts - center) / 12., atol=1.e-2)
+    tris = verts[indices]
+    face_normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    assert np.all(np.sum(face_normals * (tris.mean(axis=1) - center), axis=-1) > 0)
+
+
+def test_chunks():
+    rng = np.random.RandomState(0)
+    data = rng.uniform(0, 1, (20, 21, 22)).astype(np.float32)
+    data[[0, -1]] = 0
+    data[:, [0, -1]] = 0
+    data[:, :, [0, -1]] = 0
+
+    verts, normals, indices = marching_cubes(data, .5, chunk_size=100, gpu=False)
+    # even for noise (with lots of ambiguous faces) the surface is closed and manifold
+    assert _is_closed(indices)
+
+    for chunk_size in (1, 5):
+        v, n, ind = marching_cubes(data, .5, chunk_size=chunk_size, gpu=False)
+        npt.assert_allclose(v, verts)
+        npt.assert_array_equal(ind, indices)
+
+    # the same with OpenCL (or the numpy fallback)
+    v, n, ind = marching_cubes(data, .5, chunk_size=5, gpu=True)
+    npt.assert_allclose(v, verts)
+    npt.assert_array_equal(ind, indices)
+
+
+def test_empty():
+    data = np.zeros((10, 10, 10), np.float32)
+    verts, normals, indices = marching_cubes(data, .5, gpu=False)
+    assert len(verts) == 0 and len(indices) == 0
+    assert np.all(cube_cases(data + 1, .5) == 255)
+
+
+def test_iso_mesh():
+    data, center = _ball()
+    m = IsoSurfaceMesh(data, 50., gpu=False)
+    verts = np.asarray(m.vertices).reshape((-1, 3))
+    assert len(m.indices) % 3 == 0
+    # in the coordinates of the rendered box [-1,1]^3
+    center_box = 2. * (center + .5) / np.array(data.shape[::-1]) - 1.
+    npt.assert_allclose(verts.mean(axis=0), center_box, atol=1.e-2)
+    npt.assert_allclose(np.linalg.norm(m.normals, axis=-1), 1., atol=1.e-5)
+
+
+if __name__ == '__main__':
+    test_ball()
+    test_chunks()
+    test_empty()
+    test_iso_mesh()
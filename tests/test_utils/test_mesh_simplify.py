@@ -0,0 +1,64 @@
+from __future__ import absolute_import, print_function
+import numpy as np
+import numpy.testing as npt
+
+from spimagine.utils.mesh_simplify import decimate, lod_levels
+from spimagine.gui.mesh import Mesh, EllipsoidMesh
+
+
+def _sphere(n_phi=200, n_theta=100):
+    m = EllipsoidMesh(rs=(1., 1., 1.), n_phi=n_phi, n_theta=n_theta)
+    return np.asarray(m.vertices), np.asarray(m.normals), np.asarray(m.indices).reshape((-1, 3))
+
+
+def test_decimate():
+    verts, normals, indices = _sphere()
+    v, n, ind = decimate(verts, indices, .2, normals)
+
+    assert len(ind) < len(indices) // 10
+    assert ind.max() == len(v) - 1 and len(np.unique(ind)) == len(v)
+    # no degenerate or duplicated triangles
+    assert np.all((ind[:, 0] != ind[:, 1]) & (ind[:, 1] != ind[:, 2]) & (ind[:, 2] != ind[:, 0]))
+    assert len(np.unique(np.sort(ind, axis=1), axis=0)) == len(ind)
+
+    # the vertices stay close to the sphere, the normals are the ones of the sphere
+    npt.assert_allclose(np.linalg.norm(v, axis=-1), 1., atol=.05)
+    npt.assert_allclose(np.linalg.norm(n, axis=-1), 1., atol=1.e-5)
+    assert np.all(np.sum(n * v, axis=-1) > .9)
+
+    # the triangles still face outwards
+    tris = v[ind]
+    face_normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    assert np.mean(np.sum(face_normals * tris.mean(axis=1), axis=-1) > 0) > .95
+
+    # for a tiny cell size only the duplicated vertices (at the poles) are merged
+    v, n, ind = decimate(verts, indices, 1.e-4)
+    assert n is None
+    assert len(v) == len(np.unique(verts.round(5), axis=0))
+
+
+def test_lod():
+    verts, normals, indices = _sphere()
+    levels = lod_levels(verts, indices, normals, n_levels=3, min_triangles=10)
+    assert len(levels) == 3
+    sizes = [lev[0] for lev in levels]
+    n_tris = [len(lev[3]) for lev in levels]
+    assert sizes == sorted(sizes) and n_tris == sorted(n_tris, reverse=True)
+    assert n_tris[0] < len(indices)
+
+    # small meshes are not simplified
+    assert Mesh().lod_levels() == []
+    assert Mesh().lod_index(100.) == 0
+
+    m = Mesh(vertices=verts, normals=normals, indices=indices.flatten())
+    m.LOD_MIN_TRIANGLES = 1000
+    levels = m.lod_levels()
+    assert len(levels) > 0
+    assert m.lod_index(0.) == 0
+    assert m.lod_index(levels[0][0] / 2.) == 1
+    assert m.lod_index(1.e10) == len(levels)
+
+
+if __name__ == '__main__':
+    test_decimate()
+    test_lod()